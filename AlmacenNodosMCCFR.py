@@ -0,0 +1,179 @@
+import sys
+from array import array
+from typing import Dict, List, Optional, Iterator, Sequence, Tuple, Any
+from CodificadorInfoset import codificar_clave, TOTAL_CODIGOS
+
+AccionCruda = Tuple[str, float, float]
+
+def calcular_estrategia_promedio(sumas_estrategia: Sequence[float]) -> List[float]:
+    """Normaliza las sumas de estrategia positivas; sin masa positiva la estrategia es uniforme."""
+    positivas = [max(0.0, s) for s in sumas_estrategia]
+    total = sum(positivas)
+    if total <= 1e-9: return [1.0 / len(positivas)] * len(positivas) if positivas else []
+    return [s / total for s in positivas]
+
+def resolver_estrategia_nodo(arrepentimientos: Sequence[float], sumas_estrategia: Sequence[float]) -> Tuple[List[float], int, float]:
+    """Devuelve (distribución, índice de la acción recomendada, probabilidad reportada).
+
+    La acción recomendada es la de mayor suma de estrategia; si el nodo no tiene
+    masa positiva se elige la de menor arrepentimiento y se reporta probabilidad 0.
+    """
+    distribucion = calcular_estrategia_promedio(sumas_estrategia)
+    if not distribucion: return distribucion, -1, 0.0
+    if sum(max(0.0, s) for s in sumas_estrategia) <= 1e-9:
+        return distribucion, min(range(len(arrepentimientos)), key=arrepentimientos.__getitem__), 0.0
+    mejor = max(range(len(distribucion)), key=distribucion.__getitem__)
+    return distribucion, mejor, distribucion[mejor]
+
+class AlmacenNodosMCCFR:
+    """Almacén columnar de nodos MCCFR.
+
+    Cada infoset ocupa un rango contiguo [desplazamientos[i], desplazamientos[i+1])
+    dentro de los buffers de acciones; las acciones se guardan como códigos enteros
+    internados y los valores numéricos en arrays 'd' contiguos. La interfaz de
+    consulta (get, in, len) es la misma que la del diccionario clásico de nodos.
+    """
+    def __init__(self):
+        self.indice_claves: Dict[str, int] = {}
+        self.desplazamientos = array('I', [0])
+        self.codigos_accion = array('H')
+        self.arrepentimientos = array('d')
+        self.sumas_estrategia = array('d')
+        self.nombres_acciones: List[str] = []
+        self._codigo_por_nombre: Dict[str, int] = {}
+        self.probabilidades: Optional[array] = None
+        self.mejor_accion: Optional[array] = None
+        self.probabilidad_mejor: Optional[array] = None
+        self.indice_codigos: Optional[array] = None
+
+    def codigo_accion(self, nombre: str) -> int:
+        codigo = self._codigo_por_nombre.get(nombre)
+        if codigo is None:
+            codigo = len(self.nombres_acciones)
+            self.nombres_acciones.append(sys.intern(nombre))
+            self._codigo_por_nombre[nombre] = codigo
+        return codigo
+
+    def agregar_nodo(self, clave: str, acciones: Sequence[AccionCruda]):
+        for nombre, arrepentimiento, suma_estrategia in acciones:
+            self.codigos_accion.append(self.codigo_accion(nombre))
+            self.arrepentimientos.append(arrepentimiento)
+            self.sumas_estrategia.append(suma_estrategia)
+        self.cerrar_nodo(clave)
+
+    def cerrar_nodo(self, clave: str):
+        """Registra como nodo `clave` las acciones añadidas desde el último cierre.
+
+        Una clave duplicada apunta al rango nuevo y el anterior queda huérfano,
+        igual que el dict clásico se quedaba con el último valor.
+        """
+        self.indice_claves[clave] = len(self.desplazamientos) - 1
+        self.desplazamientos.append(len(self.codigos_accion))
+
+    def obtener_indice(self, clave: str) -> int:
+        return self.indice_claves.get(clave, -1)
+
+    def rango_nodo(self, indice: int) -> range:
+        return range(self.desplazamientos[indice], self.desplazamientos[indice + 1])
+
+    def precalcular_estrategias(self):
+        """Resuelve una vez cada nodo a su distribución normalizada y acción recomendada."""
+        probabilidades, mejor_accion, probabilidad_mejor = array('d'), array('H'), array('d')
+        for indice in range(len(self.desplazamientos) - 1):
+            inicio, fin = self.desplazamientos[indice], self.desplazamientos[indice + 1]
+            distribucion, mejor, probabilidad = resolver_estrategia_nodo(self.arrepentimientos[inicio:fin], self.sumas_estrategia[inicio:fin])
+            probabilidades.extend(distribucion)
+            mejor_accion.append(max(mejor, 0))
+            probabilidad_mejor.append(probabilidad)
+        self.probabilidades, self.mejor_accion, self.probabilidad_mejor = probabilidades, mejor_accion, probabilidad_mejor
+
+    def indexar_por_codigo(self):
+        """Tabla densa código de infoset -> nodo (-1 si no entrenado) para consultas sin hashing de strings."""
+        indice_codigos = array('i', [-1]) * TOTAL_CODIGOS
+        for clave, indice in self.indice_claves.items():
+            codigo = codificar_clave(clave)
+            if codigo >= 0: indice_codigos[codigo] = indice
+        self.indice_codigos = indice_codigos
+
+    def obtener_indice_codigo(self, codigo: int) -> int:
+        if self.indice_codigos is None: self.indexar_por_codigo()
+        return self.indice_codigos[codigo] if 0 <= codigo < TOTAL_CODIGOS else -1
+
+    def estrategia_promedio_nodo(self, indice: int) -> List[float]:
+        if self.probabilidades is not None: return self.probabilidades[self.desplazamientos[indice]:self.desplazamientos[indice + 1]].tolist()
+        return calcular_estrategia_promedio(self.sumas_estrategia[self.desplazamientos[indice]:self.desplazamientos[indice + 1]])
+
+    def recomendacion_nodo(self, indice: int) -> Tuple[str, float]:
+        if self.mejor_accion is None: self.precalcular_estrategias()
+        return self.nombres_acciones[self.codigos_accion[self.desplazamientos[indice] + self.mejor_accion[indice]]], self.probabilidad_mejor[indice]
+
+    def recomendacion(self, clave: str) -> Optional[Tuple[str, float]]:
+        indice = self.indice_claves.get(clave)
+        return self.recomendacion_nodo(indice) if indice is not None else None
+
+    def recomendacion_por_codigo(self, codigo: int) -> Optional[Tuple[str, float]]:
+        indice = self.obtener_indice_codigo(codigo)
+        return self.recomendacion_nodo(indice) if indice >= 0 else None
+
+    def distribucion_por_codigo(self, codigo: int) -> Optional[List[Tuple[str, float]]]:
+        indice = self.obtener_indice_codigo(codigo)
+        return self.distribucion_nodo(indice) if indice >= 0 else None
+
+    def distribucion_nodo(self, indice: int) -> List[Tuple[str, float]]:
+        return [(self.nombres_acciones[self.codigos_accion[j]], p) for j, p in zip(self.rango_nodo(indice), self.estrategia_promedio_nodo(indice))]
+
+    def distribucion(self, clave: str) -> Optional[List[Tuple[str, float]]]:
+        indice = self.indice_claves.get(clave)
+        return self.distribucion_nodo(indice) if indice is not None else None
+
+    def acciones_nodo(self, indice: int) -> List[Dict[str, Any]]:
+        nombres = self.nombres_acciones
+        return [
+            {"accion": nombres[self.codigos_accion[j]], "arrepentimiento": self.arrepentimientos[j], "suma_estrategia": self.sumas_estrategia[j]}
+            for j in self.rango_nodo(indice)
+        ]
+
+    def get(self, clave: str, default: Optional[List[Dict[str, Any]]] = None) -> Optional[List[Dict[str, Any]]]:
+        indice = self.indice_claves.get(clave)
+        if indice is None: return default
+        return self.acciones_nodo(indice)
+
+    def __getitem__(self, clave: str) -> List[Dict[str, Any]]:
+        indice = self.indice_claves.get(clave)
+        if indice is None: raise KeyError(clave)
+        return self.acciones_nodo(indice)
+
+    def __contains__(self, clave: object) -> bool: return clave in self.indice_claves
+    def __len__(self) -> int: return len(self.indice_claves)
+    def __iter__(self) -> Iterator[str]: return iter(self.indice_claves)
+    def __bool__(self) -> bool: return bool(self.indice_claves)
+    def keys(self): return self.indice_claves.keys()
+
+    def items(self) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        for clave, indice in self.indice_claves.items():
+            yield clave, self.acciones_nodo(indice)
+
+    def memoria_buffers(self) -> int:
+        """Bytes ocupados por los buffers columnares (sin contar el índice de claves)."""
+        buffers = (self.desplazamientos, self.codigos_accion, self.arrepentimientos, self.sumas_estrategia,
+                   self.probabilidades, self.mejor_accion, self.probabilidad_mejor, self.indice_codigos)
+        return sum(a.itemsize * len(a) for a in buffers if a is not None)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Las claves viajan como un único blob separado por '\0' en lugar de un
+        # dict de millones de str, que es lo caro de serializar entre procesos.
+        estado = self.__dict__.copy()
+        estado["indice_claves"] = ("\0".join(self.indice_claves.keys()).encode('latin-1', errors='replace'), array('I', self.indice_claves.values()))
+        return estado
+
+    def __setstate__(self, estado: Dict[str, Any]):
+        claves, indices = estado.pop("indice_claves")
+        self.__dict__.update(estado)
+        self.indice_claves = dict(zip(claves.decode('latin-1').split("\0"), indices)) if indices else {}
+
+    @classmethod
+    def desde_diccionario(cls, nodos: Dict[str, List[Dict[str, Any]]]) -> 'AlmacenNodosMCCFR':
+        almacen = cls()
+        for clave, acciones in nodos.items():
+            almacen.agregar_nodo(clave, [(a["accion"], a["arrepentimiento"], a["suma_estrategia"]) for a in acciones])
+        return almacen
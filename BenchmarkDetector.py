@@ -0,0 +1,185 @@
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Tuple
+import cv2
+import numpy as np
+from Config import FRAMES_DIR, LABEL_NAMES
+from DetectorObjetos import DetectorObjetos, CLASES_FINAS
+from LoteDetecciones import LoteDetecciones
+from EstadoJuego import EstadoJuego
+
+BACKENDS = ('pytorch', 'onnx', 'openvino')
+CLASES_CON_OCR = ('ValorCarta', 'Stack', 'Apuesta', 'Bote', 'BoteApuesta', 'NombreJugador', 'AccionPoker')
+Detecciones = Tuple[np.ndarray, np.ndarray, np.ndarray]  # cajas xyxy, clases, confianzas
+
+def rutas_frames(directorio: str, maximo: int) -> List[str]:
+    return sorted(glob.glob(os.path.join(directorio, '*.png')) + glob.glob(os.path.join(directorio, '*.jpg')))[:maximo]
+
+def cargar_frames(directorio: str, maximo: int) -> List[np.ndarray]:
+    frames = [cv2.imread(ruta) for ruta in rutas_frames(directorio, maximo)]
+    return [frame for frame in frames if frame is not None]
+
+def extraer_detecciones(lote: LoteDetecciones) -> Detecciones:
+    return lote.cajas, lote.clases, lote.confianzas
+
+def medir_backend(backend: str, frames: List[np.ndarray], calentamiento: int, dos_etapas: bool = False) -> Tuple[List[float], List[LoteDetecciones]]:
+    detector = DetectorObjetos(backend, dos_etapas)
+    if not detector.esta_disponible() or detector.dos_etapas != dos_etapas: return [], []
+    for frame in frames[:calentamiento]: detector.detectar(frame)
+    latencias, lotes = [], []
+    for frame in frames:
+        inicio = time.perf_counter()
+        lotes.append(detector.detectar(frame))
+        latencias.append(time.perf_counter() - inicio)
+    return latencias, lotes
+
+def extraer_detecciones_completas(lote: LoteDetecciones, frame: np.ndarray, mapa_cambios=None) -> Dict[str, List[Dict]]:
+    """Extracción anterior a Deteccion: un dict con caja, centro, recorte y cambio por cada detección del frame."""
+    detecciones = {nombre: [] for nombre in LABEL_NAMES}
+    for clase, etiqueta in enumerate(LABEL_NAMES):
+        for i in lote.indices(clase):
+            caja = lote.caja(i)
+            detecciones[etiqueta].append({"box": caja, "center": lote.centro(i), "crop": frame[caja[1]:caja[3], caja[0]:caja[2]],
+                                          "cambio": mapa_cambios.region_cambio(caja) if mapa_cambios else True})
+    return detecciones
+
+def medir_asignaciones(lotes: List[LoteDetecciones], frames: List[np.ndarray]) -> Dict[str, Dict[str, float]]:
+    """Bloques, bytes y microsegundos por frame de la extracción de detecciones, antes (dicts con todos los recortes) y después
+    (EstadoJuego.extraerDetecciones, perezosa), sin leer recortes y tras recortar las clases con OCR como hace el OCR."""
+    estado = EstadoJuego(None)
+    resultados = {}
+    for nombre, extraer in (("antes", extraer_detecciones_completas), ("despues", estado.extraerDetecciones)):
+        totales = Counter()
+        for lote, frame in zip(lotes, frames):
+            inicio = time.perf_counter()
+            extraer(lote, frame)
+            totales["us"] += (time.perf_counter() - inicio) * 1e6
+            tracemalloc.start()
+            detecciones = extraer(lote, frame)
+            totales.update(_memoria_trazada("extraccion"))
+            recortes = [d['crop'] for clase in CLASES_CON_OCR for d in detecciones[clase]]
+            totales.update(_memoria_trazada("con_recortes"))
+            tracemalloc.stop()
+            del detecciones, recortes  # vivos hasta aquí para que las dos instantáneas los cuenten
+        resultados[nombre] = {clave: valor / max(len(lotes), 1) for clave, valor in totales.items()}
+    return resultados
+
+def _memoria_trazada(sufijo: str) -> Dict[str, int]:
+    estadisticas = tracemalloc.take_snapshot().statistics('filename')
+    return {f"bloques_{sufijo}": sum(e.count for e in estadisticas), f"bytes_{sufijo}": sum(e.size for e in estadisticas)}
+
+def iou_matriz(cajas_a: np.ndarray, cajas_b: np.ndarray) -> np.ndarray:
+    if len(cajas_a) == 0 or len(cajas_b) == 0: return np.zeros((len(cajas_a), len(cajas_b)))
+    x1 = np.maximum(cajas_a[:, None, 0], cajas_b[None, :, 0])
+    y1 = np.maximum(cajas_a[:, None, 1], cajas_b[None, :, 1])
+    x2 = np.minimum(cajas_a[:, None, 2], cajas_b[None, :, 2])
+    y2 = np.minimum(cajas_a[:, None, 3], cajas_b[None, :, 3])
+    interseccion = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (cajas_a[:, 2] - cajas_a[:, 0]) * (cajas_a[:, 3] - cajas_a[:, 1])
+    area_b = (cajas_b[:, 2] - cajas_b[:, 0]) * (cajas_b[:, 3] - cajas_b[:, 1])
+    return interseccion / np.maximum(area_a[:, None] + area_b[None, :] - interseccion, 1e-9)
+
+def _emparejar_clase(referencia: Detecciones, candidato: Detecciones, clase: int, umbral_iou: float) -> Tuple[List[Tuple[float, bool]], int]:
+    """Emparejamiento voraz por confianza de un frame: ([(confianza, acierto)], referencias cubiertas)."""
+    cajas_ref, clases_ref, _ = referencia
+    cajas, clases, confs = candidato
+    ref = cajas_ref[clases_ref == clase]
+    mascara = clases == clase
+    confianzas = confs[mascara]
+    ious = iou_matriz(cajas[mascara], ref)
+    usadas = np.zeros(len(ref), dtype=bool)
+    aciertos = []
+    for i in np.argsort(-confianzas):
+        j = int(np.argmax(ious[i])) if len(ref) else -1
+        acierto = j >= 0 and ious[i, j] >= umbral_iou and not usadas[j]
+        if acierto: usadas[j] = True
+        aciertos.append((float(confianzas[i]), acierto))
+    return aciertos, int(usadas.sum())
+
+def precision_media(referencia: List[Detecciones], candidato: List[Detecciones], clase: int, umbral_iou: float) -> Tuple[float, int]:
+    """AP@umbral de una clase tomando las detecciones de referencia como verdad; devuelve (AP, nº de referencias)."""
+    total_referencia = sum(int((clases == clase).sum()) for _, clases, _ in referencia)
+    if total_referencia == 0: return float('nan'), 0
+    aciertos: List[Tuple[float, bool]] = []
+    for frame_ref, frame_candidato in zip(referencia, candidato):
+        aciertos.extend(_emparejar_clase(frame_ref, frame_candidato, clase, umbral_iou)[0])
+    if not aciertos: return 0.0, total_referencia
+    aciertos.sort(key=lambda a: -a[0])
+    verdaderos = np.cumsum([a[1] for a in aciertos])
+    recall = verdaderos / total_referencia
+    precision = verdaderos / np.arange(1, len(aciertos) + 1)
+    # Interpolación en todos los puntos (envolvente monótona de la curva P-R)
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    recall_previo = np.concatenate(([0.0], recall[:-1]))
+    return float(np.sum((recall - recall_previo) * precision)), total_referencia
+
+def comparar_con_referencia(referencia: List[Detecciones], candidato: List[Detecciones], umbral_iou: float) -> Tuple[float, Dict[str, float]]:
+    por_clase = {}
+    for clase, nombre in enumerate(LABEL_NAMES):
+        ap, total = precision_media(referencia, candidato, clase, umbral_iou)
+        if total: por_clase[nombre] = ap
+    return (float(np.mean(list(por_clase.values()))) if por_clase else float('nan')), por_clase
+
+def recall_por_clase(referencia: List[Detecciones], candidato: List[Detecciones], umbral_iou: float) -> Dict[str, Tuple[float, int]]:
+    """Fracción de detecciones de referencia que el candidato recupera, por clase: {nombre: (recall, nº de referencias)}."""
+    por_clase = {}
+    for clase, nombre in enumerate(LABEL_NAMES):
+        total = sum(int((clases == clase).sum()) for _, clases, _ in referencia)
+        if not total: continue
+        cubiertas = sum(_emparejar_clase(frame_ref, frame_candidato, clase, umbral_iou)[1] for frame_ref, frame_candidato in zip(referencia, candidato))
+        por_clase[nombre] = (cubiertas / total, total)
+    return por_clase
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara latencia y paridad de detecciones entre backends de DetectorObjetos")
+    parser.add_argument("--frames", default=FRAMES_DIR, help="Directorio con frames guardados (png/jpg)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--max-frames", type=int, default=200)
+    parser.add_argument("--calentamiento", type=int, default=5)
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU mínimo para emparejar con la referencia")
+    parser.add_argument("--dos-etapas", action="store_true", help="Mide también la detección en dos etapas contra una pasada a YOLO_IMGSZ del mismo backend")
+    args = parser.parse_args()
+    frames = cargar_frames(args.frames, args.max_frames)
+    if not frames:
+        print(f"Error: No hay frames en {args.frames} (se guardan con la tecla de forzar acción)")
+        return
+    print(f"{len(frames)} frames de {args.frames}; referencia: {args.backends[0]}\n")
+    referencia = None
+    print(f"{'backend':<10} {'media ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'mAP50 vs ref':>13} {'detecciones':>12}")
+    for backend in args.backends:
+        latencias, lotes = medir_backend(backend, frames, args.calentamiento)
+        if not latencias:
+            print(f"{backend:<10} no disponible")
+            continue
+        ms = np.array(latencias) * 1000
+        if referencia is None: asignaciones = medir_asignaciones(lotes, frames)
+        detecciones = [extraer_detecciones(lote) for lote in lotes]
+        if referencia is None: referencia = detecciones
+        map50, por_clase = comparar_con_referencia(referencia, detecciones, args.iou)
+        print(f"{backend:<10} {ms.mean():>9.1f} {np.percentile(ms, 50):>8.1f} {np.percentile(ms, 95):>8.1f} {map50:>13.3f} {sum(len(d[1]) for d in detecciones):>12}")
+        peores = sorted(por_clase.items(), key=lambda item: item[1])[:3]
+        if detecciones is not referencia and peores:
+            print(f"{'':<10} clases con menor AP: " + ", ".join(f"{nombre} {ap:.3f}" for nombre, ap in peores))
+        if args.dos_etapas:
+            latencias_2e, lotes_2e = medir_backend(backend, frames, args.calentamiento, dos_etapas=True)
+            if not latencias_2e:
+                print(f"{backend + '+2e':<10} no disponible")
+                continue
+            ms_2e = np.array(latencias_2e) * 1000
+            glifos = sum(int(np.isin(lote.clases, CLASES_FINAS).sum()) for lote in lotes)
+            glifos_2e = sum(int(np.isin(lote.clases, CLASES_FINAS).sum()) for lote in lotes_2e)
+            print(f"{backend + '+2e':<10} {ms_2e.mean():>9.1f} {np.percentile(ms_2e, 50):>8.1f} {np.percentile(ms_2e, 95):>8.1f} "
+                  f"{'':>13} {sum(len(lote) for lote in lotes_2e):>12}")
+            print(f"{'':<10} coste frente a detectar() a una pasada: {ms_2e.mean() / ms.mean():.2f}x; valores y palos detectados: {glifos} -> {glifos_2e}")
+    if referencia is not None:
+        print("\nAsignaciones vivas por frame al extraer detecciones (antes: dicts con todos los recortes; después: extraerDetecciones perezosa):")
+        for nombre, medida in asignaciones.items():
+            print(f"   {nombre:<8} {medida['bloques_extraccion']:5.0f} bloques / {medida['bytes_extraccion'] / 1024:6.1f} KiB | "
+                  f"tras recortar las clases con OCR: {medida['bloques_con_recortes']:5.0f} bloques / {medida['bytes_con_recortes'] / 1024:6.1f} KiB | {medida['us']:6.0f} us")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import math
+import os
+import random
+import struct
+import tempfile
+import time
+import tracemalloc
+from typing import List, Tuple
+from Config import NUMERO_MAGICO_CPP, ACCIONES_POKER, POSICIONES_POR_JUGADORES, TREYS_CATEGORY_MAP
+from MCCFRLoader import MCCFRLoader
+from CodificadorInfoset import clases_mano, FASES, codificar_clave
+from TomadorDeDecisiones import TomadorDeDecisiones
+from ModeloMCCFRMapeado import ModeloMCCFRMapeado, escribir_modelo_mapeado, ruta_mapeada_para
+
+def _componentes_clave(num_jugadores: int) -> Tuple[List[str], ...]:
+    return clases_mano(), sorted(set(TREYS_CATEGORY_MAP.values())), POSICIONES_POR_JUGADORES[num_jugadores], FASES, ACCIONES_POKER + ["Ninguna"]
+
+def max_claves_sinteticas(num_jugadores: int) -> int:
+    """Claves distintas posibles para ese número de jugadores (mano x categoría x posición x fase x acción previa)."""
+    return math.prod(len(set(componente)) for componente in _componentes_clave(num_jugadores))
+
+def generar_claves_sinteticas(num_nodos: int, num_jugadores: int, rng: random.Random) -> List[str]:
+    if num_nodos > max_claves_sinteticas(num_jugadores):
+        raise ValueError(f"{num_nodos} nodos superan las {max_claves_sinteticas(num_jugadores)} claves distintas posibles con {num_jugadores} jugadores")
+    manos, categorias, posiciones, _, acciones_previas = _componentes_clave(num_jugadores)
+    claves = set()
+    while len(claves) < num_nodos:
+        claves.add(f"{rng.choice(manos)}:{rng.choice(categorias)}:{rng.choice(posiciones)}:{rng.choice(FASES)}:{rng.choice(acciones_previas)}")
+    return sorted(claves)
+
+def escribir_modelo_sintetico(ruta: str, num_nodos: int, num_jugadores: int = 6, semilla: int = 42) -> str:
+    """Escribe un .bin con el mismo formato que genera el entrenador C++."""
+    rng = random.Random(semilla)
+    with open(ruta, 'wb') as f:
+        f.write(struct.pack('<IIQIIB3B4x', NUMERO_MAGICO_CPP, 1, int(time.time()), num_nodos, 0, num_jugadores, 0, 0, 0))
+        for clave in generar_claves_sinteticas(num_nodos, num_jugadores, rng):
+            clave_bytes = clave.encode('latin-1')
+            acciones = rng.sample(ACCIONES_POKER, rng.randint(2, 8))
+            f.write(struct.pack('<I', len(clave_bytes)) + clave_bytes + struct.pack('<I', len(acciones)))
+            for accion in acciones:
+                accion_bytes = accion.encode('latin-1')
+                f.write(struct.pack('<I', len(accion_bytes)) + accion_bytes + struct.pack('<dd', rng.uniform(-50, 50), rng.uniform(0, 1000)))
+    return ruta
+
+def medir_carga(ruta: str, compacto: bool) -> Tuple[object, float, int]:
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    datos = MCCFRLoader()._parsear_archivo_mccfr(ruta, compacto=compacto)
+    duracion = time.perf_counter() - inicio
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return datos["nodos"], duracion, memoria
+
+def medir_consultas(nodos, claves: List[str], repeticiones: int) -> Tuple[float, float]:
+    """Segundos por consulta: (camino de TomadorDeDecisiones.consultarEstrategia, get() con la lista de dicts por acción)."""
+    consultar = TomadorDeDecisiones({}).consultarEstrategia
+    codigos = [codificar_clave(clave) for clave in claves]
+    consultar(nodos, claves[0], codigos[0])  # tablas perezosas (estrategias precalculadas, índice por código) fuera de la medida
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for clave, codigo in zip(claves, codigos):
+            consultar(nodos, clave, codigo)
+    decision = (time.perf_counter() - inicio) / (repeticiones * len(claves))
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for clave in claves:
+            info_nodo = nodos.get(clave)
+            sum(max(0.0, a['suma_estrategia']) for a in info_nodo)
+            max(info_nodo, key=lambda x: max(0.0, x['suma_estrategia']))
+    return decision, (time.perf_counter() - inicio) / (repeticiones * len(claves))
+
+def comparar_almacenes(ruta: str, num_consultas: int, repeticiones: int):
+    print(f"Modelo: {ruta} ({os.path.getsize(ruta) / 1e6:.1f} MB)")
+    resultados = {}
+    for nombre, compacto in (("dict", False), ("compacto", True)):
+        nodos, duracion, memoria = medir_carga(ruta, compacto)
+        claves = random.Random(7).sample(list(nodos.keys()), min(num_consultas, len(nodos)))
+        decision, get = medir_consultas(nodos, claves, repeticiones)
+        resultados[nombre] = (duracion, memoria, decision, get)
+        print(f"  [{nombre:>8}] carga: {duracion:7.2f} s | memoria: {memoria / 1e6:8.1f} MB | consulta decisión: {decision * 1e6:6.2f} us | get(): {get * 1e6:6.2f} us")
+        del nodos
+    base, nuevo = resultados["dict"], resultados["compacto"]
+    print(f"  Memoria: x{base[1] / max(nuevo[1], 1):.1f} menor | Carga: x{base[0] / max(nuevo[0], 1e-9):.2f} | "
+          f"Consulta decisión: x{base[2] / max(nuevo[2], 1e-12):.2f} | get(): x{base[3] / max(nuevo[3], 1e-12):.2f} (<1 = más lento)")
+
+def comparar_parsers(ruta: str):
+    tamano_mb = os.path.getsize(ruta) / 1e6
+    cargador = MCCFRLoader()
+    print(f"Parser ({tamano_mb:.1f} MB):")
+    for nombre, parsear in (("secuencial", cargador._parsear_archivo_mccfr_secuencial), ("bloque", cargador._parsear_archivo_mccfr)):
+        for compacto in (False, True):
+            inicio = time.perf_counter()
+            datos = parsear(ruta, compacto=compacto)
+            duracion = time.perf_counter() - inicio
+            num_nodos = len(datos["nodos"])
+            del datos
+            print(f"  [{nombre:>10} / {'compacto' if compacto else 'dict':>8}] {duracion:6.2f} s | {tamano_mb / duracion:6.2f} MB/s | {num_nodos / duracion:10.0f} nodos/s")
+
+def comparar_arranque_mapeado(ruta: str, num_consultas: int, repeticiones: int, directorio: str):
+    # Se escribe en el directorio temporal del benchmark: un .mcci junto a un modelo real lo usaría MCCFRLoader en la siguiente ejecución
+    ruta_mapeada = os.path.join(directorio, os.path.basename(ruta_mapeada_para(ruta)))
+    if not os.path.exists(ruta_mapeada):
+        datos = MCCFRLoader()._parsear_archivo_mccfr(ruta, compacto=True)
+        escribir_modelo_mapeado(ruta_mapeada, datos["cabecera"], datos["nodos"])
+        del datos
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    modelo = ModeloMCCFRMapeado(ruta_mapeada)
+    duracion = time.perf_counter() - inicio
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    claves = random.Random(7).sample(list(modelo.keys()), min(num_consultas, len(modelo)))
+    decision, get = medir_consultas(modelo, claves, repeticiones)
+    print(f"  [{'mapeado':>8}] carga: {duracion:7.4f} s | memoria: {memoria / 1e6:8.3f} MB | consulta decisión: {decision * 1e6:6.2f} us | get(): {get * 1e6:6.2f} us")
+    modelo.cerrar()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de carga y consulta de modelos MCCFR")
+    parser.add_argument("--modelo", help="Ruta a un mccfr_N_poker.bin real; si se omite se genera uno sintético")
+    parser.add_argument("--nodos", type=int, default=200000, help="Nodos del modelo sintético")
+    parser.add_argument("--consultas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--solo-parser", action="store_true", help="Sólo mide el rendimiento de los parsers")
+    args = parser.parse_args()
+    if not args.modelo and args.nodos > max_claves_sinteticas(6):
+        parser.error(f"--nodos no puede superar {max_claves_sinteticas(6)} (claves distintas posibles del modelo sintético de 6 jugadores)")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = args.modelo or escribir_modelo_sintetico(os.path.join(directorio, "mccfr_6_poker.bin"), args.nodos)
+        comparar_parsers(ruta)
+        if args.solo_parser: return
+        comparar_almacenes(ruta, args.consultas, args.repeticiones)
+        comparar_arranque_mapeado(ruta, args.consultas, args.repeticiones, directorio)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import glob
+import hashlib
+import os
+from typing import Dict, Any, Optional
+from Config import MCCFR_CACHE_DIR, EXTENSION_MODELO_MAPEADO
+from AlmacenNodosMCCFR import AlmacenNodosMCCFR
+from ModeloMCCFRMapeado import ModeloMCCFRMapeado, MccfrMapeadoError, escribir_modelo_mapeado
+
+def ruta_cache_para(file_path: str, cabecera: Dict[str, Any], directorio: str = MCCFR_CACHE_DIR) -> str:
+    """Ruta en caché de un .bin, derivada de su ruta absoluta, tamaño y cabecera (checksum, timestamp)."""
+    ruta_absoluta = os.path.abspath(file_path)
+    firma = f"{ruta_absoluta}|{os.path.getsize(file_path)}|{cabecera['checksum']}|{cabecera['timestamp']}|{cabecera['total_nodos']}"
+    digest = hashlib.sha1(firma.encode('utf-8', errors='replace')).hexdigest()[:16]
+    return os.path.join(directorio, f"{_prefijo_cache(ruta_absoluta)}{digest}{EXTENSION_MODELO_MAPEADO}")
+
+def _prefijo_cache(ruta_absoluta: str) -> str:
+    nombre = os.path.splitext(os.path.basename(ruta_absoluta))[0]
+    ruta_hash = hashlib.sha1(ruta_absoluta.encode('utf-8', errors='replace')).hexdigest()[:8]
+    return f"{nombre}_{ruta_hash}_"
+
+def abrir_desde_cache(file_path: str, cabecera: Dict[str, Any], directorio: str = MCCFR_CACHE_DIR) -> Optional[ModeloMCCFRMapeado]:
+    ruta = ruta_cache_para(file_path, cabecera, directorio)
+    if not os.path.exists(ruta): return None
+    try:
+        return ModeloMCCFRMapeado(ruta)
+    except (MccfrMapeadoError, OSError, ValueError) as e:
+        print(f"     Aviso: entrada de caché inválida '{os.path.basename(ruta)}' ({e}); se regenerará.")
+        return None
+
+def guardar_en_cache(file_path: str, cabecera: Dict[str, Any], almacen: AlmacenNodosMCCFR, directorio: str = MCCFR_CACHE_DIR) -> str:
+    """Escribe la entrada de caché y borra las de versiones anteriores del mismo .bin."""
+    os.makedirs(directorio, exist_ok=True)
+    ruta = ruta_cache_para(file_path, cabecera, directorio)
+    escribir_modelo_mapeado(ruta, cabecera, almacen)
+    for obsoleta in glob.glob(os.path.join(directorio, f"{_prefijo_cache(os.path.abspath(file_path))}*{EXTENSION_MODELO_MAPEADO}")):
+        if obsoleta != ruta:
+            try: os.remove(obsoleta)
+            except OSError: pass
+    return ruta
@@ -1,15 +1,75 @@
 import numpy as np
 import mss
 import cv2
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from Config import CAPTURA_ROI_HABILITADA, CAPTURA_ROI_MARGEN, CAPTURA_ROI_BORDE, CAPTURA_ROI_FRAMES_SIN_MESA
 class CapturadorPantalla:
-    def __init__(self):
+    """Captura el monitor principal o, una vez localizada la mesa, sólo su región.
+
+    La región se fija a partir de la caja 'Principal' del último frame (más un
+    margen) y se vuelve a pantalla completa cuando la mesa toca el borde de la
+    región (se ha movido) o deja de detectarse durante varios frames.
+    """
+    def __init__(self, usar_roi: bool = CAPTURA_ROI_HABILITADA):
         self.sct, self.monitor = None, None
+        self.usar_roi, self.region, self.frames_sin_mesa = usar_roi, None, 0
+        self.abrir_sesion()
+    def abrir_sesion(self):
+        """Crea la sesión de mss; debe llamarse desde el hilo que va a capturar (sus handles son por hilo)."""
         try:
             self.sct = mss.mss()
             self.monitor = self.sct.monitors[1]
-        except mss.exception.ScreenShotError: pass
-    def capturar_frame(self) -> Optional[np.ndarray]:
+        except mss.exception.ScreenShotError: self.sct = None
+    @property
+    def area_captura(self) -> Dict[str, int]: return self.region or self.monitor
+    def capturar_bgra(self, area: Optional[Dict[str, int]] = None) -> Optional[np.ndarray]:
+        """Vista (alto, ancho, 4) sobre el buffer que devuelve mss, sin copiarlo."""
         if not self.sct: return None
-        try: return cv2.cvtColor(np.array(self.sct.grab(self.monitor)), cv2.COLOR_BGRA2BGR)
-        except mss.exception.ScreenShotError: return None
\ No newline at end of file
+        try: captura = self.sct.grab(area or self.area_captura)
+        except mss.exception.ScreenShotError: return None
+        return np.frombuffer(captura.raw, dtype=np.uint8).reshape(captura.height, captura.width, 4)
+    def capturar(self, destino: Optional[np.ndarray] = None) -> Tuple[Optional[np.ndarray], Dict[str, int]]:
+        """Devuelve el frame BGR junto con el área de pantalla a la que corresponden sus coordenadas.
+
+        Con `destino` la conversión se escribe en ese buffer (si tiene el tamaño
+        del área; si no, se reserva uno nuevo), para rotar buffers preasignados.
+        """
+        area = self.area_captura
+        bgra = self.capturar_bgra(area)
+        if bgra is None: return None, area
+        if destino is None or destino.shape[:2] != bgra.shape[:2]: destino = np.empty((bgra.shape[0], bgra.shape[1], 3), dtype=np.uint8)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=destino)
+        return destino, area
+    def capturar_frame(self) -> Optional[np.ndarray]: return self.capturar()[0]
+    def actualizar_region(self, caja_principal: Optional[Tuple[int, int, int, int]], area: Optional[Dict[str, int]] = None) -> Tuple[int, int]:
+        """Ajusta la región a la mesa detectada en el último frame (caja en coordenadas de ese frame).
+
+        `area` es el área con la que se capturó ese frame; si ya no es la actual
+        (frame antiguo todavía en vuelo) se ignora. Devuelve el desplazamiento
+        (dx, dy) que hay que sumar a las coordenadas del frame anterior para
+        expresarlas en las del siguiente; (0, 0) si no cambia.
+        """
+        if not self.usar_roi or self.monitor is None: return 0, 0
+        if area is not None and area != self.area_captura: return 0, 0
+        area = self.area_captura
+        if caja_principal is None:
+            self.frames_sin_mesa += 1
+            if self.region is not None and self.frames_sin_mesa >= CAPTURA_ROI_FRAMES_SIN_MESA: return self._cambiar_region(None, "mesa no detectada")
+            return 0, 0
+        self.frames_sin_mesa = 0
+        x1, y1, x2, y2 = caja_principal
+        if self.region is not None:
+            if min(x1, y1) > CAPTURA_ROI_BORDE and x2 < area['width'] - CAPTURA_ROI_BORDE and y2 < area['height'] - CAPTURA_ROI_BORDE: return 0, 0
+            return self._cambiar_region(None, "la mesa se movió")
+        izquierda = max(self.monitor['left'], area['left'] + x1 - CAPTURA_ROI_MARGEN)
+        arriba = max(self.monitor['top'], area['top'] + y1 - CAPTURA_ROI_MARGEN)
+        derecha = min(self.monitor['left'] + self.monitor['width'], area['left'] + x2 + CAPTURA_ROI_MARGEN)
+        abajo = min(self.monitor['top'] + self.monitor['height'], area['top'] + y2 + CAPTURA_ROI_MARGEN)
+        if derecha - izquierda <= 0 or abajo - arriba <= 0: return 0, 0
+        return self._cambiar_region({"left": int(izquierda), "top": int(arriba), "width": int(derecha - izquierda), "height": int(abajo - arriba)}, "mesa localizada")
+    def _cambiar_region(self, region: Optional[Dict[str, int]], motivo: str) -> Tuple[int, int]:
+        anterior = self.area_captura
+        self.region = region
+        actual = self.area_captura
+        print(f"[Captura] {motivo}: capturando {actual['width']}x{actual['height']} en ({actual['left']}, {actual['top']}).")
+        return anterior['left'] - actual['left'], anterior['top'] - actual['top']
@@ -0,0 +1,52 @@
+from typing import Dict, List, Optional, Tuple
+from Config import TREYS_CATEGORY_MAP, ACCIONES_POKER
+
+RANGOS = "AKQJT98765432"
+
+def clases_mano() -> List[str]:
+    """Las 169 clases de mano preflop con el formato de determinarManoPreflop (AA, AKs, AKo)."""
+    clases = []
+    for i, r1 in enumerate(RANGOS):
+        for j, r2 in enumerate(RANGOS):
+            if i == j: clases.append(r1 + r2)
+            elif i < j: clases.append(f"{r1}{r2}s")
+            else: clases.append(f"{r2}{r1}o")
+    return clases
+
+MANOS = clases_mano() + ["XX"]
+CATEGORIAS = list(dict.fromkeys(TREYS_CATEGORY_MAP.values()))
+POSICIONES = ['BTN', 'SB', 'BB', 'UTG', 'UTG+1', 'UTG+2', 'UTG+3', 'LJ', 'HJ', 'CO', 'MP', 'EP']
+FASES = ['Preflop', 'Flop', 'Turn', 'River']
+ACCIONES_PREVIAS = ACCIONES_POKER + ["Ninguna"]
+
+COMPONENTES = (MANOS, CATEGORIAS, POSICIONES, FASES, ACCIONES_PREVIAS)
+_INDICES: Tuple[Dict[str, int], ...] = tuple({valor: i for i, valor in enumerate(valores)} for valores in COMPONENTES)
+_BASES = tuple(len(valores) for valores in COMPONENTES)
+TOTAL_CODIGOS = _BASES[0] * _BASES[1] * _BASES[2] * _BASES[3] * _BASES[4]
+
+def codificar_infoset(mano: str, categoria: str, posicion: str, fase: str, accion_previa: str) -> int:
+    """Empaqueta los cinco componentes del infoset en un entero de base mixta; -1 si alguno es desconocido."""
+    codigo = 0
+    for valor, indices, base in zip((mano, categoria, posicion, fase, accion_previa), _INDICES, _BASES):
+        indice = indices.get(valor)
+        if indice is None: return -1
+        codigo = codigo * base + indice
+    return codigo
+
+def codificar_clave(clave: str) -> int:
+    partes = clave.split(':')
+    if len(partes) != 5: return -1
+    return codificar_infoset(*partes)
+
+def decodificar_componentes(codigo: int) -> Optional[Tuple[str, str, str, str, str]]:
+    if not (0 <= codigo < TOTAL_CODIGOS): return None
+    componentes = []
+    for valores, base in zip(reversed(COMPONENTES), reversed(_BASES)):
+        codigo, indice = divmod(codigo, base)
+        componentes.append(valores[indice])
+    return tuple(reversed(componentes))
+
+def decodificar_infoset(codigo: int) -> str:
+    """Reconstruye la clave textual (AKs:Par:BTN:Flop:Raise 50%) para mostrarla."""
+    componentes = decodificar_componentes(codigo)
+    return ":".join(componentes) if componentes else ""
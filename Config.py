@@ -4,6 +4,7 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 YOLO_MODEL_PATH = os.path.join(BASE_DIR, './Yolo12n', 'best.pt') 
 MCCFR_MODELS_DIR = os.path.join(BASE_DIR, '../PokerNGPlusPlus/')
 LOGS_DIR = os.path.join(BASE_DIR, 'logs')
+FRAMES_DIR = os.path.join(LOGS_DIR, 'frames')
 
 if not os.path.exists(LOGS_DIR): 
     os.makedirs(LOGS_DIR)
@@ -11,7 +12,78 @@ if not os.path.exists(LOGS_DIR):
 LOOP_DELAY_SECONDS = 0.3
 MCCFR_QUERY_COOLDOWN_SECONDS = 1.0
 YOLO_DEVICE = 'cuda'
+YOLO_BACKEND = 'pytorch'  # 'pytorch', 'onnx' u 'openvino'
+YOLO_IMGSZ = 640
+YOLO_MODELOS_EXPORTADOS = {
+    'onnx': os.path.join(BASE_DIR, './Yolo12n', 'best.onnx'),
+    'openvino': os.path.join(BASE_DIR, './Yolo12n', 'best_openvino_model'),
+}
+YOLO_INT8 = False  # Con backend 'onnx', usa el modelo cuantizado si superó la verificación de recall
+YOLO_MODELO_INT8 = os.path.join(BASE_DIR, './Yolo12n', 'best_int8.onnx')
+CUANTIZACION_FRAMES_CALIBRACION = 200
+CUANTIZACION_CLASES_VIGILADAS = ('ValorCarta', 'Corazon', 'Diamante', 'Espada', 'Trebol', 'TurnoActual')
+CUANTIZACION_MAX_PERDIDA_RECALL = 0.02
 CONFIDENCE_THRESHOLD = 0.45
+DETECCION_DOS_ETAPAS = False  # Pasada gruesa + segunda pasada sobre un mosaico con las cartas ampliadas
+# Coste relativo a una pasada a YOLO_IMGSZ: (320² + 480²) / 640² ≈ 0.81. Con backend exportado se usan modelos
+# de entrada fija a cada tamaño (ExportadorModeloYOLO.py --dos-etapas; se exportan solos si faltan)
+DETECCION_IMGSZ_GRUESA = 320
+DETECCION_IMGSZ_FINA = 480
+DETECCION_CLASES_REGION = ('CartaJugador', 'CartaComunitaria')
+DETECCION_CLASES_FINAS = ('ValorCarta', 'Corazon', 'Diamante', 'Espada', 'Trebol')
+DETECCION_MARGEN_REGION = 6
+DETECCION_ESCALA_MAXIMA = 4.0
+
+CAPTURA_ROI_HABILITADA = True
+CAPTURA_ROI_MARGEN = 40
+CAPTURA_ROI_BORDE = 4
+CAPTURA_ROI_FRAMES_SIN_MESA = 5
+CAPTURA_EN_HILO = True  # Sin efecto con PIPELINE_HABILITADO: la etapa de captura del pipeline ya rota sus propios buffers
+CAPTURA_BUFFER_FRAMES = 3
+CAPTURA_INTERVALO_SEGUNDOS = 0.05
+CAPTURA_VENTANA_METRICAS = 200
+
+CAMBIOS_HABILITADO = True
+CAMBIOS_FILAS = 9
+CAMBIOS_COLUMNAS = 16
+CAMBIOS_LADO_CELDA = 8
+CAMBIOS_UMBRAL = 12
+CAMBIOS_MAX_FRAMES_SIN_PROCESAR = 10
+CAMBIOS_CUANTIZACION_CAJA = 8
+
+OCR_LOTE_HABILITADO = True
+OCR_LOTE_CLASES = ('Stack', 'Apuesta', 'NombreJugador', 'Bote', 'BoteApuesta', 'AccionPoker')
+OCR_CACHE_TAMANO = 512
+# 'Bote' puede añadirse si el cliente no antepone "Pot:"/"Bote:" a la cifra: esas letras no están en la lista permitida
+OCR_CLASES_NUMERICAS = ('Stack', 'Apuesta', 'BoteApuesta')
+OCR_CARACTERES_NUMERICOS = '0123456789.,$€£¥KMkm'  # símbolos y sufijos incluidos para que no se lean como cifras
+OCR_PATRON_NUMERICO = r'^[$€£¥]?\d[\d.,]*[KMkm]?$'
+OCR_NUMERICO_CONFIANZA_MINIMA = 0.5
+RANGOS_PLANTILLAS_PATH = os.path.join(BASE_DIR, 'plantillas_rangos.npz')
+RANGOS_MUESTRAS_DIR = os.path.join(LOGS_DIR, 'rangos')
+RANGOS_UMBRAL_SIMILITUD = 0.9
+RANGOS_MARGEN_MINIMO = 0.05
+RANGOS_GUARDAR_MUESTRAS = False  # Guarda los recortes que resuelve EasyOCR, por rango, para revisarlos y ampliar las plantillas
+
+ASIENTOS_IOU_MINIMO = 0.3
+ASIENTOS_FRAMES_CONFIRMACION = 3  # Frames seguidos que debe aparecer una caja de jugador nueva antes de abrir asiento (y leer su nombre)
+ASIENTOS_FRAMES_OLVIDO = 20
+
+PIPELINE_HABILITADO = True
+PIPELINE_CAPACIDAD_COLAS = 1
+
+FRECUENCIA_ADAPTATIVA = True
+FRECUENCIA_INTERVALOS = {  # segundos entre frames según lo cerca que esté la decisión del héroe
+    'turno_heroe': 0.05,
+    'inminente': 0.05,
+    'normal': LOOP_DELAY_SECONDS,
+    'fuera_de_mano': 1.0,
+    'espera': 1.0,
+    'showdown': 1.0,
+    'sin_principal': 1.5,
+}
+FRECUENCIA_ASIENTOS_INMINENTE = 1
+FRECUENCIA_FACTOR_RETROCESO = 2.0
 
 UI_BACKGROUND_COLOR = "#2E2E2E"
 UI_TEXT_COLOR_NORMAL = "#E0E0E0"
@@ -88,6 +160,18 @@ FORMATO_FLOTANTE = 'd'
 ENDIANNESS_POR_DEFECTO = '<'
 MAX_ACCIONES_POR_NODO = 10000
 MAX_LONGITUD_STRING = 100000
+MCCFR_ALMACEN_COMPACTO = True
+MCCFR_USAR_MODELOS_MAPEADOS = True
+EXTENSION_MODELO_MAPEADO = '.mcci'
+MCCFR_CARGA_PEREZOSA = True
+MCCFR_CARGA_EN_SEGUNDO_PLANO = True
+MCCFR_PRESUPUESTO_MEMORIA_MB = 4096
+MCCFR_PRECARGA_JUGADORES = 6  # Modelo que se empieza a cargar al arrancar (None = ninguno): la primera consulta sin modelos cargados es síncrona
+MCCFR_CARGA_PARALELA = True
+MCCFR_MAX_PROCESOS = None
+MCCFR_USAR_CACHE = True
+MCCFR_CACHE_DIR = os.path.join(LOGS_DIR, 'cache_mccfr')
+MCCFR_INDICE_RESPALDO = True
 
 DEFAULT_SMALL_BLIND = 0.05
 DEFAULT_BIG_BLIND = 0.10
@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+import cv2
+import numpy as np
+import onnx
+from onnxruntime.quantization import CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static
+from ultralytics import YOLO
+from Config import (FRAMES_DIR, YOLO_IMGSZ, YOLO_MODELO_INT8, CONFIDENCE_THRESHOLD, CUANTIZACION_FRAMES_CALIBRACION,
+                    CUANTIZACION_CLASES_VIGILADAS, CUANTIZACION_MAX_PERDIDA_RECALL)
+from ExportadorModeloYOLO import ruta_modelo_exportado, exportar_modelo, ruta_informe_int8
+from LoteDetecciones import LoteDetecciones
+from BenchmarkDetector import rutas_frames, extraer_detecciones, recall_por_clase, comparar_con_referencia
+
+FRACCION_VALIDACION = 4  # uno de cada N frames se reserva para la verificación y no se usa al calibrar
+
+def leer_frames(rutas: List[str]) -> Iterator[np.ndarray]:
+    """Lee los frames de disco de uno en uno: nunca hay más de un frame a resolución completa en memoria."""
+    for ruta in rutas:
+        frame = cv2.imread(ruta)
+        if frame is not None: yield frame
+
+def preprocesar(frame: np.ndarray, imgsz: int = YOLO_IMGSZ) -> np.ndarray:
+    """Letterbox igual que Ultralytics (relleno 114, centrado), BGR->RGB, NCHW float32 en [0, 1]."""
+    alto, ancho = frame.shape[:2]
+    escala = min(imgsz / alto, imgsz / ancho)
+    nuevo_ancho, nuevo_alto = round(ancho * escala), round(alto * escala)
+    lienzo = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    arriba, izquierda = (imgsz - nuevo_alto) // 2, (imgsz - nuevo_ancho) // 2
+    lienzo[arriba:arriba + nuevo_alto, izquierda:izquierda + nuevo_ancho] = cv2.resize(frame, (nuevo_ancho, nuevo_alto), interpolation=cv2.INTER_LINEAR)
+    return np.ascontiguousarray(lienzo[:, :, ::-1].transpose(2, 0, 1))[None].astype(np.float32) / 255.0
+
+class LectorCalibracion(CalibrationDataReader):
+    """Entrega los frames de calibración uno a uno con el nombre de entrada del modelo ONNX.
+
+    Cada frame se lee de disco y se reduce al tamaño de entrada del modelo al
+    pedirlo, así que la calibración no mantiene los frames completos en memoria.
+    """
+    def __init__(self, rutas: List[str], nombre_entrada: str):
+        self.rutas, self.nombre_entrada = rutas, nombre_entrada
+        self._iterador = leer_frames(rutas)
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        frame = next(self._iterador, None)
+        return None if frame is None else {self.nombre_entrada: preprocesar(frame)}
+
+    def rewind(self):
+        self._iterador = leer_frames(self.rutas)
+
+def nodos_postproceso(ruta_onnx: str) -> List[str]:
+    """Nodos no convolucionales de la cabeza Detect (DFL, decodificación de cajas, concat).
+
+    Cuantizar la decodificación de cajas degrada la localización de objetos pequeños
+    como ValorCarta; se dejan en FP32 y sólo se cuantizan las convoluciones de la cabeza.
+    """
+    modelo = onnx.load(ruta_onnx, load_external_data=False)
+    indices = [int(m.group(1)) for nodo in modelo.graph.node for m in [re.match(r'/model\.(\d+)/', nodo.name)] if m]
+    if not indices: return []
+    prefijo = f"/model.{max(indices)}/"
+    return [nodo.name for nodo in modelo.graph.node if nodo.name.startswith(prefijo) and nodo.op_type != 'Conv']
+
+def cuantizar_modelo(ruta_fp32: str, rutas: List[str], ruta_int8: str = YOLO_MODELO_INT8) -> str:
+    nombre_entrada = onnx.load(ruta_fp32, load_external_data=False).graph.input[0].name
+    excluidos = nodos_postproceso(ruta_fp32)
+    print(f"🔧 Cuantizando {os.path.basename(ruta_fp32)} a INT8 con {len(rutas)} frames de calibración ({len(excluidos)} nodos de postproceso en FP32)...")
+    inicio = time.perf_counter()
+    quantize_static(ruta_fp32, ruta_int8, LectorCalibracion(rutas, nombre_entrada), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, calibrate_method=CalibrationMethod.MinMax, nodes_to_exclude=excluidos)
+    print(f"✅ Modelo INT8 guardado en: {ruta_int8} ({time.perf_counter() - inicio:.1f} s)")
+    return ruta_int8
+
+def detectar_frames(ruta_modelo: str, rutas: List[str]) -> List[Any]:
+    modelo = YOLO(ruta_modelo, task='detect')
+    return [extraer_detecciones(LoteDetecciones.desde_resultados(modelo(frame, conf=CONFIDENCE_THRESHOLD, imgsz=YOLO_IMGSZ, verbose=False, device='cpu'))) for frame in leer_frames(rutas)]
+
+def verificar_recall(ruta_fp32: str, ruta_int8: str, rutas: List[str], max_perdida: float = CUANTIZACION_MAX_PERDIDA_RECALL) -> Dict[str, Any]:
+    """Compara el INT8 con las detecciones del FP32 sobre frames no usados al calibrar.
+
+    Los frames guardados no tienen etiquetas, así que el recall se mide frente al
+    modelo FP32: una clase vigilada falla si el INT8 pierde más de max_perdida de
+    las detecciones que el FP32 sí encuentra.
+    """
+    referencia, candidato = detectar_frames(ruta_fp32, rutas), detectar_frames(ruta_int8, rutas)
+    recall = recall_por_clase(referencia, candidato, 0.5)
+    clases = {nombre: {"recall": recall[nombre][0], "referencias": recall[nombre][1], "aprobada": 1.0 - recall[nombre][0] <= max_perdida}
+              for nombre in CUANTIZACION_CLASES_VIGILADAS if nombre in recall}
+    sin_muestras = [nombre for nombre in CUANTIZACION_CLASES_VIGILADAS if nombre not in recall]
+    return {
+        "frames_verificacion": len(referencia),
+        "max_perdida_recall": max_perdida,
+        "map50_vs_fp32": comparar_con_referencia(referencia, candidato, 0.5)[0],
+        "clases": clases,
+        "clases_sin_muestras": sin_muestras,
+        # Una clase vigilada sin ninguna detección de referencia no se puede verificar: no se aprueba
+        "aprobado": bool(clases) and not sin_muestras and all(c["aprobada"] for c in clases.values()),
+    }
+
+def imprimir_informe(informe: Dict[str, Any]):
+    print(f"\nVerificación INT8 frente a FP32 ({informe['frames_verificacion']} frames, pérdida máxima {informe['max_perdida_recall']:.1%}):")
+    print(f"   mAP50 vs FP32: {informe['map50_vs_fp32']:.3f}")
+    for nombre, clase in informe["clases"].items():
+        print(f"   {nombre:<12} recall {clase['recall']:.3f} sobre {clase['referencias']} detecciones {'✅' if clase['aprobada'] else '❌'}")
+    for nombre in informe["clases_sin_muestras"]: print(f"   {nombre:<12} sin detecciones de referencia ❌")
+    print("✅ Modelo INT8 aprobado" if informe["aprobado"] else "❌ Modelo INT8 rechazado: DetectorObjetos seguirá usando FP32")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cuantiza el detector ONNX a INT8 calibrando con frames guardados y verifica el recall por clase")
+    parser.add_argument("--frames", default=FRAMES_DIR, help="Directorio con frames guardados (png/jpg)")
+    parser.add_argument("--max-frames", type=int, default=CUANTIZACION_FRAMES_CALIBRACION, help="Frames máximos de calibración")
+    parser.add_argument("--max-perdida", type=float, default=CUANTIZACION_MAX_PERDIDA_RECALL, help="Pérdida de recall tolerada por clase vigilada")
+    parser.add_argument("--solo-verificar", action="store_true", help="No recuantiza; sólo verifica el modelo INT8 existente")
+    args = parser.parse_args()
+    # Sólo se listan las rutas: los frames se leen de disco al calibrar y al verificar
+    rutas = rutas_frames(args.frames, args.max_frames * FRACCION_VALIDACION // (FRACCION_VALIDACION - 1))
+    if len(rutas) < FRACCION_VALIDACION:
+        print(f"Error: No hay frames suficientes en {args.frames} (se guardan con la tecla de forzar acción)")
+        return 2
+    verificacion = rutas[::FRACCION_VALIDACION]
+    calibracion = [ruta for i, ruta in enumerate(rutas) if i % FRACCION_VALIDACION][:args.max_frames]
+    ruta_fp32 = ruta_modelo_exportado('onnx')
+    if not os.path.exists(ruta_fp32): ruta_fp32 = exportar_modelo('onnx')
+    if not args.solo_verificar: cuantizar_modelo(ruta_fp32, calibracion)
+    elif not os.path.exists(YOLO_MODELO_INT8):
+        print(f"Error: No existe el modelo INT8: {YOLO_MODELO_INT8}")
+        return 2
+    informe = verificar_recall(ruta_fp32, YOLO_MODELO_INT8, verificacion, args.max_perdida)
+    informe["modelo_mtime"] = os.path.getmtime(YOLO_MODELO_INT8)
+    imprimir_informe(informe)
+    with open(ruta_informe_int8(), 'w', encoding='utf-8') as f: json.dump(informe, f, indent=2, ensure_ascii=False)
+    return 0 if informe["aprobado"] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import numpy as np
+import cv2
+from typing import Optional, Tuple
+from Config import CAMBIOS_FILAS, CAMBIOS_COLUMNAS, CAMBIOS_LADO_CELDA, CAMBIOS_UMBRAL, CAMBIOS_MAX_FRAMES_SIN_PROCESAR
+class MapaCambios:
+    """Celdas cambiadas de un frame concreto; inmutable para poder viajar con él entre hilos."""
+    def __init__(self, mapa: np.ndarray, forma_frame: Tuple[int, int]):
+        self.mapa, self.forma_frame = mapa, forma_frame
+    def region_cambio(self, caja: Tuple[int, int, int, int]) -> bool:
+        """Indica si alguna celda que toca la caja cambió respecto al frame procesado anterior."""
+        filas, columnas = self.mapa.shape
+        alto, ancho = self.forma_frame
+        x1, y1, x2, y2 = caja
+        c1, c2 = max(0, x1 * columnas // ancho), min(columnas - 1, max(0, x2 - 1) * columnas // ancho)
+        f1, f2 = max(0, y1 * filas // alto), min(filas - 1, max(0, y2 - 1) * filas // alto)
+        return bool(self.mapa[f1:f2 + 1, c1:c2 + 1].any())
+class DetectorCambios:
+    """Detector barato de cambios entre frames por celdas de una miniatura.
+
+    El frame se reduce a una rejilla de filas x columnas celdas de lado fijo y se
+    compara con la miniatura del último frame procesado (no con el inmediatamente
+    anterior, para que los cambios lentos también terminen superando el umbral).
+    El mapa de celdas cambiadas permite preguntar si la región de una detección
+    cambió desde entonces.
+    """
+    def __init__(self, filas: int = CAMBIOS_FILAS, columnas: int = CAMBIOS_COLUMNAS, umbral: float = CAMBIOS_UMBRAL,
+                 max_frames_sin_procesar: int = CAMBIOS_MAX_FRAMES_SIN_PROCESAR):
+        self.filas, self.columnas, self.umbral, self.max_frames_sin_procesar = filas, columnas, umbral, max_frames_sin_procesar
+        self.referencia: Optional[np.ndarray] = None
+        self.forma_frame: Optional[Tuple[int, int]] = None
+        self.mapa = np.ones((filas, columnas), dtype=bool)
+        self.ultimo_mapa: Optional[MapaCambios] = None
+        self.frames_analizados = self.frames_omitidos = self.omitidos_seguidos = 0
+    def _miniatura(self, frame: np.ndarray) -> np.ndarray:
+        return cv2.resize(frame, (self.columnas * CAMBIOS_LADO_CELDA, self.filas * CAMBIOS_LADO_CELDA), interpolation=cv2.INTER_AREA).astype(np.int16)
+    def debe_procesar(self, frame: np.ndarray) -> bool:
+        """Decide si el frame merece detección; si es así lo toma como nueva referencia."""
+        self.frames_analizados += 1
+        miniatura = self._miniatura(frame)
+        if self.referencia is None or self.forma_frame != frame.shape[:2]:
+            self.mapa = np.ones((self.filas, self.columnas), dtype=bool)
+        else:
+            diferencia = np.abs(miniatura - self.referencia).reshape(self.filas, CAMBIOS_LADO_CELDA, self.columnas, CAMBIOS_LADO_CELDA, -1)
+            # El máximo por celda (y no la media) detecta cambios pequeños como un dígito del stack
+            self.mapa = diferencia.max(axis=(1, 3, 4)) > self.umbral
+            if not self.mapa.any():
+                if self.omitidos_seguidos + 1 < self.max_frames_sin_procesar:
+                    self.omitidos_seguidos += 1
+                    self.frames_omitidos += 1
+                    return False
+                # Refresco forzado: se marca todo como cambiado para que el OCR se repita y no arrastre
+                # lecturas viejas de cambios que la miniatura no llega a ver (un dígito del stack)
+                self.mapa = np.ones((self.filas, self.columnas), dtype=bool)
+        self.referencia, self.forma_frame, self.omitidos_seguidos = miniatura, frame.shape[:2], 0
+        self.ultimo_mapa = MapaCambios(self.mapa, self.forma_frame)
+        return True
+    def region_cambio(self, caja: Tuple[int, int, int, int]) -> bool:
+        return self.ultimo_mapa.region_cambio(caja) if self.ultimo_mapa else True
+    def tasa_omision(self) -> float:
+        return self.frames_omitidos / self.frames_analizados if self.frames_analizados else 0.0
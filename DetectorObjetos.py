@@ -1,17 +1,35 @@
+import os
 import torch
 from ultralytics import YOLO
 import numpy as np
-from typing import List, Any, Optional
-from Config import YOLO_MODEL_PATH, YOLO_DEVICE, CONFIDENCE_THRESHOLD
+from Config import (YOLO_MODEL_PATH, YOLO_DEVICE, CONFIDENCE_THRESHOLD, YOLO_BACKEND, YOLO_IMGSZ, YOLO_INT8, YOLO_MODELO_INT8, LABEL_NAMES,
+                    DETECCION_DOS_ETAPAS, DETECCION_IMGSZ_GRUESA, DETECCION_IMGSZ_FINA, DETECCION_CLASES_REGION, DETECCION_CLASES_FINAS)
+from LoteDetecciones import LoteDetecciones
+from MosaicoRegiones import MosaicoRegiones
+from ExportadorModeloYOLO import ruta_modelo_exportado, exportar_modelo, modelo_int8_verificado
+
+CLASES_REGION = [LABEL_NAMES.index(c) for c in DETECCION_CLASES_REGION]
+CLASES_FINAS = [LABEL_NAMES.index(c) for c in DETECCION_CLASES_FINAS]
 
 class DetectorObjetos:
-    def __init__(self):
+    def __init__(self, backend: str = YOLO_BACKEND, dos_etapas: bool = DETECCION_DOS_ETAPAS):
         self.model = None
         self.device = None
+        self.backend = backend
+        self.es_int8 = False
+        self.dos_etapas = dos_etapas
+        self.modelos_por_imgsz = {}  # backends exportados: un modelo de entrada fija por pasada de la detección en dos etapas
         self._inicializar_modelo()
+        if self.dos_etapas:
+            coste = (DETECCION_IMGSZ_GRUESA ** 2 + DETECCION_IMGSZ_FINA ** 2) / YOLO_IMGSZ ** 2
+            aviso = "⚠️ " if coste >= 1 else ""
+            print(f"{aviso}Detección en dos etapas ({DETECCION_IMGSZ_GRUESA} + {DETECCION_IMGSZ_FINA}): ~{coste:.2f}x una pasada a {YOLO_IMGSZ}")
     
     def _inicializar_modelo(self):
         """Inicializa el modelo YOLO con manejo robusto de errores"""
+        if self.backend != 'pytorch':
+            self._inicializar_modelo_exportado()
+            return
         try:
             # Verificar si CUDA está disponible
             if YOLO_DEVICE == 'cuda' and torch.cuda.is_available():
@@ -39,38 +57,111 @@ class DetectorObjetos:
             print(f"❌ Error al cargar el modelo YOLO: {e}")
             self.model = None
 
-    def detectar(self, frame: np.ndarray) -> List[Any]:
+    def _inicializar_modelo_exportado(self):
+        """Carga el modelo exportado (ONNX Runtime u OpenVINO en CPU), exportándolo si aún no existe"""
+        try:
+            ruta_modelo = ruta_modelo_exportado(self.backend)
+            if self.backend == 'onnx' and YOLO_INT8:
+                if modelo_int8_verificado():
+                    ruta_modelo = YOLO_MODELO_INT8
+                else:
+                    print("⚠️ Modelo INT8 ausente o sin verificación de recall aprobada (ejecutar CuantizadorDetector.py); se usa FP32")
+            if not os.path.exists(ruta_modelo):
+                ruta_modelo = exportar_modelo(self.backend)
+            self.device = 'cpu'
+            print(f"📁 Cargando modelo {self.backend} desde: {ruta_modelo}")
+            self.model = YOLO(ruta_modelo, task='detect')
+            self.es_int8 = ruta_modelo == YOLO_MODELO_INT8
+            print(f"✅ Modelo YOLO ({self.backend}) cargado exitosamente en CPU")
+        except Exception as e:
+            print(f"❌ Error al cargar el modelo {self.backend}: {e}")
+            self.model = None
+            return
+        if self.dos_etapas:
+            self._inicializar_modelos_etapas()
+
+    def _inicializar_modelos_etapas(self):
+        """Los modelos exportados tienen entrada fija: cada pasada necesita el suyo (FP32) para no costar una pasada completa"""
+        try:
+            for imgsz in (DETECCION_IMGSZ_GRUESA, DETECCION_IMGSZ_FINA):
+                ruta_modelo = ruta_modelo_exportado(self.backend, imgsz)
+                if not os.path.exists(ruta_modelo):
+                    ruta_modelo = exportar_modelo(self.backend, imgsz)
+                self.modelos_por_imgsz[imgsz] = YOLO(ruta_modelo, task='detect')
+            if self.es_int8:
+                # Sólo el modelo a YOLO_IMGSZ está cuantizado y verificado; las dos pasadas usan los de su tamaño en FP32
+                print("⚠️ La detección en dos etapas usa modelos FP32: el modelo INT8 verificado no se ejecuta")
+                self.es_int8 = False
+        except Exception as e:
+            print(f"⚠️ Sin modelos {self.backend} para la detección en dos etapas ({e}); se usa una sola pasada")
+            self.modelos_por_imgsz = {}
+            self.dos_etapas = False
+
+    def detectar(self, frame: np.ndarray) -> LoteDetecciones:
         """Detecta objetos en un frame con manejo robusto de errores"""
         if self.model is None:
-            return []
+            return LoteDetecciones.vacio()
         
         if frame is None or frame.size == 0:
-            return []
+            return LoteDetecciones.vacio()
         
+        if self.dos_etapas:
+            return self._detectar_dos_etapas(frame)
+        return self._inferir(frame, YOLO_IMGSZ)
+
+    def _detectar_dos_etapas(self, frame: np.ndarray) -> LoteDetecciones:
+        """Pasada gruesa sobre el frame y otra sobre un mosaico con las cartas ampliadas.
+
+        Los valores y palos que la pasada gruesa encuentra dentro de una carta se
+        sustituyen por los del mosaico; el resto de clases sale de la pasada gruesa.
+        """
+        grueso = self._inferir(frame, DETECCION_IMGSZ_GRUESA)
+        indices_region = np.concatenate([grueso.indices(clase) for clase in CLASES_REGION])
+        if not len(indices_region):
+            return grueso
+        mosaico = MosaicoRegiones(frame, grueso.cajas_enteras[indices_region], lado=DETECCION_IMGSZ_FINA)
+        fino = self._inferir(mosaico.lienzo, DETECCION_IMGSZ_FINA)
+        es_fina = np.isin(fino.clases, CLASES_FINAS)
+        cajas_finas, dentro = mosaico.proyectar(fino.cajas[es_fina])
+        # Se descartan los glifos gruesos cuyo centro cae en una región que ya cubrió el mosaico
+        centros = (grueso.cajas[:, :2] + grueso.cajas[:, 2:]) / 2
+        regiones = mosaico.regiones
+        en_region = ((centros[:, None, 0] >= regiones[None, :, 0]) & (centros[:, None, 0] <= regiones[None, :, 2]) &
+                     (centros[:, None, 1] >= regiones[None, :, 1]) & (centros[:, None, 1] <= regiones[None, :, 3])).any(axis=1)
+        conservar = ~(np.isin(grueso.clases, CLASES_FINAS) & en_region)
+        return LoteDetecciones(
+            np.concatenate((grueso.cajas[conservar], cajas_finas[dentro])),
+            np.concatenate((grueso.clases[conservar], fino.clases[es_fina][dentro])),
+            np.concatenate((grueso.confianzas[conservar], fino.confianzas[es_fina][dentro])),
+        )
+
+    def _inferir(self, imagen: np.ndarray, imgsz: int) -> LoteDetecciones:
         try:
             # Realizar detección con parámetros optimizados
-            results = self.model(
-                frame, 
+            # Los modelos exportados tienen entrada fija: cada imgsz usa su propio modelo
+            results = self.modelos_por_imgsz.get(imgsz, self.model)(
+                imagen, 
                 conf=CONFIDENCE_THRESHOLD,
+                imgsz=imgsz,
                 verbose=False,
                 device=self.device
             )
-            return results
+            return LoteDetecciones.desde_resultados(results)
             
         except torch.cuda.OutOfMemoryError:
             print("⚠️ Sin memoria GPU, intentando con CPU...")
             try:
                 self.model.to('cpu')
                 self.device = 'cpu'
-                results = self.model(frame, conf=CONFIDENCE_THRESHOLD, verbose=False)
-                return results
+                results = self.model(imagen, conf=CONFIDENCE_THRESHOLD, imgsz=imgsz, verbose=False)
+                return LoteDetecciones.desde_resultados(results)
             except Exception as e2:
                 print(f"❌ Error en detección con CPU: {e2}")
-                return []
+                return LoteDetecciones.vacio()
                 
         except Exception as e:
             print(f"❌ Error en detección: {e}")
-            return []
+            return LoteDetecciones.vacio()
     
     def esta_disponible(self) -> bool:
         """Verifica si el detector está disponible"""
@@ -80,5 +171,7 @@ class DetectorObjetos:
         """Retorna información del dispositivo en uso"""
         if self.device == 'cuda':
             return f"GPU: {torch.cuda.get_device_name(0)}"
+        elif self.backend != 'pytorch':
+            return f"CPU ({self.backend}{', INT8' if self.es_int8 else ''})"
         else:
             return "CPU"
\ No newline at end of file
@@ -1,12 +1,13 @@
 import json
 import copy
 import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable
 from UtilidadesGeometria import UtilidadesGeometria
 from UtilidadesTexto import UtilidadesTexto
-from Config import LABEL_NAMES, SUIT_MAP, POSICIONES_POR_JUGADORES, CARD_VALUE_MAP
+from LoteDetecciones import LoteDetecciones, Deteccion
+from RastreadorAsientos import RastreadorAsientos, Asiento
+from Config import LABEL_NAMES, SUIT_MAP, POSICIONES_POR_JUGADORES, CAMBIOS_CUANTIZACION_CAJA, OCR_LOTE_HABILITADO, OCR_LOTE_CLASES, OCR_CLASES_NUMERICAS
 
-MAPA_ETIQUETAS = {i: name for i, name in enumerate(LABEL_NAMES)}
 
 class Jugador:
     def __init__(self, nombre: str):
@@ -92,6 +93,16 @@ class Fase:
         self.bote_antes_ultima_apuesta = 0.0
         self.bote_antes_ultima_apuesta_norm = 0.0
 
+    def renombrarJugador(self, anterior: str, nuevo: str):
+        """Pasa al nombre leído el jugador (y sus acciones) registrado con un nombre provisional"""
+        jugador = self.jugadores.pop(anterior)
+        jugador.nombre = nuevo
+        self.jugadores[nuevo] = jugador
+        self.acciones_realizadas = [(nuevo if n == anterior else n, a, m) for n, a, m in self.acciones_realizadas]
+        for raise_previo in self.historial_raises:
+            if raise_previo["jugador"] == anterior:
+                raise_previo["jugador"] = nuevo
+
     def agregarAccion(self, nombre_jugador: str, accion: str, monto: float = 0.0):
         self.acciones_realizadas.append((nombre_jugador, accion, monto))
         
@@ -190,6 +201,15 @@ class EstadoJuego:
         self.cartas_comunitarias_cache = []
         self.cambio_detectado = False
         self.apuestas_totales_anteriores = 0
+        self.caja_principal = None
+        self.detector_cambios = None
+        self.textos_frame_anterior = {}
+        self.textos_frame_actual = {}
+        self.lecturas_reutilizadas = 0
+        self.textos_precargados = {}
+        self.lecturas_en_lote = 0
+        self.rastreador_asientos = RastreadorAsientos()
+        self.lecturas_nombre = 0
 
     def obtenerIndiceFase(self, nombre_fase: str) -> int:
         try:
@@ -197,28 +217,69 @@ class EstadoJuego:
         except ValueError:
             return -1
 
-    def extraerDetecciones(self, resultados_yolo: List[Any], frame: Any) -> Dict[str, List[Dict]]:
-        detecciones = {name: [] for name in LABEL_NAMES}
-        if not resultados_yolo: 
-            return detecciones
-        
-        result = resultados_yolo[0]
-        boxes = result.boxes.xyxy.cpu().numpy()
-        classes = result.boxes.cls.cpu().numpy()
-        
-        for box, cls_id in zip(boxes, classes):
-            etiqueta = MAPA_ETIQUETAS.get(int(cls_id))
-            if etiqueta:
-                caja_segura = tuple(map(int, box))
-                detecciones[etiqueta].append({
-                    "box": caja_segura, 
-                    "center": UtilidadesGeometria.get_center(caja_segura), 
-                    "crop": frame[caja_segura[1]:caja_segura[3], caja_segura[0]:caja_segura[2]]
-                })
-        return detecciones
+    def extraerDetecciones(self, lote: LoteDetecciones, frame: Any) -> Dict[str, List[Deteccion]]:
+        # Vistas perezosas: los recortes de clases que nunca se leen (JugadorAusente, Ganador...) no llegan a crearse
+        if not lote: 
+            return {name: [] for name in LABEL_NAMES}
+        return {
+            etiqueta: [Deteccion(lote, i, frame, self.detector_cambios) for i in lote.indices(clase).tolist()]
+            for clase, etiqueta in enumerate(LABEL_NAMES)
+        }
+
+    def claveTexto(self, nombre_lector: str, kwargs: Dict, caja: Tuple[int, int, int, int]) -> Tuple:
+        return (nombre_lector, tuple(sorted(kwargs.items())), tuple(v // CAMBIOS_CUANTIZACION_CAJA for v in caja))
+
+    def leerTexto(self, deteccion: Deteccion, lector: Optional[Callable] = None, **kwargs) -> Any:
+        """OCR de una detección; si su región no cambió desde el último frame procesado se reutiliza la lectura anterior"""
+        lector = lector or self.procesador_ocr.get_text_from_image
+        clave = self.claveTexto(lector.__name__, kwargs, deteccion['box'])
+        if not deteccion.get('cambio', True) and clave in self.textos_frame_anterior:
+            texto = self.textos_frame_anterior[clave]
+            self.lecturas_reutilizadas += 1
+        elif not kwargs.get('es_valor_carta') and lector.__name__ in ('get_text_from_image', 'procesar_accion_poker') and (bool(kwargs.get('es_numerico')), deteccion['box']) in self.textos_precargados:
+            texto = self.textos_precargados[(bool(kwargs.get('es_numerico')), deteccion['box'])]
+            if lector.__name__ == 'procesar_accion_poker':
+                texto = self.procesador_ocr.interpretar_accion_poker(texto)
+        else:
+            texto = lector(deteccion['crop'], **kwargs)
+        self.textos_frame_actual[clave] = texto
+        return texto
+
+    def precargarTextos(self, detecciones: Dict[str, List[Deteccion]]):
+        """Lee en una llamada de OCR por tipo (numérico / texto) los recortes del frame que no se puedan reutilizar del anterior.
+
+        Las lecturas se guardan por (numérico, caja): dos clases con la misma caja leídas de forma distinta no se pisan.
+        """
+        self.textos_precargados = {}
+        if not OCR_LOTE_HABILITADO or not hasattr(self.procesador_ocr, 'leer_lote'):
+            return
+        pendientes = {True: [], False: []}
+        cajas_con_nombre = self.rastreador_asientos.cajas_con_nombre(self.id_mano_actual)
+        for clase in OCR_LOTE_CLASES:
+            nombre_lector, kwargs = self.lectorPorClase(clase)
+            pendientes[clase in OCR_CLASES_NUMERICAS].extend(
+                d for d in detecciones.get(clase, [])
+                if (d['cambio'] or self.claveTexto(nombre_lector, kwargs, d['box']) not in self.textos_frame_anterior)
+                and not (clase == 'NombreJugador' and any(UtilidadesGeometria.is_contained(d['box'], c) for c in cajas_con_nombre))
+            )
+        for numerico, lote in pendientes.items():
+            if lote:
+                textos = self.procesador_ocr.leer_lote([d['crop'] for d in lote], numerico=numerico)
+                self.textos_precargados.update(((numerico, d['box']), texto) for d, texto in zip(lote, textos))
+                self.lecturas_en_lote += len(lote)
 
-    def parsearCartaDeComponentes(self, deteccion_valor: Dict, deteccion_palo: Dict) -> Optional[str]:
-        texto_valor = self.procesador_ocr.get_text_from_image(deteccion_valor['crop'], es_valor_carta=True)
+    @staticmethod
+    def lectorPorClase(clase: str) -> Tuple[str, Dict]:
+        """Lector y argumentos con los que leerTexto lee cada clase (deben coincidir para reutilizar lecturas)"""
+        if clase == 'AccionPoker':
+            return 'procesar_accion_poker', {}
+        return 'get_text_from_image', ({'es_numerico': True} if clase in OCR_CLASES_NUMERICAS else {})
+
+    def leerNumero(self, deteccion: Deteccion, clase: str) -> str:
+        return self.leerTexto(deteccion, **self.lectorPorClase(clase)[1])
+
+    def parsearCartaDeComponentes(self, deteccion_valor: Deteccion, deteccion_palo: Dict) -> Optional[str]:
+        texto_valor = self.leerTexto(deteccion_valor, es_valor_carta=True)
         etiqueta_palo = deteccion_palo['label']
         valor = UtilidadesTexto.clean_card_value(texto_valor)
         palo = SUIT_MAP.get(etiqueta_palo)
@@ -226,7 +287,7 @@ class EstadoJuego:
             return f"{valor}{palo}"
         return None
 
-    def identificarCartasEnCajas(self, cajas_cartas: List[Dict], todas_detecciones: Dict) -> List[str]:
+    def identificarCartasEnCajas(self, cajas_cartas: List[Deteccion], todas_detecciones: Dict) -> List[str]:
         cartas = []
         for caja_carta in cajas_cartas:
             valores_dentro = [
@@ -251,7 +312,7 @@ class EstadoJuego:
         
         apuestas_detectadas = []
         for deteccion_apuesta in detecciones.get('Apuesta', []):
-            texto_apuesta = self.procesador_ocr.get_text_from_image(deteccion_apuesta['crop'])
+            texto_apuesta = self.leerNumero(deteccion_apuesta, 'Apuesta')
             valor_apuesta = UtilidadesTexto.clean_monetary_value(texto_apuesta)
             if valor_apuesta is not None and valor_apuesta > 0:
                 apuestas_detectadas.append(valor_apuesta)
@@ -426,7 +487,7 @@ class EstadoJuego:
         
         return "Raise Min"
 
-    def actualizarJugador(self, jugador: Jugador, deteccion_jugador: Dict, detecciones: Dict, tipo_jugador: str):
+    def actualizarJugador(self, jugador: Jugador, deteccion_jugador: Deteccion, detecciones: Dict, tipo_jugador: str):
         # Guardar estado anterior
         jugador.estado_anterior = jugador.estado
         jugador.stack_anterior = jugador.stack
@@ -441,7 +502,7 @@ class EstadoJuego:
         
         # Actualizar stack
         texto_stack = next(
-            (self.procesador_ocr.get_text_from_image(s['crop']) 
+            (self.leerNumero(s, 'Stack') 
              for s in detecciones.get('Stack', []) 
              if UtilidadesGeometria.is_contained(s['box'], deteccion_jugador['box'])), 
             None
@@ -461,7 +522,7 @@ class EstadoJuego:
         
         # Actualizar apuesta
         texto_apuesta = next(
-            (self.procesador_ocr.get_text_from_image(a['crop']) 
+            (self.leerNumero(a, 'Apuesta') 
              for a in detecciones.get('Apuesta', []) 
              if UtilidadesGeometria.euclidean_distance(a['center'], deteccion_jugador['center']) < 150), 
             None
@@ -572,7 +633,7 @@ class EstadoJuego:
             
             if jugador_cercano:
                 # Extraer el texto de la acción
-                texto_accion = self.procesador_ocr.procesar_accion_poker(deteccion_accion['crop'])
+                texto_accion = self.leerTexto(deteccion_accion, self.procesador_ocr.procesar_accion_poker)
                 if texto_accion:
                     print(f"[ACCION_DETECTADA] {jugador_cercano}: {texto_accion}")
                     # Verificar si esta acción ya fue registrada
@@ -745,7 +806,7 @@ class EstadoJuego:
     def extraerTextoAccionPoker(self, jugador: Jugador, detecciones: Dict) -> Optional[str]:
         for deteccion_accion in detecciones.get('AccionPoker', []):
             if UtilidadesGeometria.is_contained(deteccion_accion['box'], jugador.box):
-                return self.procesador_ocr.get_text_from_image(deteccion_accion['crop'])
+                return self.leerTexto(deteccion_accion)
         return None
 
     def detectarCambioSignificativo(self, detecciones: Dict) -> bool:
@@ -773,13 +834,22 @@ class EstadoJuego:
         
         return False
 
-    def actualizarDesdeDetecciones(self, resultados_yolo: List[Any], frame: Any):
+    def actualizarDesdeDetecciones(self, lote: LoteDetecciones, frame: Any, detector_cambios: Any = None):
         self.fase_anterior = copy.deepcopy(self.fase_actual)
-        detecciones = self.extraerDetecciones(resultados_yolo, frame)
+        self.detector_cambios = detector_cambios
+        self.textos_frame_anterior, self.textos_frame_actual = self.textos_frame_actual, {}
+        detecciones = self.extraerDetecciones(lote, frame)
+        self.caja_principal = max(
+            (d['box'] for d in detecciones.get('Principal', [])), key=UtilidadesGeometria.get_area, default=None
+        )
         
         if not detecciones.get('Principal'):
             self.fase_actual = None
             return
+        tipos_jugador = ['JugadorPrincipal', 'JugadorActivo', 'JugadorNoActivo', 'JugadorAusente']
+        detecciones_jugador = [(tipo, d) for tipo in tipos_jugador for d in detecciones.get(tipo, [])]
+        asientos = self.rastreador_asientos.actualizar([d['box'] for _, d in detecciones_jugador])
+        self.precargarTextos(detecciones)
 
         todas_etiquetas_fase = self.secuencia_fases + ['Espera']
         etiqueta_fase_detectada = next(
@@ -837,21 +907,24 @@ class EstadoJuego:
         self.detectarCambioSignificativo(detecciones)
         self.determinarCiegasYNormalizacion(detecciones, nombre_fase)
         
-        tipos_jugador = ['JugadorPrincipal', 'JugadorActivo', 'JugadorNoActivo', 'JugadorAusente']
         jugadores_activos_detectados = []
         
-        for tipo in tipos_jugador:
-            for deteccion_jugador in detecciones.get(tipo, []):
-                nombre = self.obtenerNombreJugador(deteccion_jugador, detecciones)
-                
-                if nombre not in self.fase_actual.jugadores:
-                    self.fase_actual.jugadores[nombre] = Jugador(nombre)
-                
-                jugador = self.fase_actual.jugadores[nombre]
-                self.actualizarJugador(jugador, deteccion_jugador, detecciones, tipo)
-                
-                if jugador.estado == 'activo':
-                    jugadores_activos_detectados.append(jugador)
+        for (tipo, deteccion_jugador), asiento in zip(detecciones_jugador, asientos):
+            if asiento is None:  # caja aún sin confirmar como asiento
+                continue
+            anterior = asiento.nombre
+            nombre = self.obtenerNombreJugador(deteccion_jugador, detecciones, asiento)
+            
+            if anterior and anterior != nombre and anterior in self.fase_actual.jugadores and nombre not in self.fase_actual.jugadores:
+                self.fase_actual.renombrarJugador(anterior, nombre)
+            if nombre not in self.fase_actual.jugadores:
+                self.fase_actual.jugadores[nombre] = Jugador(nombre)
+            
+            jugador = self.fase_actual.jugadores[nombre]
+            self.actualizarJugador(jugador, deteccion_jugador, detecciones, tipo)
+            
+            if jugador.estado == 'activo':
+                jugadores_activos_detectados.append(jugador)
 
         if nombre_fase == 'PreFlop' or not self.fase_actual.posiciones_determinadas:
             self.fase_actual.numero_jugadores_mesa = len(jugadores_activos_detectados)
@@ -872,39 +945,42 @@ class EstadoJuego:
         self.cambio_detectado = True
         self.apuestas_totales_anteriores = 0
 
-    def obtenerNombreJugador(self, deteccion_jugador: Dict, detecciones: Dict) -> str:
-        if self.fase_actual:
-            for jugador_existente in self.fase_actual.jugadores.values():
-                distancia = UtilidadesGeometria.euclidean_distance(
-                    jugador_existente.center, deteccion_jugador['center']
-                )
-                if distancia < 100:
-                    return jugador_existente.nombre
+    def obtenerNombreJugador(self, deteccion_jugador: Deteccion, detecciones: Dict, asiento: Asiento) -> str:
+        """Nombre del asiento; el OCR sólo se hace si aún no se leyó en esta mano (o la lectura falló)"""
+        if asiento.nombre_vigente(self.id_mano_actual):
+            return asiento.nombre
         
-        texto_nombre = next(
-            (self.procesador_ocr.get_text_from_image(n['crop']) 
-             for n in detecciones.get('NombreJugador', []) 
+        caja_nombre = next(
+            (n for n in detecciones.get('NombreJugador', []) 
              if UtilidadesGeometria.is_contained(n['box'], deteccion_jugador['box'])), 
             None
         )
-        nombre = UtilidadesTexto.clean_player_name(texto_nombre) if texto_nombre else ""
-        return nombre if nombre else f"Jugador_{deteccion_jugador['center'][0]}"
+        if caja_nombre is not None:
+            self.lecturas_nombre += 1
+            texto_nombre = self.leerTexto(caja_nombre)
+            nombre = UtilidadesTexto.clean_player_name(texto_nombre) if texto_nombre else ""
+            if nombre:
+                asiento.nombre, asiento.mano_nombre = nombre, self.id_mano_actual
+        # Sin lectura válida se conserva el nombre anterior del asiento y se reintenta en el siguiente frame
+        if not asiento.nombre:
+            asiento.nombre = f"Jugador_{asiento.id}"
+        return asiento.nombre
 
     def construirEstadoActual(self, detecciones: Dict, nombre_fase: str):
         if not self.fase_actual:
             return
             
         # Procesar bote
-        texto_bote = self.procesador_ocr.get_text_from_image(
-            detecciones['Bote'][0]['crop']
+        texto_bote = self.leerNumero(
+            detecciones['Bote'][0], 'Bote'
         ) if detecciones.get('Bote') else ""
         bote_raw = UtilidadesTexto.limpiarTextoBote(texto_bote) or 0.0
         self.fase_actual.bote_total = bote_raw
         self.fase_actual.bote_total_normalizado = self.normalizarEnBB(bote_raw)
         
         # Procesar bote apuesta
-        texto_bote_apuesta = self.procesador_ocr.get_text_from_image(
-            detecciones['BoteApuesta'][0]['crop']
+        texto_bote_apuesta = self.leerNumero(
+            detecciones['BoteApuesta'][0], 'BoteApuesta'
         ) if detecciones.get('BoteApuesta') else ""
         bote_apuesta_raw = UtilidadesTexto.clean_monetary_value(texto_bote_apuesta) or 0.0
         self.fase_actual.bote_apuesta = bote_apuesta_raw
@@ -965,6 +1041,18 @@ class EstadoJuego:
         
         self.fase_actual.acciones_realizadas = acciones_limpias
 
+    def desplazarCoordenadas(self, dx: int, dy: int):
+        """Traslada las posiciones guardadas cuando cambia la región capturada, para seguir emparejando jugadores"""
+        if dx == 0 and dy == 0:
+            return
+        self.rastreador_asientos.desplazar(dx, dy)
+        if not self.fase_actual:
+            return
+        for jugador in self.fase_actual.jugadores.values():
+            jugador.center = (jugador.center[0] + dx, jugador.center[1] + dy)
+            x1, y1, x2, y2 = jugador.box
+            jugador.box = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+
     def hayJugadorPrincipal(self) -> bool:
         if not self.fase_actual:
             return False
@@ -979,6 +1067,22 @@ class EstadoJuego:
     def necesitaAccion(self) -> bool:
         return self.esTurnoHeroe()
 
+    def asientosHastaTurnoHeroe(self) -> Optional[int]:
+        """Jugadores activos que quedan por actuar antes del héroe (0 = turno del héroe); None si no se puede saber"""
+        if not self.fase_actual or not self.fase_actual.posiciones_determinadas:
+            return None
+        activos = sorted((j for j in self.fase_actual.jugadores.values() if j.estado == 'activo'), key=lambda j: j.posicion_indice)
+        indice_heroe = next((i for i, j in enumerate(activos) if j.es_heroe), None)
+        indice_turno = next((i for i, j in enumerate(activos) if j.es_turno_actual), None)
+        if indice_heroe is None or indice_turno is None:
+            return None
+        return (indice_heroe - indice_turno) % len(activos)
+
+    def heroeSigueEnMano(self) -> bool:
+        if not self.fase_actual:
+            return False
+        return any(j.es_heroe and j.estado == 'activo' for j in self.fase_actual.jugadores.values())
+
     def hubocambioSignificativo(self) -> bool:
         if self.cambio_detectado:
             self.cambio_detectado = False
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import shutil
+from ultralytics import YOLO
+from Config import YOLO_MODEL_PATH, YOLO_IMGSZ, YOLO_MODELOS_EXPORTADOS, YOLO_MODELO_INT8, DETECCION_IMGSZ_GRUESA, DETECCION_IMGSZ_FINA
+
+BACKENDS_EXPORTABLES = tuple(YOLO_MODELOS_EXPORTADOS.keys())
+
+def ruta_modelo_exportado(backend: str, imgsz: int = YOLO_IMGSZ) -> str:
+    """Ruta del modelo exportado; los de otro tamaño de entrada (pasadas de la detección en dos etapas) llevan el tamaño en el nombre"""
+    if imgsz == YOLO_IMGSZ: return YOLO_MODELOS_EXPORTADOS[backend]
+    base = f"{os.path.splitext(YOLO_MODEL_PATH)[0]}_{imgsz}"
+    return base + ('.onnx' if backend == 'onnx' else '_openvino_model')
+
+def ruta_informe_int8() -> str:
+    return os.path.splitext(YOLO_MODELO_INT8)[0] + '.json'
+
+def modelo_int8_verificado() -> bool:
+    """True si el modelo INT8 existe y su último informe de CuantizadorDetector lo aprobó."""
+    if not os.path.exists(YOLO_MODELO_INT8) or not os.path.exists(ruta_informe_int8()): return False
+    try:
+        with open(ruta_informe_int8(), encoding='utf-8') as f: informe = json.load(f)
+    except (OSError, ValueError): return False
+    return bool(informe.get("aprobado")) and informe.get("modelo_mtime") == os.path.getmtime(YOLO_MODELO_INT8)
+
+def exportar_modelo(backend: str, imgsz: int = YOLO_IMGSZ) -> str:
+    """Exporta best.pt al formato del backend con tamaño de entrada fijo y devuelve la ruta generada.
+
+    Ultralytics escribe el resultado junto al .pt (best.onnx, best_openvino_model/),
+    que es donde DetectorObjetos lo busca. Para otro imgsz se exporta una copia
+    del .pt (best_320.pt -> best_320.onnx) para no pisar el modelo principal.
+    """
+    if backend not in BACKENDS_EXPORTABLES: raise ValueError(f"Backend no exportable: {backend}")
+    print(f"📦 Exportando {os.path.basename(YOLO_MODEL_PATH)} a {backend} (imgsz={imgsz})...")
+    opciones = {"simplify": True} if backend == 'onnx' else {}
+    origen = YOLO_MODEL_PATH
+    if imgsz != YOLO_IMGSZ:
+        origen = f"{os.path.splitext(YOLO_MODEL_PATH)[0]}_{imgsz}.pt"
+        shutil.copyfile(YOLO_MODEL_PATH, origen)
+    try:
+        ruta = YOLO(origen).export(format=backend, imgsz=imgsz, dynamic=False, half=False, device='cpu', **opciones)
+    finally:
+        if origen != YOLO_MODEL_PATH: os.remove(origen)
+    print(f"✅ Modelo exportado en: {ruta}")
+    return str(ruta)
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta el modelo YOLO a ONNX u OpenVINO para inferencia en CPU")
+    parser.add_argument("backends", nargs="*", choices=BACKENDS_EXPORTABLES, default='onnx', help="Formatos a exportar (por defecto onnx)")
+    parser.add_argument("--imgsz", type=int, default=YOLO_IMGSZ, help="Tamaño fijo de entrada del modelo exportado")
+    parser.add_argument("--dos-etapas", action="store_true", help="Exporta también los modelos de las pasadas gruesa y fina (DETECCION_DOS_ETAPAS)")
+    args = parser.parse_args()
+    # argparse valida el valor por defecto contra choices: una lista no pasaría, así que llega como cadena
+    backends = [args.backends] if isinstance(args.backends, str) else args.backends
+    for backend in backends:
+        exportar_modelo(backend, args.imgsz)
+        if args.dos_etapas:
+            for imgsz in (DETECCION_IMGSZ_GRUESA, DETECCION_IMGSZ_FINA): exportar_modelo(backend, imgsz)
+
+if __name__ == '__main__':
+    main()
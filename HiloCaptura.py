@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from Config import CAPTURA_BUFFER_FRAMES, CAPTURA_INTERVALO_SEGUNDOS, CAPTURA_VENTANA_METRICAS
+from CapturadorPantalla import CapturadorPantalla
+class HiloCaptura(threading.Thread):
+    """Productor de frames: captura continuamente en un anillo de buffers preasignados.
+
+    El consumidor recibe siempre el frame más reciente; los que se sobrescriben sin
+    haberse consumido cuentan como descartados. El buffer entregado no se reutiliza
+    hasta la siguiente llamada a tomar_frame, así que sus recortes siguen siendo válidos.
+    """
+    def __init__(self, capturador: CapturadorPantalla, shared_state: Dict[str, Any], num_buffers: int = CAPTURA_BUFFER_FRAMES,
+                 intervalo: float = CAPTURA_INTERVALO_SEGUNDOS):
+        super().__init__(daemon=True)
+        self.capturador, self.shared_state, self.intervalo = capturador, shared_state, intervalo
+        # Con tres buffers siempre queda uno libre: el entregado y el último publicado no se tocan
+        self.num_buffers = max(3, num_buffers)
+        self.buffers: List[Optional[np.ndarray]] = [None] * self.num_buffers
+        self.marcas = [0.0] * self.num_buffers
+        self.areas: List[Optional[Dict[str, int]]] = [None] * self.num_buffers
+        self.ultimo, self.en_uso, self.pendiente = -1, -1, False
+        self.capturados = self.descartados = self.consumidos = 0
+        self.edades = deque(maxlen=CAPTURA_VENTANA_METRICAS)
+        self._lock = threading.Lock()
+        self._nuevo = threading.Event()
+    def run(self):
+        self.capturador.abrir_sesion()
+        while self.shared_state.get('running', True):
+            inicio = time.perf_counter()
+            if not self.shared_state.get('paused', False): self._capturar()
+            time.sleep(max(0.0, self.intervalo - (time.perf_counter() - inicio)))
+    def _capturar(self):
+        marca = time.perf_counter()
+        with self._lock: slot = next(i for i in range(self.num_buffers) if i != self.ultimo and i != self.en_uso)
+        frame, area = self.capturador.capturar(self.buffers[slot])
+        if frame is None: return
+        self.buffers[slot] = frame
+        with self._lock:
+            if self.pendiente: self.descartados += 1
+            self.ultimo, self.pendiente, self.marcas[slot], self.areas[slot] = slot, True, marca, area
+            self.capturados += 1
+        self._nuevo.set()
+    def tomar_frame(self, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], float, Optional[Dict[str, int]]]:
+        """Devuelve (frame más reciente aún no consumido, instante de captura, área capturada) o (None, 0.0, None) si no llega ninguno."""
+        limite = time.perf_counter() + timeout
+        while True:
+            with self._lock:
+                if self.pendiente:
+                    self.en_uso, self.pendiente = self.ultimo, False
+                    self.consumidos += 1
+                    return self.buffers[self.ultimo], self.marcas[self.ultimo], self.areas[self.ultimo]
+                self._nuevo.clear()
+            restante = limite - time.perf_counter()
+            if restante <= 0 or not self._nuevo.wait(restante): return None, 0.0, None
+    def registrar_edad(self, marca: float):
+        """Anota la edad de un frame al terminar de procesarlo (captura -> decisión)."""
+        with self._lock: self.edades.append(time.perf_counter() - marca)
+    def metricas(self) -> Dict[str, float]:
+        with self._lock: edades, capturados, descartados, consumidos = sorted(self.edades), self.capturados, self.descartados, self.consumidos
+        return {
+            "capturados": capturados,
+            "consumidos": consumidos,
+            "descartados": descartados,
+            "tasa_descarte": descartados / capturados if capturados else 0.0,
+            "edad_media_ms": 1000 * sum(edades) / len(edades) if edades else 0.0,
+            "edad_p95_ms": 1000 * edades[int(0.95 * (len(edades) - 1))] if edades else 0.0,
+        }
@@ -0,0 +1,127 @@
+import numpy as np
+from typing import Any, Dict, List, Sequence, Tuple
+from CodificadorInfoset import COMPONENTES, MANOS, POSICIONES, ACCIONES_PREVIAS, RANGOS, TOTAL_CODIGOS, codificar_clave
+
+NIVELES_RELAJACION = ("exacto", "accion_previa", "grupo_posicion", "mano_vecina")
+SIN_RESPALDO = 255
+
+# Grupos de acción previa: dentro de cada uno se prueba primero la más parecida
+GRUPOS_ACCION_PREVIA = [
+    ["Check", "Ninguna"], ["Call"], ["Fold"],
+    ["Raise Min", "Raise x2", "Raise 33%", "Raise 50%"],
+    ["Raise x3", "Raise 75%", "Raise 100%"],
+    ["Raise 150%", "Raise 200%", "Raise 250%", "Raise 300%", "All-In"],
+]
+GRUPOS_POSICION = [["SB", "BB"], ["UTG", "UTG+1", "UTG+2", "UTG+3", "EP"], ["LJ", "MP", "HJ"], ["CO", "BTN"]]
+MAX_MANOS_VECINAS = 4
+
+def _alternativas_por_grupo(valores: Sequence[str], grupos: List[List[str]]) -> List[List[str]]:
+    """Para cada valor, el resto de su grupo ordenado por cercanía dentro del grupo."""
+    alternativas = []
+    for valor in valores:
+        grupo = next((g for g in grupos if valor in g), [valor])
+        posicion = grupo.index(valor)
+        alternativas.append(sorted((v for v in grupo if v != valor), key=lambda v: abs(grupo.index(v) - posicion)))
+    return alternativas
+
+def manos_vecinas(mano: str) -> List[str]:
+    """Clases de mano más próximas: pareja contigua, kicker contiguo y la misma mano con el otro palo."""
+    if mano == "XX": return []
+    alto, bajo = RANGOS.index(mano[0]), RANGOS.index(mano[1])
+    if alto == bajo:
+        candidatas = [RANGOS[alto + d] * 2 for d in (1, -1, 2, -2) if 0 <= alto + d < len(RANGOS)]
+    else:
+        sufijo, otro = mano[2], "o" if mano[2] == "s" else "s"
+        candidatas = [f"{mano[0]}{RANGOS[bajo + d]}{sufijo}" for d in (-1, 1) if alto < bajo + d < len(RANGOS)]
+        candidatas.insert(1, f"{mano[:2]}{otro}")
+    return candidatas[:MAX_MANOS_VECINAS]
+
+def _tabla_alternativas(valores: Sequence[str], alternativas: List[List[str]]) -> np.ndarray:
+    """Matriz (valor, columna) con el propio valor en la columna 0 y -1 como relleno."""
+    indices = {v: i for i, v in enumerate(valores)}
+    ancho = 1 + max(len(a) for a in alternativas)
+    tabla = np.full((len(valores), ancho), -1, dtype=np.int64)
+    for i, alts in enumerate(alternativas):
+        fila = [i] + [indices[a] for a in alts if a in indices]
+        tabla[i, :len(fila)] = fila
+    return tabla
+
+TABLA_MANOS = _tabla_alternativas(MANOS, [manos_vecinas(m) for m in MANOS])
+TABLA_POSICIONES = _tabla_alternativas(POSICIONES, _alternativas_por_grupo(POSICIONES, GRUPOS_POSICION))
+TABLA_ACCIONES = _tabla_alternativas(ACCIONES_PREVIAS, _alternativas_por_grupo(ACCIONES_PREVIAS, GRUPOS_ACCION_PREVIA))
+
+def _pasos(bases: Sequence[int]) -> List[int]:
+    pasos, acumulado = [], 1
+    for base in reversed(bases):
+        pasos.append(acumulado)
+        acumulado *= base
+    return pasos[::-1]
+
+PASOS = _pasos([len(valores) for valores in COMPONENTES])
+
+def mascara_entrenados(nodos: Any) -> np.ndarray:
+    """Vector booleano sobre todos los códigos con True en los infosets presentes en el modelo."""
+    tabla = getattr(nodos, 'tabla_codigos', None)
+    if tabla is None: tabla = getattr(nodos, 'indice_codigos', None)
+    if tabla is not None: return np.frombuffer(tabla, dtype=np.int32) >= 0
+    entrenados = np.zeros(TOTAL_CODIGOS, dtype=bool)
+    codigos = [c for c in (codificar_clave(clave) for clave in nodos.keys()) if c >= 0]
+    entrenados[codigos] = True
+    return entrenados
+
+class IndiceRespaldoInfoset:
+    """Índice precalculado código de infoset -> infoset entrenado más cercano.
+
+    Se construye una vez al cargar el modelo recorriendo todos los códigos con
+    relajaciones crecientes: primero la acción previa dentro de su grupo, luego
+    la posición dentro de su grupo (con cualquier acción previa del grupo) y por
+    último una mano vecina. La consulta es un acceso a dos arrays.
+    """
+    def __init__(self, entrenados: np.ndarray):
+        codigos = np.arange(TOTAL_CODIGOS, dtype=np.int64)
+        self.respaldo = np.where(entrenados, codigos, -1).astype(np.int32)
+        self.nivel = np.where(entrenados, 0, SIN_RESPALDO).astype(np.uint8)
+        pendientes = np.flatnonzero(~entrenados)
+        valores = [(pendientes // PASOS[i]) % len(COMPONENTES[i]) for i in (0, 2, 4)]
+        tablas, pasos = (TABLA_MANOS, TABLA_POSICIONES, TABLA_ACCIONES), (PASOS[0], PASOS[2], PASOS[4])
+        columnas_mano, columnas_posicion, columnas_accion = (tabla.shape[1] for tabla in tablas)
+        niveles = (
+            (1, [(0, 0, a) for a in range(1, columnas_accion)]),
+            (2, [(0, p, a) for p in range(1, columnas_posicion) for a in range(columnas_accion)]),
+            (3, [(m, p, a) for m in range(1, columnas_mano) for p in range(columnas_posicion) for a in range(columnas_accion)]),
+        )
+        for nivel, combinaciones in niveles:
+            for columnas in combinaciones:
+                if pendientes.size == 0: return
+                candidato = pendientes.copy()
+                validos = np.ones(pendientes.size, dtype=bool)
+                for tabla, columna, actual, paso in zip(tablas, columnas, valores, pasos):
+                    if columna == 0: continue
+                    alternativa = tabla[actual, columna]
+                    validos &= alternativa >= 0
+                    candidato += (alternativa - actual) * paso
+                aciertos = validos & entrenados[np.where(validos, candidato, 0)]
+                if not aciertos.any(): continue
+                self.respaldo[pendientes[aciertos]] = candidato[aciertos]
+                self.nivel[pendientes[aciertos]] = nivel
+                restantes = ~aciertos
+                pendientes, valores = pendientes[restantes], [v[restantes] for v in valores]
+
+    @classmethod
+    def desde_nodos(cls, nodos: Any) -> 'IndiceRespaldoInfoset':
+        return cls(mascara_entrenados(nodos))
+
+    def resolver(self, codigo: int) -> Tuple[int, int]:
+        """Devuelve (código entrenado, nivel de relajación) o (-1, SIN_RESPALDO)."""
+        if not (0 <= codigo < TOTAL_CODIGOS): return -1, SIN_RESPALDO
+        return int(self.respaldo[codigo]), int(self.nivel[codigo])
+
+    def cobertura(self) -> Dict[str, float]:
+        """Fracción del espacio de códigos resuelta en cada nivel."""
+        conteos = np.bincount(self.nivel, minlength=SIN_RESPALDO + 1)
+        resumen = {nombre: float(conteos[i]) / TOTAL_CODIGOS for i, nombre in enumerate(NIVELES_RELAJACION)}
+        resumen["sin_respaldo"] = float(conteos[SIN_RESPALDO]) / TOTAL_CODIGOS
+        return resumen
+
+    def memoria(self) -> int:
+        return self.respaldo.nbytes + self.nivel.nbytes
@@ -8,6 +8,7 @@ from Config import (
     UI_TEXT_COLOR_ERROR, UI_TEXT_COLOR_ACTION, UI_UPDATE_INTERVAL_MS,
     UI_WINDOW_POSITION_X, UI_WINDOW_POSITION_Y, UI_WINDOW_WIDTH, UI_WINDOW_HEIGHT
 )
+from CodificadorInfoset import decodificar_infoset
 
 class InterfazUsuario(tk.Tk):
     def __init__(self, update_queue: queue.Queue):
@@ -250,8 +251,12 @@ class InterfazUsuario(tk.Tk):
 
     def mostrarAccionRecomendada(self, datos: Dict[str, Any]):
         fase = datos.get("fase_actual", "N/A")
-        infoset = datos.get("infoset", "N/A")
+        infoset_codigo = datos.get("infoset_codigo", -1)
+        infoset = decodificar_infoset(infoset_codigo) if infoset_codigo >= 0 else datos.get("infoset", "N/A")
         infoset_encontrado = datos.get("infoset_encontrado", False)
+        relajacion = datos.get("infoset_relajacion", "exacto")
+        if infoset_encontrado and relajacion != "exacto":
+            infoset += f"  (~{relajacion})"
         accion_mccfr = datos.get("accion_mccfr", "Check")
         accion_espanol = datos.get("accion_espanol", "Pasar")
         monto_desnormalizado = datos.get("monto")
@@ -260,8 +265,8 @@ class InterfazUsuario(tk.Tk):
         
         self.label_fase_actual.config(text=fase, fg=UI_TEXT_COLOR_SUCCESS)
         
-        # Verde si encontrado, AMARILLO si no encontrado (cambio principal)
-        color_infoset = "#00FF00" if infoset_encontrado else "#FFD700"
+        # Verde si encontrado, cian si vino del índice de respaldo, AMARILLO si no encontrado
+        color_infoset = ("#00FF00" if relajacion == "exacto" else "#66CCFF") if infoset_encontrado else "#FFD700"
         self.label_infoset.config(text=infoset, fg=color_infoset)
         
         texto_categoria = f"{accion_mccfr}"
@@ -304,8 +309,14 @@ class InterfazUsuario(tk.Tk):
         self.label_accion_exacta.config(text="ERROR", fg=UI_TEXT_COLOR_ERROR)
         self.label_montos.config(text="")
 
+    def formatearDistribucion(self, distribucion) -> str:
+        if not distribucion:
+            return ""
+        principales = sorted(distribucion, key=lambda x: x[1], reverse=True)[:4]
+        return "Estrategia: " + " | ".join(f"{accion} {probabilidad:.0%}" for accion, probabilidad in principales)
+
     def actualizarDebugYStatus(self, datos: Dict[str, Any]):
-        debug_info = datos.get('debug_info', '')
+        debug_info = datos.get('debug_info') or self.formatearDistribucion(datos.get('distribucion'))
         self.label_debug.config(text=debug_info)
         
         tiempo_actual = time.time()
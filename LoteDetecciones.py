@@ -0,0 +1,94 @@
+import numpy as np
+from typing import Any, List, Optional, Tuple
+from Config import LABEL_NAMES
+
+class LoteDetecciones:
+    """Detecciones de un frame como arrays paralelos (struct-of-arrays) con índice por clase.
+
+    Se construye con una única copia dispositivo -> host de `boxes.data`
+    (x1, y1, x2, y2, conf, cls) en lugar de una por cada atributo, y el resto
+    del programa consume los arrays sin volver a tocar tensores.
+    """
+    __slots__ = ('cajas', 'cajas_enteras', 'clases', 'confianzas', 'centros', 'indices_por_clase')
+
+    def __init__(self, cajas: np.ndarray, clases: np.ndarray, confianzas: np.ndarray):
+        self.cajas = np.asarray(cajas, dtype=np.float32).reshape(-1, 4)
+        self.clases = np.asarray(clases, dtype=np.int32)
+        self.confianzas = np.asarray(confianzas, dtype=np.float32)
+        # Coordenadas enteras y centros como los calculaba EstadoJuego (int() trunca, las cajas son positivas)
+        self.cajas_enteras = self.cajas.astype(np.int32)
+        self.centros = np.stack(((self.cajas_enteras[:, 0] + self.cajas_enteras[:, 2]) // 2, (self.cajas_enteras[:, 1] + self.cajas_enteras[:, 3]) // 2), axis=1)
+        validas = (self.clases >= 0) & (self.clases < len(LABEL_NAMES))
+        orden = np.argsort(np.where(validas, self.clases, len(LABEL_NAMES)), kind='stable')
+        limites = np.cumsum(np.bincount(self.clases[validas], minlength=len(LABEL_NAMES)))[:-1]
+        self.indices_por_clase: List[np.ndarray] = np.split(orden[:int(validas.sum())], limites)
+
+    @classmethod
+    def vacio(cls) -> 'LoteDetecciones':
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0))
+
+    @classmethod
+    def desde_resultados(cls, resultados: List[Any]) -> 'LoteDetecciones':
+        """Convierte la salida de Ultralytics; las columnas finales de boxes.data son siempre (conf, cls)."""
+        if not resultados or resultados[0].boxes is None: return cls.vacio()
+        datos = resultados[0].boxes.data.cpu().numpy()
+        return cls(datos[:, :4], datos[:, -1], datos[:, -2])
+
+    def __len__(self) -> int:
+        return len(self.clases)
+
+    def indices(self, clase: int) -> np.ndarray:
+        return self.indices_por_clase[clase]
+
+    def caja(self, i: int) -> Tuple[int, int, int, int]:
+        return tuple(self.cajas_enteras[i].tolist())
+
+    def centro(self, i: int) -> Tuple[int, int]:
+        return tuple(self.centros[i].tolist())
+
+    def etiqueta(self, i: int) -> str:
+        return LABEL_NAMES[self.clases[i]]
+
+class Deteccion:
+    """Vista perezosa de una detección del lote; se indexa como el dict que usaba EstadoJuego.
+
+    Caja, centro, recorte y cambio se calculan en el primer acceso y quedan
+    guardados para el resto del frame. El recorte es siempre una vista del frame
+    (sin copia): el primer paso de preprocesado del OCR (cvtColor) es el que
+    produce un buffer contiguo nuevo, y sólo para las detecciones que se leen.
+    """
+    __slots__ = ('lote', 'indice', 'frame', 'mapa_cambios', '_box', '_center', '_crop', '_cambio')
+    _CLAVES = frozenset(('box', 'center', 'crop', 'cambio'))
+
+    def __init__(self, lote: LoteDetecciones, indice: int, frame: np.ndarray, mapa_cambios: Any = None):
+        self.lote, self.indice, self.frame, self.mapa_cambios = lote, indice, frame, mapa_cambios
+        self._box = self._center = self._crop = self._cambio = None
+
+    @property
+    def box(self) -> Tuple[int, int, int, int]:
+        if self._box is None: self._box = self.lote.caja(self.indice)
+        return self._box
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        if self._center is None: self._center = self.lote.centro(self.indice)
+        return self._center
+
+    @property
+    def crop(self) -> np.ndarray:
+        if self._crop is None:
+            x1, y1, x2, y2 = self.box
+            self._crop = self.frame[y1:y2, x1:x2]
+        return self._crop
+
+    @property
+    def cambio(self) -> bool:
+        if self._cambio is None: self._cambio = self.mapa_cambios.region_cambio(self.box) if self.mapa_cambios else True
+        return self._cambio
+
+    def __getitem__(self, clave: str) -> Any:
+        if clave not in self._CLAVES: raise KeyError(clave)
+        return getattr(self, clave)
+
+    def get(self, clave: str, defecto: Optional[Any] = None) -> Any:
+        return getattr(self, clave) if clave in self._CLAVES else defecto
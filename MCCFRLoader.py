@@ -1,9 +1,18 @@
 import struct
+import mmap
 import os
 import glob
 import re
-from typing import Dict, Any, List
-from Config import MCCFR_MODELS_DIR, FORMATO_FLOTANTE, ENDIANNESS_POR_DEFECTO, MAX_ACCIONES_POR_NODO, MAX_LONGITUD_STRING, NUMERO_MAGICO_CPP
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, Optional
+from Config import MCCFR_MODELS_DIR, FORMATO_FLOTANTE, ENDIANNESS_POR_DEFECTO, MAX_ACCIONES_POR_NODO, MAX_LONGITUD_STRING, NUMERO_MAGICO_CPP, MCCFR_ALMACEN_COMPACTO, MCCFR_USAR_MODELOS_MAPEADOS, MCCFR_CARGA_PARALELA, MCCFR_MAX_PROCESOS, MCCFR_USAR_CACHE, MCCFR_INDICE_RESPALDO
+from AlmacenNodosMCCFR import AlmacenNodosMCCFR
+from ModeloMCCFRMapeado import ModeloMCCFRMapeado, MccfrMapeadoError, ruta_mapeada_para
+from CacheModelosMCCFR import abrir_desde_cache, guardar_en_cache
+from IndiceRespaldoInfoset import IndiceRespaldoInfoset
+FORMATO_CABECERA = 'IIQIIB3B4x'
 class MccfrParsingError(Exception): pass
 class MccfrEndOfFileError(MccfrParsingError): pass
 class MccfrFormatError(MccfrParsingError): pass
@@ -23,35 +32,192 @@ class MCCFRLoader:
         if length > MAX_LONGITUD_STRING: raise MccfrFormatError(f"Error in '{ctx}': String length ({length}) exceeds limit.")
         try: return self._leer_bytes_exactos(f, length).decode('latin-1', errors='replace')
         except UnicodeDecodeError as e: raise MccfrFormatError(f"Error in '{ctx}': Could not decode string. Error: {e}")
-    def _parsear_archivo_mccfr(self, file_path: str, endianness: str = ENDIANNESS_POR_DEFECTO) -> Dict[str, Any]:
+    def _leer_cabecera(self, f, file_path: str, endianness: str = ENDIANNESS_POR_DEFECTO) -> Dict[str, Any]:
+        return self._validar_cabecera(self._leer_struct(f, FORMATO_CABECERA, endianness), file_path)
+    def _validar_cabecera(self, h_vals, file_path: str) -> Dict[str, Any]:
+        header = {"numero_magico": h_vals[0], "version": h_vals[1], "timestamp": h_vals[2], "total_nodos": h_vals[3], "checksum": h_vals[4], "num_jugadores": h_vals[5]}
+        if header["numero_magico"] != NUMERO_MAGICO_CPP: raise MccfrFormatError(f"Invalid magic number in {os.path.basename(file_path)}.")
+        if not (2 <= header["num_jugadores"] <= 10): raise MccfrFormatError(f"Invalid player count: {header['num_jugadores']}.")
+        return header
+    def leer_cabecera(self, file_path: str, endianness: str = ENDIANNESS_POR_DEFECTO) -> Dict[str, Any]:
+        with open(file_path, 'rb') as f: return self._leer_cabecera(f, file_path, endianness)
+    def _parsear_archivo_mccfr(self, file_path: str, endianness: str = ENDIANNESS_POR_DEFECTO, compacto: bool = MCCFR_ALMACEN_COMPACTO) -> Dict[str, Any]:
         with open(file_path, 'rb') as f:
-            h_vals = self._leer_struct(f, 'IIQIIB3B4x', endianness)
-            header = {"numero_magico": h_vals[0], "version": h_vals[1], "timestamp": h_vals[2], "total_nodos": h_vals[3], "checksum": h_vals[4], "num_jugadores": h_vals[5]}
-            if header["numero_magico"] != NUMERO_MAGICO_CPP: raise MccfrFormatError(f"Invalid magic number in {os.path.basename(file_path)}.")
-            if not (2 <= header["num_jugadores"] <= 10): raise MccfrFormatError(f"Invalid player count: {header['num_jugadores']}.")
-            nodos = {}
+            try: datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: raise MccfrEndOfFileError(f"Empty file: {os.path.basename(file_path)}.")
+        try: return self._parsear_buffer_mccfr(datos, file_path, endianness, compacto)
+        finally: datos.close()
+    def _parsear_buffer_mccfr(self, datos, file_path: str, endianness: str, compacto: bool) -> Dict[str, Any]:
+        """Parsea el modelo completo desde un buffer en memoria con structs precompilados.
+
+        Evita las lecturas f.read + struct.unpack por campo: cada string es un slice
+        del buffer, los dos dobles de una acción salen de un único unpack_from y los
+        textos de acción repetidos se resuelven por sus bytes sin volver a decodificar.
+        """
+        entero, dobles = struct.Struct(endianness + 'I'), struct.Struct(endianness + FORMATO_FLOTANTE * 2)
+        leer_entero, leer_dobles, tam_dobles, total = entero.unpack_from, dobles.unpack_from, dobles.size, len(datos)
+        try: header = self._validar_cabecera(struct.unpack_from(endianness + FORMATO_CABECERA, datos, 0), file_path)
+        except struct.error as e: raise MccfrEndOfFileError(f"Truncated header in {os.path.basename(file_path)}: {e}")
+        pos = struct.calcsize(endianness + FORMATO_CABECERA)
+        nodos = AlmacenNodosMCCFR() if compacto else {}
+        acciones_por_bytes: Dict[bytes, Any] = {}
+        if compacto: codigos, arrepentimientos, sumas = nodos.codigos_accion.append, nodos.arrepentimientos.append, nodos.sumas_estrategia.append
+        try:
+            for i in range(header["total_nodos"]):
+                length = leer_entero(datos, pos)[0]
+                if length > MAX_LONGITUD_STRING: raise MccfrFormatError(f"Error in 'key_{i+1}': String length ({length}) exceeds limit.")
+                pos += 4
+                if pos + length > total: raise MccfrEndOfFileError(f"Expected {length} bytes, got {total - pos}.")
+                key = datos[pos:pos + length].decode('latin-1', errors='replace')
+                pos += length
+                num_actions = leer_entero(datos, pos)[0]
+                pos += 4
+                if not (0 < num_actions <= MAX_ACCIONES_POR_NODO): raise MccfrFormatError(f"Invalid action count ({num_actions}) for node '{key}'.")
+                actions = []
+                for _ in range(num_actions):
+                    length = leer_entero(datos, pos)[0]
+                    if length > MAX_LONGITUD_STRING: raise MccfrFormatError(f"Error in 'action_text': String length ({length}) exceeds limit.")
+                    pos += 4
+                    texto = datos[pos:pos + length]
+                    if len(texto) < length: raise MccfrEndOfFileError(f"Expected {length} bytes, got {len(texto)}.")
+                    pos += length
+                    accion = acciones_por_bytes.get(texto)
+                    if accion is None:
+                        nombre = texto.decode('latin-1', errors='replace')
+                        accion = acciones_por_bytes[texto] = nodos.codigo_accion(nombre) if compacto else sys.intern(nombre)
+                    arrepentimiento, suma_estrategia = leer_dobles(datos, pos)
+                    pos += tam_dobles
+                    if compacto:
+                        codigos(accion)
+                        arrepentimientos(arrepentimiento)
+                        sumas(suma_estrategia)
+                    else:
+                        actions.append({"accion": accion, "arrepentimiento": arrepentimiento, "suma_estrategia": suma_estrategia})
+                if compacto: nodos.cerrar_nodo(key)
+                else: nodos[key] = actions
+        except struct.error as e: raise MccfrEndOfFileError(f"Unexpected end of file in {os.path.basename(file_path)} at byte {pos}: {e}")
+        if compacto:
+            nodos.precalcular_estrategias()
+            nodos.indexar_por_codigo()
+        return {"cabecera": header, "nodos": nodos}
+    def _parsear_archivo_mccfr_secuencial(self, file_path: str, endianness: str = ENDIANNESS_POR_DEFECTO, compacto: bool = MCCFR_ALMACEN_COMPACTO) -> Dict[str, Any]:
+        with open(file_path, 'rb') as f:
+            header = self._leer_cabecera(f, file_path, endianness)
+            nodos = AlmacenNodosMCCFR() if compacto else {}
             for i in range(header["total_nodos"]):
                 key = self._leer_string(f, endianness, ctx=f"key_{i+1}")
                 num_actions = self._leer_struct(f, 'I', endianness)[0]
                 if not (0 < num_actions <= MAX_ACCIONES_POR_NODO): raise MccfrFormatError(f"Invalid action count ({num_actions}) for node '{key}'.")
+                if compacto:
+                    nodos.agregar_nodo(key, [(self._leer_string(f, endianness, ctx="action_text"), self._leer_struct(f, FORMATO_FLOTANTE, endianness)[0], self._leer_struct(f, FORMATO_FLOTANTE, endianness)[0]) for _ in range(num_actions)])
+                    continue
                 actions = []
                 for _ in range(num_actions):
                     actions.append({"accion": self._leer_string(f, endianness, ctx="action_text"), "arrepentimiento": self._leer_struct(f, FORMATO_FLOTANTE, endianness)[0], "suma_estrategia": self._leer_struct(f, FORMATO_FLOTANTE, endianness)[0]})
                 nodos[key] = actions
             return {"cabecera": header, "nodos": nodos}
+    def _abrir_modelo_mapeado(self, file_path: str) -> Optional[Dict[str, Any]]:
+        ruta_mapeada = ruta_mapeada_para(file_path)
+        if not os.path.exists(ruta_mapeada): return None
+        try:
+            modelo = ModeloMCCFRMapeado(ruta_mapeada)
+        except (MccfrMapeadoError, OSError, struct.error) as e:
+            print(f"     Aviso: modelo mapeado inválido '{os.path.basename(ruta_mapeada)}' ({e}); se usará el .bin.")
+            return None
+        header = self.leer_cabecera(file_path)
+        if (modelo.checksum_origen, modelo.timestamp_origen) != (header["checksum"], header["timestamp"]):
+            print(f"     Aviso: '{os.path.basename(ruta_mapeada)}' está desactualizado respecto al .bin; se usará el .bin.")
+            modelo.cerrar()
+            return None
+        return {"cabecera": header, "nodos": modelo}
+    def _abrir_sin_parsear(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """Abre el modelo desde su .mcci junto al .bin o desde la caché, si alguno es válido."""
+        if MCCFR_USAR_MODELOS_MAPEADOS:
+            datos_modelo = self._abrir_modelo_mapeado(file_path)
+            if datos_modelo is not None: return datos_modelo
+        if MCCFR_USAR_CACHE:
+            header = self.leer_cabecera(file_path)
+            modelo = abrir_desde_cache(file_path, header)
+            if modelo is not None: return {"cabecera": header, "nodos": modelo}
+        return None
+    def _parsear_y_cachear(self, file_path: str) -> Dict[str, Any]:
+        datos_modelo = self._parsear_archivo_mccfr(file_path, compacto=True)
+        try: guardar_en_cache(file_path, datos_modelo["cabecera"], datos_modelo["nodos"])
+        except OSError as e: print(f"     Aviso: no se pudo escribir la caché de '{os.path.basename(file_path)}': {e}")
+        return datos_modelo
+    def _cargar_modelo(self, file_path: str) -> Dict[str, Any]:
+        datos_modelo = self._abrir_sin_parsear(file_path)
+        if datos_modelo is not None: return datos_modelo
+        if not MCCFR_USAR_CACHE: return self._parsear_archivo_mccfr(file_path)
+        datos_modelo = self._parsear_y_cachear(file_path)
+        return self._abrir_sin_parsear(file_path) or datos_modelo
+    def _adjuntar_respaldo(self, datos_modelo: Dict[str, Any]) -> Dict[str, Any]:
+        if not MCCFR_INDICE_RESPALDO: return datos_modelo
+        datos_modelo["respaldo"] = IndiceRespaldoInfoset.desde_nodos(datos_modelo["nodos"])
+        cobertura = datos_modelo["respaldo"].cobertura()
+        print(f"     ...Índice de respaldo: {cobertura['exacto']:.1%} exacto, {1 - cobertura['sin_respaldo']:.1%} con respaldo.")
+        return datos_modelo
+    def descubrir_modelos(self) -> Dict[int, str]:
+        modelos = {}
+        for file_path in sorted(glob.glob(os.path.join(MCCFR_MODELS_DIR, 'mccfr_*_poker.bin'))):
+            match = re.search(r'mccfr_(\d+)_poker\.bin', os.path.basename(file_path))
+            if match: modelos[int(match.group(1))] = file_path
+        return modelos
+    def cargar_modelo(self, num_jugadores: int, file_path: str) -> Dict[str, Any]:
+        print(f"  -> Cargando modelo para {num_jugadores} jugadores desde '{os.path.basename(file_path)}'...")
+        datos_modelo = self._cargar_modelo(file_path)
+        print(f"     ...Cargado. {datos_modelo['cabecera']['total_nodos']} nodos.")
+        return self._adjuntar_respaldo(datos_modelo)
+    def cargar_modelos_en_paralelo(self, modelos: Dict[int, str], max_procesos: Optional[int] = MCCFR_MAX_PROCESOS) -> Dict[int, Dict[str, Any]]:
+        """Parsea los .bin en un ProcessPoolExecutor; cada proceso devuelve un almacén compacto.
+
+        Los modelos con .mcci vigente o en caché se abren en este proceso (un mmap no
+        se puede enviar entre procesos y abrirlo es inmediato). Con caché activa los
+        procesos escriben su entrada y aquí sólo se mapea.
+        """
+        pendientes = {}
+        for num_jugadores, file_path in modelos.items():
+            try: datos_modelo = self._abrir_sin_parsear(file_path)
+            except (MccfrParsingError, Exception) as e:
+                print(f"Error processing {file_path}: {e}")
+                continue
+            if datos_modelo is not None:
+                print(f"  -> Modelo para {num_jugadores} jugadores abierto desde '{os.path.basename(datos_modelo['nodos'].ruta)}'. {datos_modelo['cabecera']['total_nodos']} nodos.")
+                self.mccfr_data[num_jugadores] = self._adjuntar_respaldo(datos_modelo)
+            else: pendientes[num_jugadores] = file_path
+        if not pendientes: return self.mccfr_data
+        inicio, num_procesos = time.perf_counter(), min(len(pendientes), max_procesos or os.cpu_count() or 1)
+        print(f"  -> Parseando {len(pendientes)} modelos en paralelo con {num_procesos} procesos...")
+        with ProcessPoolExecutor(max_workers=num_procesos) as pool:
+            futuros = {pool.submit(_parsear_en_proceso, file_path): (num_jugadores, file_path) for num_jugadores, file_path in pendientes.items()}
+            for futuro in as_completed(futuros):
+                num_jugadores, file_path = futuros[futuro]
+                try:
+                    datos_modelo, duracion = futuro.result()
+                    datos_modelo = datos_modelo or self._abrir_sin_parsear(file_path)
+                    if datos_modelo is None: raise MccfrParsingError("the cache entry written by the worker could not be opened")
+                    print(f"     ...{os.path.basename(file_path)}: {datos_modelo['cabecera']['total_nodos']} nodos en {duracion:.2f} s.")
+                    self.mccfr_data[num_jugadores] = self._adjuntar_respaldo(datos_modelo)
+                except (MccfrParsingError, Exception) as e: print(f"Error processing {file_path}: {e}")
+        print(f"     ...Carga paralela completada en {time.perf_counter() - inicio:.2f} s.")
+        return self.mccfr_data
     def cargar_modelos_en_memoria(self) -> Dict[int, Dict[str, Any]]:
-        bin_files = glob.glob(os.path.join(MCCFR_MODELS_DIR, 'mccfr_*_poker.bin'))
-        if not bin_files:
+        modelos = self.descubrir_modelos()
+        if not modelos:
             print(f"Error: No se encontraron archivos .bin en: {MCCFR_MODELS_DIR}")
             return {}
-        for file_path in sorted(bin_files):
-            try:
-                match = re.search(r'mccfr_(\d+)_poker\.bin', os.path.basename(file_path))
-                if match:
-                    num_jugadores = int(match.group(1))
-                    print(f"  -> Cargando modelo para {num_jugadores} jugadores desde '{os.path.basename(file_path)}'...")
-                    datos_modelo = self._parsear_archivo_mccfr(file_path)
-                    self.mccfr_data[num_jugadores] = datos_modelo
-                    print(f"     ...Cargado. {datos_modelo['cabecera']['total_nodos']} nodos.")
+        if MCCFR_CARGA_PARALELA and len(modelos) > 1: return self.cargar_modelos_en_paralelo(modelos)
+        for num_jugadores, file_path in modelos.items():
+            try: self.mccfr_data[num_jugadores] = self.cargar_modelo(num_jugadores, file_path)
             except (MccfrParsingError, Exception) as e: print(f"Error processing {file_path}: {e}")
-        return self.mccfr_data
\ No newline at end of file
+        return self.mccfr_data
+def _parsear_en_proceso(file_path: str):
+    inicio = time.perf_counter()
+    if MCCFR_USAR_CACHE:
+        datos_modelo = MCCFRLoader()._parsear_y_cachear(file_path)
+        cacheado = abrir_desde_cache(file_path, datos_modelo["cabecera"])
+        if cacheado is not None:
+            cacheado.cerrar()
+            return None, time.perf_counter() - inicio
+    else: datos_modelo = MCCFRLoader()._parsear_archivo_mccfr(file_path, compacto=True)
+    return datos_modelo, time.perf_counter() - inicio
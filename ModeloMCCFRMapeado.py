@@ -0,0 +1,240 @@
+import argparse
+import bisect
+import glob
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, List, Optional, Iterator, Tuple, Any
+from Config import MCCFR_MODELS_DIR, EXTENSION_MODELO_MAPEADO
+from AlmacenNodosMCCFR import AlmacenNodosMCCFR
+from CodificadorInfoset import codificar_clave, decodificar_infoset, TOTAL_CODIGOS
+
+NUMERO_MAGICO_MAPEADO = b'MCCI'
+VERSION_MAPEADO = 4
+# magico, version, num_jugadores, total_nodos, num_nombres, checksum_origen, num_codigos, timestamp_origen,
+# desplazamientos de las secciones: nombres, hashes, entradas, claves, acciones, codigos
+CABECERA = struct.Struct('<4sIIIIII4xQQQQQQQ')
+ENTRADA = struct.Struct('<QQIII4xd')  # desplazamiento_clave, primera_accion, num_acciones, longitud_clave, mejor_accion, probabilidad_mejor
+ACCION = struct.Struct('<H6xddd')  # codigo_accion, arrepentimiento, suma_estrategia, probabilidad (estrategia promedio)
+LONGITUD_NOMBRE = struct.Struct('<H')
+
+class MccfrMapeadoError(Exception): pass
+
+def hash_clave(clave: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(clave, digest_size=8).digest(), 'little')
+
+def _alinear(f, alineacion: int = 8) -> int:
+    posicion = f.tell()
+    relleno = (-posicion) % alineacion
+    if relleno: f.write(b'\x00' * relleno)
+    return posicion + relleno
+
+def escribir_modelo_mapeado(ruta_salida: str, cabecera: Dict[str, Any], almacen: AlmacenNodosMCCFR):
+    """Escribe un almacén columnar en el formato indexado apto para mmap.
+
+    Las claves se ordenan por hash de 64 bits, de modo que una consulta es una
+    búsqueda binaria sobre la columna de hashes más una comparación de la clave.
+    Cada acción lleva además su probabilidad en la estrategia promedio normalizada
+    y cada entrada la acción recomendada ya resuelta. Al final va una tabla densa
+    código de infoset -> posición para consultar por entero sin hashear la clave.
+    """
+    if almacen.mejor_accion is None: almacen.precalcular_estrategias()
+    claves = list(almacen.keys())
+    claves_bytes = [c.encode('latin-1') for c in claves]
+    orden = sorted(range(len(claves)), key=lambda i: hash_clave(claves_bytes[i]))
+    ruta_temporal = ruta_salida + '.tmp'
+    with open(ruta_temporal, 'wb') as f:
+        f.write(b'\x00' * CABECERA.size)
+        off_nombres = _alinear(f)
+        for nombre in almacen.nombres_acciones:
+            nombre_bytes = nombre.encode('latin-1')
+            f.write(LONGITUD_NOMBRE.pack(len(nombre_bytes)) + nombre_bytes)
+        off_hashes = _alinear(f)
+        f.write(struct.pack(f'<{len(orden)}Q', *(hash_clave(claves_bytes[i]) for i in orden)))
+        off_entradas = _alinear(f)
+        desplazamiento_clave, primera_accion = 0, 0
+        for i in orden:
+            indice = almacen.indice_claves[claves[i]]
+            num_acciones = len(almacen.rango_nodo(indice))
+            f.write(ENTRADA.pack(desplazamiento_clave, primera_accion, num_acciones, len(claves_bytes[i]), almacen.mejor_accion[indice], almacen.probabilidad_mejor[indice]))
+            desplazamiento_clave += len(claves_bytes[i])
+            primera_accion += num_acciones
+        off_claves = _alinear(f)
+        for i in orden: f.write(claves_bytes[i])
+        off_acciones = _alinear(f)
+        for i in orden:
+            indice = almacen.indice_claves[claves[i]]
+            for j, probabilidad in zip(almacen.rango_nodo(indice), almacen.estrategia_promedio_nodo(indice)):
+                f.write(ACCION.pack(almacen.codigos_accion[j], almacen.arrepentimientos[j], almacen.sumas_estrategia[j], probabilidad))
+        off_codigos = _alinear(f)
+        tabla_codigos = array('i', [-1]) * TOTAL_CODIGOS
+        for posicion, i in enumerate(orden):
+            codigo = codificar_clave(claves[i])
+            if codigo >= 0: tabla_codigos[codigo] = posicion
+        if sys.byteorder != 'little': tabla_codigos.byteswap()
+        tabla_codigos.tofile(f)
+        f.seek(0)
+        f.write(CABECERA.pack(NUMERO_MAGICO_MAPEADO, VERSION_MAPEADO, cabecera["num_jugadores"], len(orden), len(almacen.nombres_acciones),
+                              cabecera["checksum"], TOTAL_CODIGOS, cabecera["timestamp"], off_nombres, off_hashes, off_entradas, off_claves, off_acciones, off_codigos))
+    os.replace(ruta_temporal, ruta_salida)
+
+class ModeloMCCFRMapeado:
+    """Modelo MCCFR indexado servido directamente desde un mmap de solo lectura.
+
+    Abrirlo sólo lee la cabecera y la tabla de nombres de acción; las páginas de
+    hashes, claves y acciones las comparte el sistema operativo entre procesos.
+    """
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._vista = self._hashes = self._codigos = None
+        self._archivo = open(ruta, 'rb')
+        try:
+            self._mm = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self._archivo.close()
+            raise MccfrMapeadoError(f"No se pudo mapear '{os.path.basename(ruta)}': {e}")
+        try:
+            self._leer_cabecera()
+        except Exception:
+            # El llamador (MCCFRLoader) recurre al .bin: sin cerrar aquí el .mcci quedaría abierto (y bloqueado en Windows)
+            self.cerrar()
+            raise
+
+    def _leer_cabecera(self):
+        ruta = self.ruta
+        if len(self._mm) < CABECERA.size: raise MccfrMapeadoError(f"Archivo truncado: {os.path.basename(ruta)}.")
+        (magico, version, self.num_jugadores, self.total_nodos, num_nombres, self.checksum_origen, num_codigos, self.timestamp_origen,
+         off_nombres, off_hashes, self._off_entradas, self._off_claves, self._off_acciones, off_codigos) = CABECERA.unpack_from(self._mm, 0)
+        if magico != NUMERO_MAGICO_MAPEADO: raise MccfrMapeadoError(f"Número mágico inválido en {os.path.basename(ruta)}.")
+        if version != VERSION_MAPEADO: raise MccfrMapeadoError(f"Versión {version} no soportada en {os.path.basename(ruta)}.")
+        self.nombres_acciones: List[str] = []
+        posicion = off_nombres
+        for _ in range(num_nombres):
+            longitud = LONGITUD_NOMBRE.unpack_from(self._mm, posicion)[0]
+            self.nombres_acciones.append(self._mm[posicion + 2:posicion + 2 + longitud].decode('latin-1'))
+            posicion += 2 + longitud
+        self._vista = memoryview(self._mm)
+        self._hashes = self._vista[off_hashes:off_hashes + 8 * self.total_nodos].cast('Q')
+        # Si el espacio de códigos cambió desde que se escribió el archivo, se consulta por clave
+        self._codigos = self._vista[off_codigos:off_codigos + 4 * num_codigos].cast('i') if num_codigos == TOTAL_CODIGOS else None
+
+    @property
+    def tabla_codigos(self) -> Optional[memoryview]:
+        return self._codigos
+
+    @property
+    def cabecera(self) -> Dict[str, Any]:
+        return {"numero_magico": NUMERO_MAGICO_MAPEADO, "version": VERSION_MAPEADO, "timestamp": self.timestamp_origen,
+                "total_nodos": self.total_nodos, "checksum": self.checksum_origen, "num_jugadores": self.num_jugadores}
+
+    def _entrada(self, posicion: int):
+        return ENTRADA.unpack_from(self._mm, self._off_entradas + posicion * ENTRADA.size)
+
+    def _clave_en(self, entrada) -> bytes:
+        inicio = self._off_claves + entrada[0]
+        return self._mm[inicio:inicio + entrada[3]]
+
+    def obtener_indice(self, clave: str) -> int:
+        clave_bytes = clave.encode('latin-1', errors='replace')
+        h = hash_clave(clave_bytes)
+        posicion = bisect.bisect_left(self._hashes, h)
+        while posicion < self.total_nodos and self._hashes[posicion] == h:
+            if self._clave_en(self._entrada(posicion)) == clave_bytes: return posicion
+            posicion += 1
+        return -1
+
+    def obtener_indice_codigo(self, codigo: int) -> int:
+        if not (0 <= codigo < TOTAL_CODIGOS): return -1
+        if self._codigos is not None: return self._codigos[codigo]
+        return self.obtener_indice(decodificar_infoset(codigo))
+
+    def acciones_nodo(self, posicion: int) -> List[Dict[str, Any]]:
+        _, primera, num_acciones, _, _, _ = self._entrada(posicion)
+        inicio = self._off_acciones + primera * ACCION.size
+        return [
+            {"accion": self.nombres_acciones[codigo], "arrepentimiento": arrepentimiento, "suma_estrategia": suma}
+            for codigo, arrepentimiento, suma, _ in ACCION.iter_unpack(self._mm[inicio:inicio + num_acciones * ACCION.size])
+        ]
+
+    def estrategia_promedio_nodo(self, posicion: int) -> List[float]:
+        _, primera, num_acciones, _, _, _ = self._entrada(posicion)
+        inicio = self._off_acciones + primera * ACCION.size
+        return [registro[3] for registro in ACCION.iter_unpack(self._mm[inicio:inicio + num_acciones * ACCION.size])]
+
+    def recomendacion_nodo(self, posicion: int) -> Tuple[str, float]:
+        _, primera, _, _, mejor, probabilidad = self._entrada(posicion)
+        codigo = ACCION.unpack_from(self._mm, self._off_acciones + (primera + mejor) * ACCION.size)[0]
+        return self.nombres_acciones[codigo], probabilidad
+
+    def recomendacion(self, clave: str) -> Optional[Tuple[str, float]]:
+        posicion = self.obtener_indice(clave)
+        return self.recomendacion_nodo(posicion) if posicion >= 0 else None
+
+    def recomendacion_por_codigo(self, codigo: int) -> Optional[Tuple[str, float]]:
+        posicion = self.obtener_indice_codigo(codigo)
+        return self.recomendacion_nodo(posicion) if posicion >= 0 else None
+
+    def distribucion(self, clave: str) -> Optional[List[Tuple[str, float]]]:
+        posicion = self.obtener_indice(clave)
+        return self.distribucion_nodo(posicion) if posicion >= 0 else None
+
+    def distribucion_por_codigo(self, codigo: int) -> Optional[List[Tuple[str, float]]]:
+        posicion = self.obtener_indice_codigo(codigo)
+        return self.distribucion_nodo(posicion) if posicion >= 0 else None
+
+    def distribucion_nodo(self, posicion: int) -> List[Tuple[str, float]]:
+        _, primera, num_acciones, _, _, _ = self._entrada(posicion)
+        inicio = self._off_acciones + primera * ACCION.size
+        return [(self.nombres_acciones[codigo], probabilidad) for codigo, _, _, probabilidad in ACCION.iter_unpack(self._mm[inicio:inicio + num_acciones * ACCION.size])]
+
+    def get(self, clave: str, default: Optional[List[Dict[str, Any]]] = None) -> Optional[List[Dict[str, Any]]]:
+        posicion = self.obtener_indice(clave)
+        return self.acciones_nodo(posicion) if posicion >= 0 else default
+
+    def __getitem__(self, clave: str) -> List[Dict[str, Any]]:
+        posicion = self.obtener_indice(clave)
+        if posicion < 0: raise KeyError(clave)
+        return self.acciones_nodo(posicion)
+
+    def __contains__(self, clave: object) -> bool: return isinstance(clave, str) and self.obtener_indice(clave) >= 0
+    def __len__(self) -> int: return self.total_nodos
+    def __bool__(self) -> bool: return self.total_nodos > 0
+
+    def keys(self) -> Iterator[str]:
+        for posicion in range(self.total_nodos): yield self._clave_en(self._entrada(posicion)).decode('latin-1')
+    __iter__ = keys
+
+    def items(self):
+        for posicion in range(self.total_nodos):
+            yield self._clave_en(self._entrada(posicion)).decode('latin-1'), self.acciones_nodo(posicion)
+
+    def cerrar(self):
+        for vista in (self._codigos, self._hashes, self._vista):
+            if vista is not None: vista.release()
+        self._mm.close()
+        self._archivo.close()
+
+def ruta_mapeada_para(ruta_bin: str) -> str:
+    return os.path.splitext(ruta_bin)[0] + EXTENSION_MODELO_MAPEADO
+
+def main():
+    from MCCFRLoader import MCCFRLoader
+    parser = argparse.ArgumentParser(description="Convierte modelos mccfr_N_poker.bin al formato indexado para mmap")
+    parser.add_argument("modelos", nargs="*", help="Archivos .bin a convertir (por defecto, todos los de MCCFR_MODELS_DIR)")
+    args = parser.parse_args()
+    rutas = args.modelos or sorted(glob.glob(os.path.join(MCCFR_MODELS_DIR, 'mccfr_*_poker.bin')))
+    if not rutas:
+        print(f"Error: No se encontraron archivos .bin en: {MCCFR_MODELS_DIR}")
+        return
+    cargador = MCCFRLoader()
+    for ruta in rutas:
+        print(f"  -> Convirtiendo '{os.path.basename(ruta)}'...")
+        datos = cargador._parsear_archivo_mccfr(ruta, compacto=True)
+        escribir_modelo_mapeado(ruta_mapeada_para(ruta), datos["cabecera"], datos["nodos"])
+        print(f"     ...Escrito '{os.path.basename(ruta_mapeada_para(ruta))}'. {len(datos['nodos'])} nodos.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import math
+import cv2
+import numpy as np
+from typing import Tuple
+from Config import YOLO_IMGSZ, DETECCION_MARGEN_REGION, DETECCION_ESCALA_MAXIMA
+
+SEPARACION = 4
+RELLENO = 114  # mismo gris que el letterbox de Ultralytics
+
+class MosaicoRegiones:
+    """Empaqueta recortes de un frame en un lienzo cuadrado para detectarlos en una sola inferencia.
+
+    Cada región ocupa una celda de una rejilla y se amplía hasta llenarla (como
+    mucho DETECCION_ESCALA_MAXIMA veces), así los glifos pequeños de las cartas
+    llegan al modelo con muchos más píxeles que en el frame completo reducido.
+    proyectar() devuelve las cajas detectadas en el lienzo a coordenadas del frame.
+    """
+    def __init__(self, frame: np.ndarray, regiones: np.ndarray, lado: int = YOLO_IMGSZ, margen: int = DETECCION_MARGEN_REGION,
+                 escala_maxima: float = DETECCION_ESCALA_MAXIMA):
+        alto, ancho = frame.shape[:2]
+        regiones = np.asarray(regiones, dtype=np.int32).reshape(-1, 4)
+        self.regiones = np.stack((np.clip(regiones[:, 0] - margen, 0, ancho), np.clip(regiones[:, 1] - margen, 0, alto),
+                                  np.clip(regiones[:, 2] + margen, 0, ancho), np.clip(regiones[:, 3] + margen, 0, alto)), axis=1)
+        self.regiones = self.regiones[(self.regiones[:, 2] > self.regiones[:, 0]) & (self.regiones[:, 3] > self.regiones[:, 1])]
+        self.columnas = max(1, math.ceil(math.sqrt(len(self.regiones))))
+        self.celda = lado // self.columnas
+        self.lienzo = np.full((lado, lado, 3), RELLENO, dtype=np.uint8)
+        self.origenes = np.zeros((len(self.regiones), 2), dtype=np.float32)
+        self.escalas = np.zeros(len(self.regiones), dtype=np.float32)
+        util = self.celda - SEPARACION
+        for i, (x1, y1, x2, y2) in enumerate(self.regiones.tolist()):
+            escala = min(util / (x2 - x1), util / (y2 - y1), escala_maxima)
+            ancho_destino, alto_destino = max(1, int((x2 - x1) * escala)), max(1, int((y2 - y1) * escala))
+            ox, oy = (i % self.columnas) * self.celda, (i // self.columnas) * self.celda
+            self.lienzo[oy:oy + alto_destino, ox:ox + ancho_destino] = cv2.resize(frame[y1:y2, x1:x2], (ancho_destino, alto_destino), interpolation=cv2.INTER_CUBIC)
+            self.origenes[i], self.escalas[i] = (ox, oy), escala
+
+    def __len__(self) -> int:
+        return len(self.regiones)
+
+    def proyectar(self, cajas: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Cajas del lienzo -> (cajas en el frame, máscara de las que caen dentro de alguna región)."""
+        cajas = np.asarray(cajas, dtype=np.float32).reshape(-1, 4)
+        if not len(self.regiones): return np.zeros_like(cajas), np.zeros(len(cajas), dtype=bool)
+        centros = (cajas[:, :2] + cajas[:, 2:]) / 2
+        celdas = (centros[:, 1] // self.celda).astype(np.int32) * self.columnas + (centros[:, 0] // self.celda).astype(np.int32)
+        validas = (celdas >= 0) & (celdas < len(self.regiones)) & (centros[:, 0] < self.columnas * self.celda)
+        celdas = np.where(validas, celdas, 0)
+        origen, escala, region = self.origenes[celdas], self.escalas[celdas, None], self.regiones[celdas]
+        proyectadas = (cajas - np.tile(origen, 2)) / escala + np.tile(region[:, :2], 2)
+        proyectadas = np.clip(proyectadas, np.tile(region[:, :2], 2), np.tile(region[:, 2:], 2))
+        return proyectadas, validas & (proyectadas[:, 2] > proyectadas[:, 0]) & (proyectadas[:, 3] > proyectadas[:, 1])
@@ -0,0 +1,162 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from Config import PIPELINE_CAPACIDAD_COLAS, CAPTURA_INTERVALO_SEGUNDOS, CAPTURA_VENTANA_METRICAS
+from CapturadorPantalla import CapturadorPantalla
+from DetectorObjetos import DetectorObjetos
+from EstadoJuego import EstadoJuego
+from UtilidadesDebug import guardar_frame_con_cajas, guardar_frame_crudo
+
+ETAPAS = ("captura", "deteccion", "estado", "decision")
+
+class PipelineProcesamiento:
+    """Ejecuta captura -> detección -> estado (OCR) en hilos encadenados por colas acotadas.
+
+    Cada etapa es un único hilo que consume su cola en orden FIFO, así que los
+    frames llegan a EstadoJuego en el orden de su número de secuencia; una cola
+    llena bloquea a la etapa anterior (backpressure) en lugar de acumular frames.
+    La decisión queda en el hilo principal, que consume la cola de salida. Con
+    las etapas solapadas el ritmo lo marca la más lenta, no la suma de todas.
+    """
+    def __init__(self, capturador: CapturadorPantalla, detector: DetectorObjetos, manejador_estado: EstadoJuego, detector_cambios: Any,
+                 shared_state: Dict[str, Any], label_map: Dict[int, str], capacidad: int = PIPELINE_CAPACIDAD_COLAS):
+        self.capturador, self.detector, self.manejador_estado, self.detector_cambios = capturador, detector, manejador_estado, detector_cambios
+        self.shared_state, self.label_map = shared_state, label_map
+        self.cola_deteccion: queue.Queue = queue.Queue(maxsize=capacidad)
+        self.cola_estado: queue.Queue = queue.Queue(maxsize=capacidad)
+        self.cola_salida: queue.Queue = queue.Queue(maxsize=capacidad)
+        self.latencias = {etapa: deque(maxlen=CAPTURA_VENTANA_METRICAS) for etapa in ETAPAS}
+        self.edades = deque(maxlen=CAPTURA_VENTANA_METRICAS)
+        self.secuencia = self.ultima_secuencia_estado = self.fuera_de_orden = self.completados = 0
+        self.intervalo = CAPTURA_INTERVALO_SEGUNDOS  # lo ajusta PlanificadorFrecuencia desde el hilo principal
+        # Anillo de frames preasignados: como mucho 2 * capacidad + 2 frames en vuelo (dos colas y dos etapas)
+        # más el que captura la etapa de captura, así que un buffer no se reescribe mientras alguien lo usa
+        self.buffers: List[Optional[np.ndarray]] = [None] * (2 * capacidad + 3)
+        self.inicio = time.perf_counter()
+        self._lock = threading.Lock()
+        self._hilos: List[threading.Thread] = []
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        for nombre, objetivo in (("captura", self._etapa_captura), ("deteccion", self._etapa_deteccion), ("estado", self._etapa_estado)):
+            hilo = threading.Thread(target=objetivo, name=f"pipeline-{nombre}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def detener(self, timeout: float = 1.0):
+        for hilo in self._hilos: hilo.join(timeout=timeout)
+
+    def _activo(self) -> bool: return self.shared_state.get('running', True)
+
+    def _poner(self, cola: queue.Queue, elemento: Dict[str, Any]) -> bool:
+        """Encola bloqueando mientras la etapa siguiente esté saturada; False si el programa se cierra."""
+        while self._activo():
+            try:
+                cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full: continue
+        return False
+
+    def _tomar(self, cola: queue.Queue) -> Optional[Dict[str, Any]]:
+        while self._activo():
+            try: return cola.get(timeout=0.1)
+            except queue.Empty: continue
+        return None
+
+    def _registrar(self, etapa: str, inicio: float):
+        with self._lock: self.latencias[etapa].append(time.perf_counter() - inicio)
+
+    def _etapa_captura(self):
+        self.capturador.abrir_sesion()
+        while self._activo():
+            inicio = time.perf_counter()
+            if self.shared_state.get('paused', False):
+                time.sleep(CAPTURA_INTERVALO_SEGUNDOS)
+                continue
+            slot = self.secuencia % len(self.buffers)
+            frame, area = self.capturador.capturar(self.buffers[slot])
+            if frame is None:
+                time.sleep(CAPTURA_INTERVALO_SEGUNDOS)
+                continue
+            self.buffers[slot] = frame
+            self.secuencia += 1
+            self._registrar("captura", inicio)
+            if not self._poner(self.cola_deteccion, {"secuencia": self.secuencia, "marca": inicio, "frame": frame, "area": area}): return
+            time.sleep(max(0.0, self.intervalo - (time.perf_counter() - inicio)))
+
+    def _etapa_deteccion(self):
+        while True:
+            elemento = self._tomar(self.cola_deteccion)
+            if elemento is None: return
+            inicio = time.perf_counter()
+            accion_forzada = self.shared_state.get('force_action', False)
+            elemento["resultados"] = elemento["cambios"] = None
+            if not self.detector_cambios or self.detector_cambios.debe_procesar(elemento["frame"]) or accion_forzada:
+                # El mapa viaja con el frame: cuando EstadoJuego lo use, el detector ya habrá analizado otros
+                elemento["cambios"] = self.detector_cambios.ultimo_mapa if self.detector_cambios else None
+                elemento["resultados"] = self.detector.detectar(elemento["frame"])
+                if accion_forzada:
+                    guardar_frame_con_cajas(elemento["frame"], elemento["resultados"], self.label_map)
+                    guardar_frame_crudo(elemento["frame"])
+            self._registrar("deteccion", inicio)
+            if not self._poner(self.cola_estado, elemento): return
+
+    def _etapa_estado(self):
+        area_anterior = None
+        while True:
+            elemento = self._tomar(self.cola_estado)
+            if elemento is None: return
+            inicio = time.perf_counter()
+            if elemento["secuencia"] <= self.ultima_secuencia_estado:
+                self.fuera_de_orden += 1
+                continue
+            self.ultima_secuencia_estado = elemento["secuencia"]
+            manejador = self.manejador_estado
+            if elemento["resultados"] is not None:
+                # Las coordenadas guardadas se expresan en el área del frame que llega, aunque la región cambiara en vuelo
+                area = elemento["area"]
+                if area_anterior is not None and area != area_anterior:
+                    manejador.desplazarCoordenadas(area_anterior['left'] - area['left'], area_anterior['top'] - area['top'])
+                area_anterior = area
+                manejador.actualizarDesdeDetecciones(elemento["resultados"], elemento["frame"], elemento["cambios"])
+                self.capturador.actualizar_region(manejador.caja_principal, area)
+            elemento["estado"] = manejador.obtenerEstadoParaJson()
+            elemento["necesita_accion"] = manejador.necesitaAccion()
+            elemento["hay_principal"] = manejador.hayJugadorPrincipal()
+            elemento["asientos_hasta_heroe"] = manejador.asientosHastaTurnoHeroe()
+            elemento["heroe_en_mano"] = manejador.heroeSigueEnMano()
+            elemento["frame"] = elemento["resultados"] = None
+            self._registrar("estado", inicio)
+            if not self._poner(self.cola_salida, elemento): return
+
+    def tomar_resultado(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """Siguiente estado procesado, en orden de secuencia; None si no llega ninguno a tiempo."""
+        try: return self.cola_salida.get(timeout=timeout)
+        except queue.Empty: return None
+
+    def registrar_decision(self, elemento: Dict[str, Any], inicio: float):
+        ahora = time.perf_counter()
+        with self._lock:
+            self.latencias["decision"].append(ahora - inicio)
+            self.edades.append(ahora - elemento["marca"])
+            self.completados += 1
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            latencias = {etapa: sorted(valores) for etapa, valores in self.latencias.items()}
+            edades, completados = sorted(self.edades), self.completados
+        return {
+            "frames_por_segundo": completados / (time.perf_counter() - self.inicio),
+            "latencia_ms": {etapa: _resumen_ms(valores) for etapa, valores in latencias.items()},
+            "extremo_a_extremo_ms": _resumen_ms(edades),
+            "colas": (self.cola_deteccion.qsize(), self.cola_estado.qsize(), self.cola_salida.qsize()),
+            "fuera_de_orden": self.fuera_de_orden,
+        }
+
+def _resumen_ms(valores: List[float]) -> Tuple[float, float]:
+    """(media, p95) en milisegundos de una lista ordenada."""
+    if not valores: return 0.0, 0.0
+    return 1000 * sum(valores) / len(valores), 1000 * valores[int(0.95 * (len(valores) - 1))]
@@ -0,0 +1,47 @@
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+from Config import FRECUENCIA_INTERVALOS, FRECUENCIA_ASIENTOS_INMINENTE, FRECUENCIA_FACTOR_RETROCESO
+
+class PlanificadorFrecuencia:
+    """Elige el intervalo entre frames según lo cerca que esté una decisión del héroe.
+
+    Al acercarse el turno del héroe el intervalo baja de inmediato; al pasar a un
+    modo más lento (Espera, Showdown, sin Principal) crece multiplicándose por
+    FRECUENCIA_FACTOR_RETROCESO en cada ciclo hasta el del modo, para que un
+    frame suelto sin detecciones no congele la captura.
+    """
+    def __init__(self, intervalos: Dict[str, float] = FRECUENCIA_INTERVALOS, asientos_inminente: int = FRECUENCIA_ASIENTOS_INMINENTE,
+                 factor_retroceso: float = FRECUENCIA_FACTOR_RETROCESO):
+        self.intervalos, self.asientos_inminente, self.factor_retroceso = intervalos, asientos_inminente, factor_retroceso
+        self.modo = 'normal'
+        self.intervalo = intervalos['normal']
+        self.segundos_por_modo: Counter = Counter()
+        self._marca = time.perf_counter()
+
+    def clasificar(self, hay_principal: bool, fase: Optional[str], asientos_hasta_heroe: Optional[int], heroe_en_mano: bool) -> str:
+        if not hay_principal: return 'sin_principal'
+        if fase in ('Espera', 'Showdown'): return fase.lower()
+        if not heroe_en_mano: return 'fuera_de_mano'
+        if asientos_hasta_heroe == 0: return 'turno_heroe'
+        if asientos_hasta_heroe is not None and asientos_hasta_heroe <= self.asientos_inminente: return 'inminente'
+        return 'normal'
+
+    def actualizar(self, hay_principal: bool, fase: Optional[str], asientos_hasta_heroe: Optional[int], heroe_en_mano: bool,
+                   accion_forzada: bool = False) -> float:
+        """Registra el estado del último frame y devuelve el intervalo hasta el siguiente."""
+        ahora = time.perf_counter()
+        self.segundos_por_modo[self.modo] += ahora - self._marca
+        self._marca = ahora
+        self.modo = 'turno_heroe' if accion_forzada else self.clasificar(hay_principal, fase, asientos_hasta_heroe, heroe_en_mano)
+        objetivo = self.intervalos[self.modo]
+        self.intervalo = objetivo if objetivo <= self.intervalo else min(objetivo, self.intervalo * self.factor_retroceso)
+        return self.intervalo
+
+    def metricas(self) -> Dict[str, Any]:
+        total = sum(self.segundos_por_modo.values()) or 1.0
+        return {
+            "modo": self.modo,
+            "intervalo_ms": 1000 * self.intervalo,
+            "fraccion_por_modo": {modo: segundos / total for modo, segundos in self.segundos_por_modo.most_common()},
+        }
@@ -1,13 +1,26 @@
 import easyocr
+import hashlib
+import re
 import numpy as np
 import cv2
 from typing import List, Optional, Tuple, Dict
-from collections import Counter
+from collections import Counter, OrderedDict
+from Config import OCR_CACHE_TAMANO, RANGOS_GUARDAR_MUESTRAS, OCR_CARACTERES_NUMERICOS, OCR_NUMERICO_CONFIANZA_MINIMA, OCR_PATRON_NUMERICO
+from ReconocedorRangos import ReconocedorRangos, guardar_muestra
+from UtilidadesTexto import UtilidadesTexto
+
+SEPARACION_LOTE = 8  # filas vacías entre recortes apilados en el lienzo del OCR por lotes
+PATRON_NUMERICO = re.compile(OCR_PATRON_NUMERICO)
 
 class ProcesadorOCR:
     def __init__(self, languages: List[str] = ['en']):
         self.reader = None
         self.fallback_activo = False
+        self.cache: OrderedDict = OrderedDict()
+        self.aciertos_cache = self.fallos_cache = 0
+        self.reconocedor_rangos = ReconocedorRangos.desde_archivo()
+        if self.reconocedor_rangos is None:
+            print("Sin plantillas de rangos (ReconocedorRangos.py): los valores de carta se leen con EasyOCR")
         self._inicializar_ocr(languages)
     
     def _inicializar_ocr(self, languages: List[str]):
@@ -21,20 +34,70 @@ class ProcesadorOCR:
                 self.reader = None
                 self.fallback_activo = True
 
-    def get_text_from_image(self, image: np.ndarray, es_valor_carta: bool = False) -> str:
+    def get_text_from_image(self, image: np.ndarray, es_valor_carta: bool = False, es_numerico: bool = False) -> str:
         if image is None or image.size == 0:
             return ""
         
-        if es_valor_carta:
-            return self._extraer_valor_carta_con_preprocesamiento(image)
-        else:
-            return self._extraer_texto_normal(image)
+        gris = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        modo = 'valor_carta' if es_valor_carta else 'numerico' if es_numerico else 'normal'
+        clave = self._clave_cache(gris, modo)
+        texto = self._consultar_cache(clave)
+        if texto is None:
+            if es_valor_carta:
+                texto = self._extraer_valor_carta_con_preprocesamiento(gris)
+            elif es_numerico:
+                texto = self._extraer_numero(gris)
+            else:
+                texto = self._extraer_texto_normal(gris)
+            self._guardar_cache(clave, texto)
+        return texto
+
+    def _extraer_numero(self, gris: np.ndarray) -> str:
+        """Sólo reconocimiento y sólo cifras/separadores/símbolos; si no sale un número claro se lee como texto general
+        (así siguen llegando "All In", "Ausente"... a limpiarValorMonetario)"""
+        if self.reader is None:
+            return ""
+        try:
+            resultados = self.reader.recognize(gris, horizontal_list=[[0, gris.shape[1], 0, gris.shape[0]]], free_list=[], detail=1,
+                                               paragraph=False, allowlist=OCR_CARACTERES_NUMERICOS)
+            if resultados and self._es_lectura_numerica(resultados[0][1], resultados[0][2]):
+                return resultados[0][1].strip()
+        except Exception as e:
+            print(f"Error en OCR numérico: {e}")
+        return self._extraer_texto_normal(gris)
+
+    @staticmethod
+    def _es_lectura_numerica(texto: str, confianza: float) -> bool:
+        # Un texto forzado a cifras ("All In" -> "A11 1"...) suele dejar espacios o símbolos fuera de sitio
+        return confianza >= OCR_NUMERICO_CONFIANZA_MINIMA and PATRON_NUMERICO.match(texto.strip()) is not None
+
+    def _clave_cache(self, gris: np.ndarray, modo: str) -> Tuple:
+        """Hash exacto del recorte ya en gris: un solo píxel distinto (otra cifra) da otra clave"""
+        return modo, gris.shape, hashlib.blake2b(np.ascontiguousarray(gris), digest_size=16).digest()
+
+    def _consultar_cache(self, clave: Tuple, contar: bool = True) -> Optional[str]:
+        texto = self.cache.get(clave)
+        if texto is None:
+            self.fallos_cache += contar
+            return None
+        self.cache.move_to_end(clave)
+        self.aciertos_cache += contar
+        return texto
 
-    def _extraer_texto_normal(self, image: np.ndarray) -> str:
+    def _guardar_cache(self, clave: Tuple, texto: str):
+        self.cache[clave] = texto
+        if len(self.cache) > OCR_CACHE_TAMANO:
+            self.cache.popitem(last=False)
+
+    def estadisticas_cache(self) -> Dict[str, float]:
+        consultas = self.aciertos_cache + self.fallos_cache
+        return {"aciertos": self.aciertos_cache, "fallos": self.fallos_cache, "tasa_aciertos": self.aciertos_cache / consultas if consultas else 0.0, "entradas": len(self.cache)}
+
+    def _extraer_texto_normal(self, gris: np.ndarray) -> str:
         if self.reader is not None:
             try:
                 results = self.reader.readtext(
-                    cv2.cvtColor(image, cv2.COLOR_BGR2GRAY),
+                    gris,
                     detail=0,
                     paragraph=True
                 )
@@ -44,13 +107,81 @@ class ProcesadorOCR:
                 print(f"Error en EasyOCR: {e}")
         return ""
 
-    def _extraer_valor_carta_con_preprocesamiento(self, image: np.ndarray) -> str:
+    def leer_lote(self, imagenes: List[np.ndarray], numerico: bool = False, contar_cache: bool = True) -> List[str]:
+        """Reconoce varios recortes con una sola llamada a recognize, sin la etapa de detección de texto de EasyOCR.
+
+        YOLO ya localizó cada campo, así que los recortes se apilan en un único
+        lienzo gris y cada uno se pasa como caja horizontal; con GPU EasyOCR los
+        reconoce en lotes de batch_size (en CPU los recorre uno a uno, pero sin la
+        detección). Los resultados vuelven en el orden de entrada. Con numerico el
+        reconocedor sólo puede emitir OCR_CARACTERES_NUMERICOS, y lo que no salga
+        como un número claro se relee en un lote general; esa relectura no cuenta
+        en las estadísticas de caché (contar_cache=False), que sólo reflejan la
+        consulta de cada recorte pedido.
+        """
+        textos = [""] * len(imagenes)
+        if self.reader is None:
+            return textos
+        modo = 'lote_numerico' if numerico else 'lote'
+        grises, claves, pendientes = {}, {}, []
+        for i, imagen in enumerate(imagenes):
+            if imagen is None or imagen.size == 0:
+                continue
+            grises[i] = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+            claves[i] = self._clave_cache(grises[i], modo)
+            texto = self._consultar_cache(claves[i], contar_cache)
+            if texto is None:
+                pendientes.append(i)
+            else:
+                textos[i] = texto
+        if not pendientes:
+            return textos
+        try:
+            lecturas = self._reconocer_lote([grises[i] for i in pendientes], OCR_CARACTERES_NUMERICOS if numerico else None)
+        except Exception as e:
+            print(f"Error en OCR por lotes: {e}")
+            lecturas = [(self._extraer_numero(grises[i]) if numerico else self._extraer_texto_normal(grises[i]), 1.0) for i in pendientes]
+        dudosos = []
+        for i, (texto, confianza) in zip(pendientes, lecturas):
+            textos[i] = texto
+            if numerico and not self._es_lectura_numerica(texto, confianza):
+                dudosos.append(i)
+        if dudosos:
+            for i, texto in zip(dudosos, self.leer_lote([imagenes[i] for i in dudosos], contar_cache=False)):
+                textos[i] = texto
+        for i in pendientes:
+            self._guardar_cache(claves[i], textos[i])
+        return textos
+
+    def _reconocer_lote(self, grises: List[np.ndarray], allowlist: Optional[str] = None) -> List[Tuple[str, float]]:
+        lienzo = np.zeros((sum(g.shape[0] for g in grises) + SEPARACION_LOTE * len(grises), max(g.shape[1] for g in grises)), dtype=np.uint8)
+        cajas, indice_por_fila, y = [], {}, 0
+        for i, gris in enumerate(grises):
+            alto, ancho = gris.shape
+            lienzo[y:y + alto, :ancho] = gris
+            cajas.append([0, ancho, y, y + alto])
+            indice_por_fila[y] = i
+            y += alto + SEPARACION_LOTE
+        lecturas = [("", 0.0)] * len(grises)
+        resultados = self.reader.recognize(lienzo, horizontal_list=cajas, free_list=[], detail=1, paragraph=False, batch_size=len(cajas), allowlist=allowlist)
+        for caja, texto, confianza in resultados:
+            # EasyOCR reordena las cajas por posición vertical: se identifican por su fila superior
+            i = indice_por_fila.get(int(caja[0][1]))
+            if i is not None:
+                lecturas[i] = (texto.strip(), float(confianza))
+        return lecturas
+
+    def _extraer_valor_carta_con_preprocesamiento(self, gray_original: np.ndarray) -> str:
+        # Plantillas primero: la votación de cuatro pasadas de EasyOCR sólo si la coincidencia es dudosa
+        if self.reconocedor_rangos is not None:
+            rango = self.reconocedor_rangos.clasificar(gray_original)
+            if rango:
+                return rango
         if self.reader is None:
             return ""
         
         resultados_candidatos = []
         try:
-            gray_original = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
             resultado_original = self._ocr_con_confianza(gray_original)
             if resultado_original:
                 resultados_candidatos.append(resultado_original)
@@ -70,7 +201,10 @@ class ProcesadorOCR:
             if resultado_binario:
                 resultados_candidatos.append(resultado_binario)
 
-            return self._seleccionar_mejor_resultado(resultados_candidatos)
+            texto = self._seleccionar_mejor_resultado(resultados_candidatos)
+            if RANGOS_GUARDAR_MUESTRAS and UtilidadesTexto.clean_card_value(texto):
+                guardar_muestra(gray_original, UtilidadesTexto.clean_card_value(texto))
+            return texto
             
         except Exception as e:
             print(f"Error en procesamiento múltiple OCR: {e}")
@@ -110,7 +244,10 @@ class ProcesadorOCR:
 
     def procesar_accion_poker(self, image: np.ndarray) -> Optional[str]:
         """Procesa una imagen de acción de poker y devuelve la acción detectada"""
-        texto_raw = self.get_text_from_image(image)
+        return self.interpretar_accion_poker(self.get_text_from_image(image))
+
+    def interpretar_accion_poker(self, texto_raw: str) -> Optional[str]:
+        """Traduce el texto leído de una caja AccionPoker a la acción de poker correspondiente"""
         if not texto_raw:
             return None
         
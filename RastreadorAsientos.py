@@ -0,0 +1,112 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from typing import List, Optional, Sequence, Tuple
+from Config import ASIENTOS_IOU_MINIMO, ASIENTOS_FRAMES_CONFIRMACION, ASIENTOS_FRAMES_OLVIDO
+
+BoundingBox = Tuple[int, int, int, int]
+
+def iou_matriz(cajas_a: np.ndarray, cajas_b: np.ndarray) -> np.ndarray:
+    x1 = np.maximum(cajas_a[:, None, 0], cajas_b[None, :, 0])
+    y1 = np.maximum(cajas_a[:, None, 1], cajas_b[None, :, 1])
+    x2 = np.minimum(cajas_a[:, None, 2], cajas_b[None, :, 2])
+    y2 = np.minimum(cajas_a[:, None, 3], cajas_b[None, :, 3])
+    interseccion = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (cajas_a[:, 2] - cajas_a[:, 0]) * (cajas_a[:, 3] - cajas_a[:, 1])
+    area_b = (cajas_b[:, 2] - cajas_b[:, 0]) * (cajas_b[:, 3] - cajas_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - interseccion
+    return np.where(union > 0, interseccion / np.maximum(union, 1e-9), 0.0)
+
+class Asiento:
+    __slots__ = ('id', 'caja', 'ultimo_frame', 'nombre', 'mano_nombre')
+
+    def __init__(self, id_asiento: int, caja: BoundingBox, frame: int):
+        self.id, self.caja, self.ultimo_frame = id_asiento, caja, frame
+        self.nombre: Optional[str] = None
+        self.mano_nombre = 0  # mano en la que se leyó el nombre; 0 = pendiente de leer
+
+    def nombre_vigente(self, id_mano: int) -> bool:
+        return self.mano_nombre == id_mano
+
+class RastreadorAsientos:
+    """Asigna a las cajas de jugador identificadores de asiento estables entre frames.
+
+    Cada frame se empareja con los asientos conocidos por IoU (asignación
+    húngara); una caja que no encaja con ninguno sólo abre un asiento nuevo tras
+    ASIENTOS_FRAMES_CONFIRMACION frames seguidos en el mismo sitio, y un asiento
+    sin ver durante ASIENTOS_FRAMES_OLVIDO frames se libera. El nombre se guarda
+    en el asiento y se lee una vez por mano: el OCR de NombreJugador sólo se
+    repite en una mano nueva o cuando se confirma un cambio de asiento.
+    """
+    def __init__(self, iou_minimo: float = ASIENTOS_IOU_MINIMO, frames_confirmacion: int = ASIENTOS_FRAMES_CONFIRMACION,
+                 frames_olvido: int = ASIENTOS_FRAMES_OLVIDO):
+        self.iou_minimo, self.frames_confirmacion, self.frames_olvido = iou_minimo, frames_confirmacion, frames_olvido
+        self.asientos: List[Asiento] = []
+        self.candidatos: List[List] = []  # [caja, frames seguidos, último frame]
+        self.frame = 0
+        self._siguiente_id = 1
+        self.asientos_creados = self.asientos_liberados = 0
+
+    def actualizar(self, cajas: Sequence[BoundingBox]) -> List[Optional[Asiento]]:
+        """Asiento de cada caja del frame, en el mismo orden; None mientras la caja no esté confirmada."""
+        self.frame += 1
+        resultado: List[Optional[Asiento]] = [None] * len(cajas)
+        primer_frame = not self.asientos
+        if cajas and self.asientos:
+            iou = iou_matriz(np.array([a.caja for a in self.asientos], dtype=np.float32), np.array(cajas, dtype=np.float32))
+            for fila, columna in zip(*linear_sum_assignment(-iou)):
+                if iou[fila, columna] >= self.iou_minimo:
+                    asiento = self.asientos[fila]
+                    asiento.caja, asiento.ultimo_frame = tuple(cajas[columna]), self.frame
+                    resultado[columna] = asiento
+            # Cajas solapadas con un asiento ya emparejado (dos tipos de jugador sobre la misma caja) no son asientos nuevos
+            duplicadas = iou.max(axis=0) >= self.iou_minimo
+        else:
+            duplicadas = np.zeros(len(cajas), dtype=bool)
+        # Lo mismo entre las cajas sin asiento (también en el primer frame): de un grupo solapado sólo la primera
+        # abre asiento, que en el orden de EstadoJuego es la de JugadorPrincipal
+        nuevas = [i for i in range(len(cajas)) if resultado[i] is None and not duplicadas[i]]
+        if len(nuevas) > 1:
+            cajas_nuevas = np.array([cajas[i] for i in nuevas], dtype=np.float32)
+            iou_nuevas = iou_matriz(cajas_nuevas, cajas_nuevas)
+            conservadas: List[int] = []
+            for j, i in enumerate(nuevas):
+                if any(iou_nuevas[j, k] >= self.iou_minimo for k in conservadas): duplicadas[i] = True
+                else: conservadas.append(j)
+        for i, caja in enumerate(cajas):
+            if resultado[i] is None and not duplicadas[i]:
+                resultado[i] = self._confirmar(tuple(caja), primer_frame)
+        self.candidatos = [c for c in self.candidatos if c[2] == self.frame]
+        vigentes = [a for a in self.asientos if self.frame - a.ultimo_frame <= self.frames_olvido]
+        self.asientos_liberados += len(self.asientos) - len(vigentes)
+        self.asientos = vigentes
+        return resultado
+
+    def _confirmar(self, caja: BoundingBox, inmediato: bool) -> Optional[Asiento]:
+        candidato = max(
+            (c for c in self.candidatos if c[2] == self.frame - 1 and iou_matriz(np.array([c[0]], dtype=np.float32), np.array([caja], dtype=np.float32))[0, 0] >= self.iou_minimo),
+            key=lambda c: c[1], default=None
+        )
+        if candidato is None:
+            candidato = [caja, 0, self.frame]
+            self.candidatos.append(candidato)
+        candidato[0], candidato[1], candidato[2] = caja, candidato[1] + 1, self.frame
+        if not inmediato and candidato[1] < self.frames_confirmacion:
+            return None
+        self.candidatos.remove(candidato)
+        asiento = Asiento(self._siguiente_id, caja, self.frame)
+        self._siguiente_id += 1
+        self.asientos.append(asiento)
+        self.asientos_creados += 1
+        return asiento
+
+    def desplazar(self, dx: int, dy: int):
+        for asiento in self.asientos:
+            x1, y1, x2, y2 = asiento.caja
+            asiento.caja = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+        for candidato in self.candidatos:
+            x1, y1, x2, y2 = candidato[0]
+            candidato[0] = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+
+    def cajas_con_nombre(self, id_mano: int) -> List[BoundingBox]:
+        """Cajas de los asientos vistos en este frame cuyo nombre ya se leyó en la mano actual"""
+        return [a.caja for a in self.asientos if a.ultimo_frame == self.frame and a.nombre_vigente(id_mano)]
@@ -0,0 +1,138 @@
+import argparse
+import glob
+import os
+import time
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+from Config import RANGOS_PLANTILLAS_PATH, RANGOS_MUESTRAS_DIR, RANGOS_UMBRAL_SIMILITUD, RANGOS_MARGEN_MINIMO
+
+RANGOS = ('A', 'K', 'Q', 'J', 'T', '9', '8', '7', '6', '5', '4', '3', '2')
+ANCHO_GLIFO, ALTO_GLIFO = 16, 24
+
+def normalizar_glifo(gris: np.ndarray) -> Optional[np.ndarray]:
+    """Binariza (Otsu), deja el glifo a 1 sobre fondo 0, lo recorta a su caja y lo lleva a un vector de norma 1.
+
+    La polaridad se decide por el borde del recorte (que es fondo), así que da
+    igual que el cliente pinte el rango oscuro sobre claro o al revés.
+    """
+    if gris is None or gris.size == 0: return None
+    _, binaria = cv2.threshold(gris, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    borde = np.concatenate((binaria[0], binaria[-1], binaria[:, 0], binaria[:, -1]))
+    glifo = binaria < 128 if borde.mean() >= 128 else binaria >= 128
+    ys, xs = np.nonzero(glifo)
+    if len(ys) == 0: return None
+    recorte = glifo[ys.min():ys.max() + 1, xs.min():xs.max() + 1].astype(np.float32)
+    vector = cv2.resize(recorte, (ANCHO_GLIFO, ALTO_GLIFO), interpolation=cv2.INTER_AREA).ravel()
+    vector -= vector.mean()
+    norma = float(np.linalg.norm(vector))
+    return vector / norma if norma > 0 else None
+
+class ReconocedorRangos:
+    """Vecino más cercano (similitud coseno) sobre glifos de rango normalizados.
+
+    Las plantillas son muestras etiquetadas del propio cliente de poker; una
+    consulta es un producto matriz-vector de unos cientos de floats, frente a las
+    cuatro pasadas de EasyOCR de la lectura por votación.
+    """
+    def __init__(self, vectores: np.ndarray, etiquetas: List[str], umbral: float = RANGOS_UMBRAL_SIMILITUD, margen: float = RANGOS_MARGEN_MINIMO):
+        self.vectores = np.asarray(vectores, dtype=np.float32)
+        self.etiquetas = np.asarray(etiquetas)
+        self.umbral, self.margen = umbral, margen
+        self.aceptados = self.rechazados = 0
+
+    @classmethod
+    def desde_archivo(cls, ruta: str = RANGOS_PLANTILLAS_PATH) -> Optional['ReconocedorRangos']:
+        if not os.path.exists(ruta): return None
+        with np.load(ruta) as datos:
+            return cls(datos['vectores'], [str(e) for e in datos['etiquetas']])
+
+    @classmethod
+    def desde_muestras(cls, directorio: str = RANGOS_MUESTRAS_DIR) -> 'ReconocedorRangos':
+        """Una subcarpeta por rango (A, K, ..., T, 9, ..., 2) con recortes ValorCarta etiquetados."""
+        vectores, etiquetas = [], []
+        for rango in RANGOS:
+            for ruta in sorted(glob.glob(os.path.join(directorio, rango, '*.png'))):
+                imagen = cv2.imread(ruta, cv2.IMREAD_GRAYSCALE)
+                vector = normalizar_glifo(imagen)
+                if vector is not None:
+                    vectores.append(vector)
+                    etiquetas.append(rango)
+        return cls(np.array(vectores, dtype=np.float32).reshape(-1, ANCHO_GLIFO * ALTO_GLIFO), etiquetas)
+
+    def guardar(self, ruta: str = RANGOS_PLANTILLAS_PATH):
+        np.savez_compressed(ruta, vectores=self.vectores, etiquetas=self.etiquetas)
+
+    def __len__(self) -> int:
+        return len(self.etiquetas)
+
+    def puntuar(self, gris: np.ndarray) -> Tuple[Optional[str], float, float]:
+        """(rango más parecido, similitud, ventaja sobre el mejor rango distinto)"""
+        vector = normalizar_glifo(gris)
+        return self.puntuar_vector(vector) if vector is not None else (None, 0.0, 0.0)
+
+    def puntuar_vector(self, vector: np.ndarray) -> Tuple[Optional[str], float, float]:
+        if not len(self.etiquetas): return None, 0.0, 0.0
+        similitudes = self.vectores @ vector
+        mejor = int(np.argmax(similitudes))
+        rango = str(self.etiquetas[mejor])
+        otros = similitudes[self.etiquetas != rango]
+        return rango, float(similitudes[mejor]), float(similitudes[mejor] - (otros.max() if len(otros) else -1.0))
+
+    def es_confiable(self, similitud: float, ventaja: float) -> bool:
+        return similitud >= self.umbral and ventaja >= self.margen
+
+    def clasificar(self, gris: np.ndarray) -> Optional[str]:
+        """Rango si la coincidencia es clara; None para que el llamador recurra a EasyOCR"""
+        rango, similitud, ventaja = self.puntuar(gris)
+        if rango is not None and self.es_confiable(similitud, ventaja):
+            self.aceptados += 1
+            return rango
+        self.rechazados += 1
+        return None
+
+def guardar_muestra(gris: np.ndarray, rango: str, directorio: str = RANGOS_MUESTRAS_DIR) -> Optional[str]:
+    """Guarda un recorte etiquetado (p.ej. por la votación de EasyOCR) para revisarlo y reconstruir las plantillas."""
+    if rango not in RANGOS: return None
+    carpeta = os.path.join(directorio, rango)
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"{time.strftime('%Y%m%d_%H%M%S')}_{time.perf_counter_ns() % 1000000:06d}.png")
+    cv2.imwrite(ruta, gris)
+    return ruta
+
+def evaluar(completo: ReconocedorRangos) -> Tuple[float, float, float]:
+    """Validación dejando uno fuera: (acierto entre aceptados, fracción aceptada, microsegundos por consulta)."""
+    aciertos = aceptados = 0
+    tiempo = 0.0
+    for i in range(len(completo)):
+        mascara = np.arange(len(completo)) != i
+        reconocedor = ReconocedorRangos(completo.vectores[mascara], completo.etiquetas[mascara])
+        inicio = time.perf_counter()
+        rango, similitud, ventaja = reconocedor.puntuar_vector(completo.vectores[i])
+        tiempo += time.perf_counter() - inicio
+        if rango is not None and reconocedor.es_confiable(similitud, ventaja):
+            aceptados += 1
+            aciertos += rango == completo.etiquetas[i]
+    total = max(len(completo), 1)
+    return aciertos / max(aceptados, 1), aceptados / total, 1e6 * tiempo / total
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye las plantillas de rangos de carta a partir de recortes etiquetados")
+    parser.add_argument("--muestras", default=RANGOS_MUESTRAS_DIR, help="Directorio con una subcarpeta por rango")
+    parser.add_argument("--salida", default=RANGOS_PLANTILLAS_PATH)
+    args = parser.parse_args()
+    reconocedor = ReconocedorRangos.desde_muestras(args.muestras)
+    if not len(reconocedor):
+        print(f"Error: No hay recortes etiquetados en {args.muestras} (subcarpetas {', '.join(RANGOS)})")
+        return
+    conteo = {rango: int((reconocedor.etiquetas == rango).sum()) for rango in RANGOS}
+    print("Muestras por rango: " + ", ".join(f"{rango}: {n}" for rango, n in conteo.items()))
+    faltantes = [rango for rango, n in conteo.items() if not n]
+    if faltantes: print(f"⚠️ Rangos sin muestras (siempre recurrirán a EasyOCR): {', '.join(faltantes)}")
+    precision, cobertura, microsegundos = evaluar(reconocedor)
+    print(f"Dejando uno fuera: {precision:.1%} de acierto en el {cobertura:.1%} aceptado, {microsegundos:.1f} µs por consulta")
+    reconocedor.guardar(args.salida)
+    print(f"✅ Plantillas guardadas en: {args.salida}")
+
+if __name__ == '__main__':
+    main()
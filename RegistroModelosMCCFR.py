@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set
+from Config import MCCFR_CARGA_EN_SEGUNDO_PLANO, MCCFR_PRESUPUESTO_MEMORIA_MB, MCCFR_PRECARGA_JUGADORES
+from MCCFRLoader import MCCFRLoader, MccfrParsingError
+from AlmacenNodosMCCFR import AlmacenNodosMCCFR
+from ModeloMCCFRMapeado import ModeloMCCFRMapeado
+
+BYTES_ESTIMADOS_POR_CLAVE = 120
+BYTES_ESTIMADOS_POR_ACCION_DICT = 400
+
+def estimar_memoria_modelo(datos_modelo: Dict[str, Any]) -> int:
+    """Estimación del heap que ocupa un modelo cargado (los mapeados viven en la caché de páginas)."""
+    nodos = datos_modelo.get('nodos', {})
+    respaldo = datos_modelo['respaldo'].memoria() if 'respaldo' in datos_modelo else 0
+    if isinstance(nodos, ModeloMCCFRMapeado): return respaldo
+    if isinstance(nodos, AlmacenNodosMCCFR): return respaldo + nodos.memoria_buffers() + len(nodos) * BYTES_ESTIMADOS_POR_CLAVE
+    return respaldo + sum(BYTES_ESTIMADOS_POR_CLAVE + len(acciones) * BYTES_ESTIMADOS_POR_ACCION_DICT for acciones in nodos.values())
+
+class RegistroModelosMCCFR:
+    """Registro perezoso de modelos MCCFR por número de jugadores.
+
+    Descubre los archivos al construirse pero sólo carga un modelo cuando se
+    consulta por primera vez; mantiene el conjunto cargado dentro de un
+    presupuesto de memoria expulsando el menos usado recientemente.
+    """
+    def __init__(self, cargador: Optional[MCCFRLoader] = None, presupuesto_mb: float = MCCFR_PRESUPUESTO_MEMORIA_MB,
+                 carga_en_segundo_plano: bool = MCCFR_CARGA_EN_SEGUNDO_PLANO):
+        self.cargador = cargador or MCCFRLoader()
+        self.rutas: Dict[int, str] = self.cargador.descubrir_modelos()
+        self.presupuesto_bytes = int(presupuesto_mb * 1024 * 1024)
+        self.carga_en_segundo_plano = carga_en_segundo_plano
+        self._cargados: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        self._memoria: Dict[int, int] = {}
+        self._cargando: Dict[int, threading.Thread] = {}
+        self._fallidos: Set[int] = set()
+        self._lock = threading.RLock()
+
+    def __contains__(self, num_jugadores: object) -> bool: return num_jugadores in self.rutas and num_jugadores not in self._fallidos
+    def __bool__(self) -> bool: return bool(self.rutas)
+    def __len__(self) -> int: return len(self.rutas)
+    def keys(self): return [n for n in self.rutas if n not in self._fallidos]
+
+    def __getitem__(self, num_jugadores: int) -> Dict[str, Any]:
+        datos_modelo = self._cargar_sincrono(num_jugadores)
+        if datos_modelo is None: raise KeyError(num_jugadores)
+        return datos_modelo
+
+    def modelos_cargados(self):
+        with self._lock: return list(self._cargados.keys())
+
+    def memoria_en_uso(self) -> int:
+        with self._lock: return sum(self._memoria.values())
+
+    def _mas_cercano(self, num_jugadores: int, candidatos) -> Optional[int]:
+        candidatos = list(candidatos)
+        return min(candidatos, key=lambda x: abs(x - num_jugadores)) if candidatos else None
+
+    def obtener_modelo(self, num_jugadores: int) -> Optional[Dict[str, Any]]:
+        """Devuelve el modelo pedido o, si no existe, el del número de jugadores más cercano.
+
+        Con carga en segundo plano, un modelo aún no cargado se pide a un hilo y
+        mientras tanto responde el modelo ya cargado más cercano. Si todavía no hay
+        ninguno cargado la consulta es síncrona: espera a la carga (o a la precarga
+        en curso, ver precargar()).
+        """
+        objetivo = num_jugadores if num_jugadores in self else self._mas_cercano(num_jugadores, self.keys())
+        if objetivo is None: return None
+        with self._lock:
+            if objetivo in self._cargados:
+                self._cargados.move_to_end(objetivo)
+                return self._cargados[objetivo]
+            cercano = self._mas_cercano(objetivo, self._cargados.keys())
+            if self.carga_en_segundo_plano and cercano is not None:
+                self._iniciar_carga_en_segundo_plano(objetivo)
+                self._cargados.move_to_end(cercano)
+                return self._cargados[cercano]
+        return self._cargar_sincrono(objetivo)
+
+    def precargar(self, num_jugadores: Optional[int] = MCCFR_PRECARGA_JUGADORES):
+        """Empieza a cargar en segundo plano el modelo más probable para que la primera consulta no pague la carga entera"""
+        objetivo = None if num_jugadores is None else num_jugadores if num_jugadores in self else self._mas_cercano(num_jugadores, self.keys())
+        if objetivo is None: return
+        with self._lock:
+            if objetivo not in self._cargados: self._iniciar_carga_en_segundo_plano(objetivo)
+
+    def _iniciar_carga_en_segundo_plano(self, num_jugadores: int):
+        if num_jugadores in self._cargando: return
+        hilo = threading.Thread(target=self._cargar_sincrono, args=(num_jugadores,), daemon=True)
+        self._cargando[num_jugadores] = hilo
+        hilo.start()
+
+    def _cargar_sincrono(self, num_jugadores: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if num_jugadores in self._cargados:
+                self._cargados.move_to_end(num_jugadores)
+                return self._cargados[num_jugadores]
+            if num_jugadores not in self: return None
+            hilo = self._cargando.get(num_jugadores)
+        if hilo is not None and hilo is not threading.current_thread():
+            hilo.join()
+            with self._lock: return self._cargados.get(num_jugadores)
+        try:
+            datos_modelo = self.cargador.cargar_modelo(num_jugadores, self.rutas[num_jugadores])
+        except (MccfrParsingError, Exception) as e:
+            print(f"Error processing {self.rutas[num_jugadores]}: {e}")
+            with self._lock:
+                self._fallidos.add(num_jugadores)
+                self._cargando.pop(num_jugadores, None)
+            return None
+        with self._lock:
+            self._cargados[num_jugadores] = datos_modelo
+            self._memoria[num_jugadores] = estimar_memoria_modelo(datos_modelo)
+            self._cargando.pop(num_jugadores, None)
+            self._expulsar_hasta_presupuesto(conservar=num_jugadores)
+        return datos_modelo
+
+    def _expulsar_hasta_presupuesto(self, conservar: int):
+        while sum(self._memoria.values()) > self.presupuesto_bytes and len(self._cargados) > 1:
+            expulsado = next(n for n in self._cargados if n != conservar)
+            # Sólo se suelta la referencia: obtener_modelo entrega el modelo fuera del lock y una consulta en curso
+            # puede seguir usándolo; un modelo mapeado cierra el mmap y el archivo cuando deja de referenciarse
+            del self._cargados[expulsado]
+            liberado = self._memoria.pop(expulsado, 0)
+            print(f"  -> Modelo de {expulsado} jugadores expulsado de memoria (~{liberado / 1e6:.0f} MB).")
@@ -4,10 +4,15 @@ from typing import Dict, Any, Optional, List, Tuple
 from treys import Card, Evaluator
 from UtilidadesTexto import UtilidadesTexto
 from Config import TREYS_CATEGORY_MAP
+from RegistroModelosMCCFR import RegistroModelosMCCFR
+from AlmacenNodosMCCFR import resolver_estrategia_nodo
+from CodificadorInfoset import codificar_infoset, decodificar_infoset
+from IndiceRespaldoInfoset import NIVELES_RELAJACION, SIN_RESPALDO
 
 class TomadorDeDecisiones:
     def __init__(self, datos_mccfr: Dict[int, Dict[str, Any]]):
         self.datos_mccfr = datos_mccfr
+        self.conteo_relajaciones: Dict[str, int] = {}
         self.evaluador = Evaluator()
 
     def convertirACartasTreys(self, cartas_str: List[str]) -> List[int]:
@@ -150,7 +155,8 @@ class TomadorDeDecisiones:
         
         return ultima_accion if ultima_accion in acciones_validas else "Ninguna"
 
-    def construirClaveInfoset(self, estado_juego: Dict[str, Any]) -> str:
+    def extraerComponentesInfoset(self, estado_juego: Dict[str, Any]) -> Tuple[str, str, str, str, str]:
+        """Devuelve (mano, categoría, posición, fase, acción previa) ya normalizados"""
         heroe = self.obtenerHeroe(estado_juego)
         
         if not heroe or len(heroe.get('cartas', [])) != 2:
@@ -167,7 +173,10 @@ class TomadorDeDecisiones:
         fase = self.limpiarFase(estado_juego.get('fase_actual', ''))
         accion_previa = self.limpiarAccionPrevia(estado_juego.get('historial_acciones_fase', ''))
         
-        clave = f"{cartas_mano}:{categoria_mano}:{posicion}:{fase}:{accion_previa}"
+        return cartas_mano, categoria_mano, posicion, fase, accion_previa
+
+    def construirClaveInfoset(self, estado_juego: Dict[str, Any]) -> str:
+        clave = ":".join(self.extraerComponentesInfoset(estado_juego))
         estado_juego["infoset_key"] = clave
         
         return clave
@@ -178,42 +187,75 @@ class TomadorDeDecisiones:
             return self._accionSegura(estado_juego)
             
         modelo_jugadores = max(2, min(10, num_jugadores))
+        datos_modelo = self.obtenerModelo(modelo_jugadores)
+        if datos_modelo is None:
+            return self._accionSegura(estado_juego)
         
-        if modelo_jugadores not in self.datos_mccfr:
-            if not self.datos_mccfr:
-                return self._accionSegura(estado_juego)
-            modelo_jugadores = min(
-                self.datos_mccfr.keys(), 
-                key=lambda x: abs(x - modelo_jugadores)
-            )
+        componentes = self.extraerComponentesInfoset(estado_juego)
+        clave_infoset = ":".join(componentes)
+        codigo_infoset = codificar_infoset(*componentes)
+        estado_juego["infoset_key"] = clave_infoset
+        estado_juego["infoset_codigo"] = codigo_infoset
+        nodos_modelo = datos_modelo.get('nodos', {})
+        recomendacion = self.consultarEstrategia(nodos_modelo, clave_infoset, codigo_infoset)
+        nivel = 0 if recomendacion is not None else SIN_RESPALDO
+        
+        # Fallo exacto: se usa el infoset entrenado más cercano precalculado en la carga
+        if recomendacion is None and 'respaldo' in datos_modelo:
+            codigo_respaldo, nivel = datos_modelo['respaldo'].resolver(codigo_infoset)
+            if codigo_respaldo >= 0:
+                recomendacion = self.consultarEstrategia(nodos_modelo, decodificar_infoset(codigo_respaldo), codigo_respaldo)
+        
+        relajacion = NIVELES_RELAJACION[nivel] if recomendacion is not None else "sin_respaldo"
+        estado_juego["infoset_relajacion"] = relajacion
+        self.conteo_relajaciones[relajacion] = self.conteo_relajaciones.get(relajacion, 0) + 1
+        
+        if recomendacion is None:
+            return self._accionSegura(estado_juego)
         
-        clave_infoset = self.construirClaveInfoset(estado_juego)
-        nodos_modelo = self.datos_mccfr[modelo_jugadores].get('nodos', {})
-        info_nodo = nodos_modelo.get(clave_infoset)
+        nombre_accion, prob_accion, distribucion = recomendacion
+        estado_juego["distribucion_estrategia"] = distribucion
+        return nombre_accion, prob_accion, True
+
+    def consultarEstrategia(self, nodos_modelo: Any, clave_infoset: str, codigo_infoset: int = -1) -> Optional[Tuple[str, float, List[Tuple[str, float]]]]:
+        """Devuelve (acción recomendada, probabilidad, distribución completa) del infoset"""
+        # Con código entero válido la consulta es un acceso directo a la tabla densa del modelo
+        if codigo_infoset >= 0 and hasattr(nodos_modelo, 'recomendacion_por_codigo'):
+            recomendacion = nodos_modelo.recomendacion_por_codigo(codigo_infoset)
+            if recomendacion is None:
+                return None
+            return recomendacion[0], recomendacion[1], nodos_modelo.distribucion_por_codigo(codigo_infoset)
+        
+        # Los almacenes compacto y mapeado traen la estrategia ya resuelta en la carga
+        if hasattr(nodos_modelo, 'recomendacion'):
+            recomendacion = nodos_modelo.recomendacion(clave_infoset)
+            if recomendacion is None:
+                return None
+            return recomendacion[0], recomendacion[1], nodos_modelo.distribucion(clave_infoset)
         
+        info_nodo = nodos_modelo.get(clave_infoset)
         if not info_nodo:
-            return self._accionSegura(estado_juego)
+            return None
         
-        suma_total_estrategia = sum(
-            max(0.0, a.get('suma_estrategia', 0.0)) for a in info_nodo
+        distribucion, mejor, probabilidad = resolver_estrategia_nodo(
+            [a.get('arrepentimiento', float('inf')) for a in info_nodo],
+            [a.get('suma_estrategia', 0.0) for a in info_nodo]
         )
+        acciones = [a.get('accion', 'Check') for a in info_nodo]
+        return acciones[mejor], probabilidad, list(zip(acciones, distribucion))
+
+    def obtenerModelo(self, modelo_jugadores: int) -> Optional[Dict[str, Any]]:
+        if isinstance(self.datos_mccfr, RegistroModelosMCCFR):
+            return self.datos_mccfr.obtener_modelo(modelo_jugadores)
         
-        if suma_total_estrategia <= 1e-9:
-            accion_segura = min(
-                info_nodo, 
-                key=lambda x: x.get('arrepentimiento', float('inf'))
+        if modelo_jugadores not in self.datos_mccfr:
+            if not self.datos_mccfr:
+                return None
+            modelo_jugadores = min(
+                self.datos_mccfr.keys(), 
+                key=lambda x: abs(x - modelo_jugadores)
             )
-            return accion_segura.get('accion', "Fold"), 0.0, True
-        
-        mejor_accion = max(
-            info_nodo, 
-            key=lambda x: max(0.0, x.get('suma_estrategia', 0.0))
-        )
-        
-        nombre_accion = mejor_accion.get('accion', 'Check')
-        prob_accion = max(0.0, mejor_accion.get('suma_estrategia', 0.0)) / suma_total_estrategia
-        
-        return nombre_accion, prob_accion, True
+        return self.datos_mccfr[modelo_jugadores]
 
     def _accionSegura(self, estado_juego: Dict[str, Any]) -> Tuple[str, float, bool]:
         """Determina la acción más segura cuando no se encuentra el infoset"""
@@ -396,6 +438,9 @@ class TomadorDeDecisiones:
             "monto_normalizado": monto_normalizado,
             "probabilidad": probabilidad,
             "infoset": estado_juego.get("infoset_key", "[ERROR]"),
+            "infoset_codigo": estado_juego.get("infoset_codigo", -1),
             "infoset_encontrado": encontrado,
+            "infoset_relajacion": estado_juego.get("infoset_relajacion", "sin_respaldo"),
+            "distribucion": estado_juego.get("distribucion_estrategia", []) if encontrado else [],
             "fase_actual": estado_juego.get('fase_actual', 'N/A')
         }
\ No newline at end of file
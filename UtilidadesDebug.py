@@ -2,19 +2,17 @@ import cv2
 import numpy as np
 import os
 import datetime
-from typing import List, Any, Dict
-from Config import LOGS_DIR, LABEL_NAMES
+from typing import Dict
+from Config import LOGS_DIR, LABEL_NAMES, FRAMES_DIR
+from LoteDetecciones import LoteDetecciones
 np.random.seed(42)
 COLORS = np.random.randint(100, 255, size=(len(LABEL_NAMES), 3), dtype="uint8")
 LABEL_COLOR_MAP = {name: tuple(int(c) for c in COLORS[i]) for i, name in enumerate(LABEL_NAMES)}
-def guardar_frame_con_cajas(frame: np.ndarray, yolo_results: List[Any], label_map: Dict[int, str]):
+def guardar_frame_con_cajas(frame: np.ndarray, lote: LoteDetecciones, label_map: Dict[int, str]):
     if not os.path.exists(LOGS_DIR): os.makedirs(LOGS_DIR)
     frame_con_cajas = frame.copy()
-    if not yolo_results: return
-    result = yolo_results[0]
-    boxes, classes, confs = result.boxes.xyxy.cpu().numpy(), result.boxes.cls.cpu().numpy(), result.boxes.conf.cpu().numpy()
-    for box, cls_id, conf in zip(boxes, classes, confs):
-        x1, y1, x2, y2 = map(int, box)
+    if not lote: return
+    for (x1, y1, x2, y2), cls_id, conf in zip(lote.cajas_enteras.tolist(), lote.clases.tolist(), lote.confianzas.tolist()):
         label = label_map.get(int(cls_id), "Desconocido")
         color = LABEL_COLOR_MAP.get(label, (0, 255, 0))
         cv2.rectangle(frame_con_cajas, (x1, y1), (x2, y2), color, 2)
@@ -25,4 +23,10 @@ def guardar_frame_con_cajas(frame: np.ndarray, yolo_results: List[Any], label_ma
         cv2.imwrite(ruta_guardado, frame_con_cajas)
         print(f"📸 Imagen de depuración guardada en: {ruta_guardado}")
     except Exception as e:
-        print(f"❌ Error al guardar la imagen de depuración: {e}")
\ No newline at end of file
+        print(f"❌ Error al guardar la imagen de depuración: {e}")
+def guardar_frame_crudo(frame: np.ndarray) -> str:
+    """Guarda el frame sin anotar en FRAMES_DIR para benchmarks y calibración del detector."""
+    if not os.path.exists(FRAMES_DIR): os.makedirs(FRAMES_DIR)
+    ruta_guardado = os.path.join(FRAMES_DIR, f"frame_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.png")
+    if not cv2.imwrite(ruta_guardado, frame): print(f"❌ Error al guardar el frame: {ruta_guardado}")
+    return ruta_guardado
@@ -0,0 +1,290 @@
+"""Validador en streaming de modelos mccfr_N_poker.bin.
+
+Recorre cada archivo una vez por mmap: los prefijos de longitud y las claves se
+decodifican en Python y el resto de estadísticas se calculan con NumPy por
+bloques, así que no llega a la velocidad del disco (~20 MB/s medidos sobre un
+modelo sintético de 54 MB). El checksum de la cabecera sólo se compara de forma
+informativa con un CRC32 del cuerpo: el entrenador C++ no documenta su formato,
+así que una discrepancia es un aviso (error sólo con --estricto).
+"""
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import Counter
+from itertools import repeat
+from typing import Any, Dict, List
+import numpy as np
+from Config import MCCFR_MODELS_DIR, FORMATO_FLOTANTE, ENDIANNESS_POR_DEFECTO, MAX_ACCIONES_POR_NODO, MAX_LONGITUD_STRING
+from MCCFRLoader import MCCFRLoader, MccfrParsingError, FORMATO_CABECERA
+from CodificadorInfoset import COMPONENTES, TOTAL_CODIGOS
+
+NOMBRES_COMPONENTES = ("mano", "categoria", "posicion", "fase", "accion_previa")
+MAX_VALORES_DESCONOCIDOS = 20
+MAX_ERRORES = 20
+UMBRAL_ESTRATEGIA_PURA = 0.999
+NODOS_POR_BLOQUE = 1 << 15
+MAX_LONGITUD_TEXTO_VECTORIZADO = 64  # textos de acción más largos se cuentan uno a uno
+
+def validar_modelo(ruta: str, endianness: str = ENDIANNESS_POR_DEFECTO) -> Dict[str, Any]:
+    """Recorre un .bin una sola vez sin materializar nodos y devuelve sus estadísticas.
+
+    La memoria usada no depende del tamaño del modelo: el archivo se lee por mmap
+    (páginas de la caché del sistema, no del proceso) y sólo se acumulan contadores
+    acotados más un bitmap de un byte por código de infoset.
+    """
+    informe: Dict[str, Any] = {"archivo": os.path.basename(ruta), "bytes": os.path.getsize(ruta), "errores": [], "avisos": []}
+    inicio = time.perf_counter()
+    with open(ruta, 'rb') as f:
+        try: datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            informe["errores"].append("Archivo vacío.")
+            return informe
+    try:
+        if hasattr(datos, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'): datos.madvise(mmap.MADV_SEQUENTIAL)
+        _recorrer_modelo(datos, ruta, endianness, informe)
+    finally: datos.close()
+    informe["segundos"] = time.perf_counter() - inicio
+    informe["mb_por_segundo"] = informe["bytes"] / 1e6 / informe["segundos"] if informe["segundos"] > 0 else 0.0
+    return informe
+
+class _EstadisticasAcciones:
+    """Estadísticas de los registros de acción, calculadas con NumPy por bloques de nodos.
+
+    El recorrido en Python sólo anota dónde empieza cada registro de acción y
+    dónde acaba cada nodo (los textos tienen longitud variable, así que saltarlos
+    es inevitable); longitudes, dobles, degeneración por nodo y frecuencia de
+    textos salen después de esas posiciones con un gather sobre el buffer.
+    """
+    def __init__(self, datos, endianness: str):
+        self.buffer = np.frombuffer(datos, dtype=np.uint8)
+        self.tipo_doble = np.dtype(endianness + FORMATO_FLOTANTE)
+        self.tam_dobles = 2 * self.tipo_doble.itemsize
+        self.inicios, self.fines_nodo, self.acciones_por_nodo = array('q'), array('q'), array('q')
+        self.histograma_acciones: Counter = Counter()
+        self.frecuencia_acciones: Counter = Counter()
+        self.sin_masa = self.puras = self.no_finitos = 0
+
+    def volcar(self):
+        """Procesa los nodos completos anotados (las acciones de un nodo a medias se descartan)."""
+        if not self.acciones_por_nodo: return
+        # Copias (no vistas): los array de anotaciones se vacían en sitio al final
+        conteos = np.array(self.acciones_por_nodo, dtype=np.int64)
+        ultimas = np.cumsum(conteos) - 1
+        inicios = np.array(self.inicios, dtype=np.int64)[:int(ultimas[-1]) + 1]
+        # Cada registro acaba donde empieza el siguiente del nodo; el último, donde acaba el nodo
+        fines = np.empty_like(inicios)
+        fines[:-1] = inicios[1:]
+        fines[ultimas] = np.array(self.fines_nodo, dtype=np.int64)
+        inicio_dobles = fines - self.tam_dobles
+        posiciones, longitudes = inicios + 4, inicio_dobles - inicios - 4
+        valores = self.buffer[inicio_dobles[:, None] + np.arange(self.tam_dobles)].view(self.tipo_doble)
+        arrepentimientos, sumas = valores[:, 0].astype(np.float64), valores[:, 1].astype(np.float64)
+        limites = np.concatenate(([0], ultimas[:-1] + 1))
+        with np.errstate(invalid='ignore', over='ignore'):
+            # Un NaN o infinito en cualquier valor deja la suma de control no finita
+            finitos = np.isfinite(np.add.reduceat(arrepentimientos + sumas, limites))
+            positivas = np.where(sumas > 0, sumas, 0.0)
+            masa, maxima = np.add.reduceat(positivas, limites), np.maximum.reduceat(positivas, limites)
+            con_masa = finitos & (masa > 1e-9)
+            self.no_finitos += int((~finitos).sum())
+            self.sin_masa += int((finitos & ~con_masa).sum())
+            self.puras += int((con_masa & (maxima >= UMBRAL_ESTRATEGIA_PURA * np.where(con_masa, masa, 0.0))).sum())
+        self.histograma_acciones.update(dict(zip(*(v.tolist() for v in np.unique(conteos, return_counts=True)))))
+        self._contar_textos(posiciones, longitudes)
+        del self.inicios[:], self.fines_nodo[:], self.acciones_por_nodo[:]
+
+    def _contar_textos(self, posiciones: np.ndarray, longitudes: np.ndarray):
+        cortos = longitudes <= MAX_LONGITUD_TEXTO_VECTORIZADO
+        for inicio, longitud in zip(posiciones[~cortos].tolist(), longitudes[~cortos].tolist()):
+            self.frecuencia_acciones[self.buffer[inicio:inicio + longitud].tobytes()] += 1
+        posiciones, longitudes = posiciones[cortos], longitudes[cortos]
+        if not len(posiciones): return
+        columnas = np.arange(int(longitudes.max()))
+        textos = self.buffer[np.minimum(posiciones[:, None] + columnas, len(self.buffer) - 1)]
+        textos[columnas >= longitudes[:, None]] = 0
+        # Huella polinómica (con la longitud, para que los ceros finales no confundan textos) y comprobación
+        # de que cada grupo es idéntico a su representante; ante una colisión se agrupa por los bytes completos
+        huellas = longitudes.astype(np.uint64)
+        with np.errstate(over='ignore'):
+            for columna in textos.T: huellas = huellas * np.uint64(1099511628211) + columna
+        _, indices, inversa, conteos = np.unique(huellas, return_index=True, return_inverse=True, return_counts=True)
+        if not (np.array_equal(textos, textos[indices[inversa]]) and np.array_equal(longitudes, longitudes[indices[inversa]])):
+            filas = np.ascontiguousarray(np.concatenate((longitudes.astype('<u4').view(np.uint8).reshape(-1, 4), textos), axis=1))
+            _, indices, conteos = np.unique(filas.view(np.dtype((np.void, filas.shape[1]))).ravel(), return_index=True, return_counts=True)
+        for indice, conteo in zip(indices.tolist(), conteos.tolist()):
+            inicio, longitud = int(posiciones[indice]), int(longitudes[indice])
+            self.frecuencia_acciones[self.buffer[inicio:inicio + longitud].tobytes()] += conteo
+
+class _EstadisticasClaves:
+    """Cobertura de componentes, códigos de infoset y duplicados, contados por bloques de claves."""
+    def __init__(self):
+        self.claves: List[str] = []
+        self.valores_componentes = [Counter() for _ in COMPONENTES]
+        self.desconocidos = [Counter() for _ in COMPONENTES]
+        self.indices = [{valor: i for i, valor in enumerate(valores)} for valores in COMPONENTES]
+        self.vistos = np.zeros(TOTAL_CODIGOS, dtype=bool)
+        self.malformadas = self.duplicados = 0
+
+    def volcar(self):
+        partes = [clave.split(':') for clave in self.claves]
+        del self.claves[:]
+        validas = [p for p in partes if len(p) == len(COMPONENTES)]
+        self.malformadas += len(partes) - len(validas)
+        if not validas: return
+        # Código de base mixta como el de CodificadorInfoset; -1 en algún componente = infoset fuera del espacio
+        codigos = np.zeros(len(validas), dtype=np.int64)
+        conocidas = np.ones(len(validas), dtype=bool)
+        for columna, indices, conteo, otros in zip(zip(*validas), self.indices, self.valores_componentes, self.desconocidos):
+            # Counter conserva el orden de primera aparición: los desconocidos que se guardan son los primeros del archivo
+            for valor, n in Counter(columna).items():
+                if valor in indices: conteo[valor] += n
+                elif len(otros) < MAX_VALORES_DESCONOCIDOS or valor in otros: otros[valor] += n
+            indice = np.fromiter(map(indices.get, columna, repeat(-1)), dtype=np.int64, count=len(columna))
+            conocidas &= indice >= 0
+            codigos = codigos * len(indices) + indice
+        repeticiones = np.bincount(codigos[conocidas], minlength=TOTAL_CODIGOS)
+        presentes = repeticiones > 0
+        self.duplicados += int(repeticiones[presentes].sum() - presentes.sum()) + int(repeticiones[self.vistos].sum())
+        self.vistos |= presentes
+
+def _recorrer_modelo(datos, ruta: str, endianness: str, informe: Dict[str, Any]):
+    entero = struct.Struct(endianness + 'I')
+    leer_entero, total = entero.unpack_from, len(datos)
+    tam_registro = 4 + struct.calcsize(endianness + FORMATO_FLOTANTE * 2)  # longitud del texto + dos dobles
+    try: header = MCCFRLoader()._validar_cabecera(struct.unpack_from(endianness + FORMATO_CABECERA, datos, 0), ruta)
+    except (MccfrParsingError, struct.error) as e:
+        informe["errores"].append(f"Cabecera inválida: {e}")
+        return
+    informe["cabecera"] = header
+    inicio_cuerpo = pos = struct.calcsize(endianness + FORMATO_CABECERA)
+    acciones = _EstadisticasAcciones(datos, endianness)
+    anotar_inicio, anotar_fin, anotar_nodo = acciones.inicios.append, acciones.fines_nodo.append, acciones.acciones_por_nodo.append
+    claves = _EstadisticasClaves()
+    anotar_clave = claves.claves.append
+    nodos = 0
+    try:
+        for i in range(header["total_nodos"]):
+            inicio_nodo = pos
+            length = leer_entero(datos, pos)[0]
+            if length > MAX_LONGITUD_STRING: raise MccfrParsingError(f"key_{i+1}: longitud de string ({length}) fuera de límite")
+            pos += 4
+            if pos + length > total: raise struct.error(f"se esperaban {length} bytes")
+            clave = datos[pos:pos + length].decode('latin-1', errors='replace')
+            pos += length
+            num_acciones = leer_entero(datos, pos)[0]
+            pos += 4
+            if not (0 < num_acciones <= MAX_ACCIONES_POR_NODO): raise MccfrParsingError(f"número de acciones inválido ({num_acciones}) en '{clave}'")
+            for _ in range(num_acciones):
+                length = leer_entero(datos, pos)[0]
+                if length > MAX_LONGITUD_STRING: raise MccfrParsingError(f"action_text en '{clave}': longitud ({length}) fuera de límite")
+                anotar_inicio(pos)
+                pos += length + tam_registro
+            if pos > total:
+                faltan, pos = pos - total, inicio_nodo
+                raise struct.error(f"faltan {faltan} bytes en las acciones de '{clave}'")
+            anotar_nodo(num_acciones)
+            anotar_fin(pos)
+            anotar_clave(clave)
+            nodos += 1
+            if nodos % NODOS_POR_BLOQUE == 0:
+                acciones.volcar()
+                claves.volcar()
+    except (MccfrParsingError, struct.error) as e:
+        informe["errores"].append(f"Nodo {nodos + 1} (byte {pos}): {e}")
+    acciones.volcar()
+    claves.volcar()
+    acciones.buffer = None  # suelta la vista del mmap antes de cerrarlo
+    histograma_acciones, frecuencia_acciones = acciones.histograma_acciones, acciones.frecuencia_acciones
+    sin_masa, puras, no_finitos = acciones.sin_masa, acciones.puras, acciones.no_finitos
+    claves_malformadas, duplicados = claves.malformadas, claves.duplicados
+    valores_componentes, desconocidos = claves.valores_componentes, claves.desconocidos
+    if not informe["errores"] and pos != total: informe["avisos"].append(f"{total - pos} bytes sobrantes tras el último nodo.")
+    if nodos != header["total_nodos"] and not informe["errores"]: informe["errores"].append(f"La cabecera declara {header['total_nodos']} nodos y se leyeron {nodos}.")
+    informe.update({
+        "nodos": nodos,
+        "acciones": sum(n * c for n, c in histograma_acciones.items()),
+        "histograma_acciones": dict(sorted(histograma_acciones.items())),
+        "frecuencia_acciones": {texto.decode('latin-1', errors='replace'): c for texto, c in frecuencia_acciones.most_common()},
+        "claves_malformadas": claves_malformadas,
+        "claves_duplicadas": duplicados,
+        "nodos_sin_masa": sin_masa,
+        "nodos_estrategia_pura": puras,
+        "nodos_no_finitos": no_finitos,
+        "cobertura_codigos": int(claves.vistos.sum()) / TOTAL_CODIGOS,
+        "cobertura_componentes": {
+            nombre: {"presentes": len(conteo), "total": len(valores), "faltantes": [v for v in valores if v not in conteo], "desconocidos": dict(otros)}
+            for nombre, valores, conteo, otros in zip(NOMBRES_COMPONENTES, COMPONENTES, valores_componentes, desconocidos)
+        },
+    })
+    _validar_checksum(datos, inicio_cuerpo, pos, header, informe)
+    if claves_malformadas: informe["avisos"].append(f"{claves_malformadas} claves no tienen 5 componentes.")
+    if duplicados: informe["avisos"].append(f"{duplicados} claves duplicadas (el cargador se queda con la última).")
+    if no_finitos: informe["errores"].append(f"{no_finitos} nodos con arrepentimientos o sumas no finitos.")
+
+def _validar_checksum(datos, inicio: int, fin: int, header: Dict[str, Any], informe: Dict[str, Any]):
+    # El entrenador C++ no documenta cómo calcula el checksum; se compara con el
+    # CRC32 del cuerpo y una discrepancia sólo se reporta como aviso.
+    crc = 0
+    for desde in range(inicio, fin, 1 << 24):
+        crc = zlib.crc32(datos[desde:min(fin, desde + (1 << 24))], crc)
+    informe["crc32_cuerpo"] = crc
+    if header["checksum"] == 0: informe["checksum"] = "no registrado"
+    elif header["checksum"] == crc: informe["checksum"] = "correcto"
+    else:
+        informe["checksum"] = "no coincide"
+        informe["avisos"].append(f"Checksum de cabecera {header['checksum']:#010x} distinto del CRC32 del cuerpo {crc:#010x}.")
+
+def imprimir_informe(informe: Dict[str, Any]):
+    print(f"  -> {informe['archivo']}: {informe['bytes'] / 1e6:.1f} MB")
+    if "cabecera" in informe:
+        cabecera = informe["cabecera"]
+        print(f"     Versión {cabecera['version']}, {cabecera['num_jugadores']} jugadores, {cabecera['total_nodos']} nodos declarados, timestamp {cabecera['timestamp']}.")
+    if "nodos" in informe:
+        print(f"     {informe['nodos']} nodos, {informe['acciones']} acciones en {informe['segundos']:.2f} s ({informe['mb_por_segundo']:.1f} MB/s).")
+        print("     Acciones por nodo: " + ", ".join(f"{n}: {c}" for n, c in informe["histograma_acciones"].items()))
+        print("     Frecuencia de acciones: " + ", ".join(f"{a}: {c}" for a, c in informe["frecuencia_acciones"].items()))
+        print(f"     Degeneración: {informe['nodos_sin_masa']} sin masa positiva, {informe['nodos_estrategia_pura']} con estrategia pura, {informe['nodos_no_finitos']} no finitos.")
+        print(f"     Cobertura del espacio de infosets: {informe['cobertura_codigos']:.2%}")
+        for nombre, cobertura in informe["cobertura_componentes"].items():
+            linea = f"       {nombre}: {cobertura['presentes']}/{cobertura['total']}"
+            if cobertura["faltantes"]: linea += f", faltan {_resumir(cobertura['faltantes'])}"
+            if cobertura["desconocidos"]: linea += f", desconocidos {_resumir(list(cobertura['desconocidos']))}"
+            print(linea)
+        print(f"     Checksum (comparación informativa con el CRC32 del cuerpo {informe['crc32_cuerpo']:#010x}): {informe['checksum']}.")
+    for aviso in informe["avisos"]: print(f"     Aviso: {aviso}")
+    for error in informe["errores"][:MAX_ERRORES]: print(f"     Error: {error}")
+    print("     ...VÁLIDO" if not informe["errores"] else "     ...INVÁLIDO")
+
+def _resumir(valores: List[str], maximo: int = 8) -> str:
+    return ", ".join(valores[:maximo]) + (f" (+{len(valores) - maximo})" if len(valores) > maximo else "")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Valida modelos mccfr_N_poker.bin en streaming (~20 MB/s) y muestra sus estadísticas; "
+                                                 "el checksum sólo se compara de forma informativa con un CRC32 del cuerpo")
+    parser.add_argument("modelos", nargs="*", help="Archivos .bin a validar (por defecto, todos los de MCCFR_MODELS_DIR)")
+    parser.add_argument("--json", help="Escribe además los informes completos en este archivo JSON")
+    parser.add_argument("--estricto", action="store_true", help="Trata los avisos (CRC32 informativo distinto del checksum, duplicados, bytes sobrantes) como errores")
+    args = parser.parse_args()
+    rutas = args.modelos or sorted(glob.glob(os.path.join(MCCFR_MODELS_DIR, 'mccfr_*_poker.bin')))
+    if not rutas:
+        print(f"Error: No se encontraron archivos .bin en: {MCCFR_MODELS_DIR}")
+        return 2
+    informes = []
+    for ruta in rutas:
+        informe = validar_modelo(ruta)
+        if args.estricto: informe["errores"].extend(informe["avisos"])
+        imprimir_informe(informe)
+        informes.append(informe)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f: json.dump(informes, f, indent=2, ensure_ascii=False)
+    return 1 if any(informe["errores"] for informe in informes) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,16 +5,21 @@ import json
 import copy
 import traceback
 import numpy as np
-from Config import LOOP_DELAY_SECONDS, LABEL_NAMES, MCCFR_QUERY_COOLDOWN_SECONDS
+from Config import LOOP_DELAY_SECONDS, LABEL_NAMES, MCCFR_QUERY_COOLDOWN_SECONDS, MCCFR_CARGA_PEREZOSA, CAPTURA_EN_HILO, CAMBIOS_HABILITADO, PIPELINE_HABILITADO, FRECUENCIA_ADAPTATIVA
 from MCCFRLoader import MCCFRLoader
+from RegistroModelosMCCFR import RegistroModelosMCCFR
 from CapturadorPantalla import CapturadorPantalla
+from HiloCaptura import HiloCaptura
+from DetectorCambios import DetectorCambios
+from PipelineProcesamiento import PipelineProcesamiento
+from PlanificadorFrecuencia import PlanificadorFrecuencia
 from DetectorObjetos import DetectorObjetos
 from ProcesadorOCR import ProcesadorOCR
 from EstadoJuego import EstadoJuego
 from TomadorDeDecisiones import TomadorDeDecisiones
 from InterfazUsuario import InterfazUsuario
 from ListenerTeclado import ListenerTeclado
-from UtilidadesDebug import guardar_frame_con_cajas
+from UtilidadesDebug import guardar_frame_con_cajas, guardar_frame_crudo
 
 class NumpyEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -33,7 +38,12 @@ def main():
     estado_compartido = {}
     
     cargador_mccfr = MCCFRLoader()
-    datos_mccfr = cargador_mccfr.cargar_modelos_en_memoria()
+    if MCCFR_CARGA_PEREZOSA:
+        datos_mccfr = RegistroModelosMCCFR(cargador_mccfr)
+        datos_mccfr.precargar()
+        print(f"  -> Modelos MCCFR disponibles (carga bajo demanda): {sorted(datos_mccfr.keys())}")
+    else:
+        datos_mccfr = cargador_mccfr.cargar_modelos_en_memoria()
     if not datos_mccfr:
         print("Error: No se pudieron cargar los modelos MCCFR")
         return
@@ -50,8 +60,17 @@ def main():
     listener_teclado = ListenerTeclado(estado_compartido)
     threading.Thread(target=lambda: InterfazUsuario(cola_ui).mainloop(), daemon=True).start()
     listener_teclado.start()
+    detector_cambios = DetectorCambios() if CAMBIOS_HABILITADO else None
+    pipeline = PipelineProcesamiento(capturador, detector, manejador_estado, detector_cambios, estado_compartido, label_map) if PIPELINE_HABILITADO else None
+    hilo_captura = HiloCaptura(capturador, estado_compartido) if CAPTURA_EN_HILO and not pipeline else None
+    planificador = PlanificadorFrecuencia() if FRECUENCIA_ADAPTATIVA else None
+    if pipeline:
+        pipeline.iniciar()
+    if hilo_captura:
+        hilo_captura.start()
     
     ultima_data_ui = None
+    area_anterior = None
     contador_ciclos = 0
     tiempo_ultima_consulta_mccfr = 0
     
@@ -67,29 +86,79 @@ def main():
                 continue
             
             tiempo_inicio_ciclo = time.time()
-            contador_ciclos += 1
             
-            frame = capturador.capturar_frame()
-            if frame is None:
-                time.sleep(LOOP_DELAY_SECONDS)
-                continue
-            
-            resultados_yolo = detector.detectar(frame)
-            
-            accion_forzada = estado_compartido.get('force_action', False)
-            if accion_forzada:
-                guardar_frame_con_cajas(frame, resultados_yolo, label_map)
-            
-            manejador_estado.actualizarDesdeDetecciones(resultados_yolo, frame)
-            estado_actual = manejador_estado.obtenerEstadoParaJson()
+            if pipeline:
+                # Captura, detección y estado corren en sus propios hilos; aquí sólo se decide
+                elemento = pipeline.tomar_resultado()
+                if elemento is None:
+                    continue
+                inicio_decision = time.perf_counter()
+                contador_ciclos += 1
+                accion_forzada = estado_compartido.get('force_action', False)
+                estado_actual = elemento["estado"]
+                es_turno_heroe, hay_principal = elemento["necesita_accion"], elemento["hay_principal"]
+                asientos_hasta_heroe, heroe_en_mano = elemento["asientos_hasta_heroe"], elemento["heroe_en_mano"]
+            else:
+                contador_ciclos += 1
+                if hilo_captura:
+                    frame, marca_frame, area_frame = hilo_captura.tomar_frame()
+                    if frame is None:
+                        continue
+                else:
+                    marca_frame = time.perf_counter()
+                    frame, area_frame = capturador.capturar()
+                    if frame is None:
+                        time.sleep(LOOP_DELAY_SECONDS)
+                        continue
+                
+                accion_forzada = estado_compartido.get('force_action', False)
+                
+                # Mesa estática: se omiten detección y OCR y se reutiliza el último estado
+                if not detector_cambios or detector_cambios.debe_procesar(frame) or accion_forzada:
+                    lote_detecciones = detector.detectar(frame)
+                    
+                    if accion_forzada:
+                        guardar_frame_con_cajas(frame, lote_detecciones, label_map)
+                        guardar_frame_crudo(frame)
+                    
+                    # Como en el pipeline: las coordenadas guardadas se llevan al área del frame que llega, que con el
+                    # hilo de captura puede ser todavía la anterior a un cambio de región
+                    if area_anterior is not None and area_frame != area_anterior:
+                        manejador_estado.desplazarCoordenadas(area_anterior['left'] - area_frame['left'], area_anterior['top'] - area_frame['top'])
+                    area_anterior = area_frame
+                    manejador_estado.actualizarDesdeDetecciones(lote_detecciones, frame, detector_cambios)
+                    capturador.actualizar_region(manejador_estado.caja_principal, area_frame)
+                estado_actual = manejador_estado.obtenerEstadoParaJson()
+                es_turno_heroe, hay_principal = manejador_estado.necesitaAccion(), manejador_estado.hayJugadorPrincipal()
+                asientos_hasta_heroe, heroe_en_mano = manejador_estado.asientosHastaTurnoHeroe(), manejador_estado.heroeSigueEnMano()
             
             if contador_ciclos % 20 == 0 and estado_actual:
                 print(f"\n--- ESTADO JUEGO (Ciclo {contador_ciclos}) ---")
                 print(json.dumps(estado_actual, indent=2, ensure_ascii=False, cls=NumpyEncoder))
+                if hilo_captura:
+                    metricas = hilo_captura.metricas()
+                    print(f"Captura: {metricas['capturados']} frames, {metricas['descartados']} descartados ({metricas['tasa_descarte']:.0%}), "
+                          f"edad media {metricas['edad_media_ms']:.0f} ms, p95 {metricas['edad_p95_ms']:.0f} ms")
+                if detector_cambios:
+                    print(f"Frames sin cambios omitidos: {detector_cambios.frames_omitidos}/{detector_cambios.frames_analizados} "
+                          f"({detector_cambios.tasa_omision():.0%}), lecturas OCR reutilizadas: {manejador_estado.lecturas_reutilizadas}, "
+                          f"en lote: {manejador_estado.lecturas_en_lote}, de nombres: {manejador_estado.lecturas_nombre} "
+                          f"({len(manejador_estado.rastreador_asientos.asientos)} asientos)")
+                if pipeline:
+                    metricas = pipeline.metricas()
+                    print(f"Pipeline: {metricas['frames_por_segundo']:.1f} fps, colas {metricas['colas']}, "
+                          f"extremo a extremo {metricas['extremo_a_extremo_ms'][0]:.0f}/{metricas['extremo_a_extremo_ms'][1]:.0f} ms (media/p95)")
+                    print("   Latencia por etapa (media/p95 ms): " + ", ".join(
+                        f"{etapa} {media:.0f}/{p95:.0f}" for etapa, (media, p95) in metricas['latencia_ms'].items()))
+                cache_ocr = ocr.estadisticas_cache()
+                print(f"Caché OCR: {cache_ocr['aciertos']} aciertos, {cache_ocr['fallos']} fallos ({cache_ocr['tasa_aciertos']:.0%}), {cache_ocr['entradas']} entradas")
+                if planificador:
+                    metricas = planificador.metricas()
+                    print(f"Frecuencia: modo {metricas['modo']}, intervalo {metricas['intervalo_ms']:.0f} ms; tiempo por modo: " + ", ".join(
+                        f"{modo} {fraccion:.0%}" for modo, fraccion in metricas['fraccion_por_modo'].items()))
                 print("-" * 50)
             
             data_ui = None
-            es_turno_heroe = manejador_estado.necesitaAccion()
 
             if estado_actual and (es_turno_heroe or accion_forzada):
                 tiempo_actual = time.time()
@@ -111,7 +180,7 @@ def main():
             if not data_ui:
                 if not estado_actual:
                     data_ui = {"estado": "no_juego"}
-                elif not manejador_estado.hayJugadorPrincipal():
+                elif not hay_principal:
                     data_ui = {
                         "estado": "no_principal",
                         "fase_actual": estado_actual.get('fase_actual', 'N/A'),
@@ -128,8 +197,24 @@ def main():
                 ultima_data_ui = data_ui
                 cola_ui.put(copy.deepcopy(data_ui))
             
+            intervalo_ciclo = LOOP_DELAY_SECONDS
+            if planificador:
+                # Más frames cuando el turno del héroe se acerca, menos en Espera/Showdown o sin mesa
+                fase = estado_actual.get('fase_actual') if estado_actual else None
+                intervalo_ciclo = planificador.actualizar(hay_principal, fase, asientos_hasta_heroe, heroe_en_mano, accion_forzada)
+                if pipeline:
+                    pipeline.intervalo = intervalo_ciclo
+                if hilo_captura:
+                    hilo_captura.intervalo = intervalo_ciclo
+            
+            if pipeline:
+                pipeline.registrar_decision(elemento, inicio_decision)
+                continue
+            if hilo_captura:
+                hilo_captura.registrar_edad(marca_frame)
+            
             tiempo_transcurrido = time.time() - tiempo_inicio_ciclo
-            tiempo_espera = max(0, LOOP_DELAY_SECONDS - tiempo_transcurrido)
+            tiempo_espera = max(0, intervalo_ciclo - tiempo_transcurrido)
             time.sleep(tiempo_espera)
             
     except Exception:
@@ -139,6 +224,10 @@ def main():
         estado_compartido['running'] = False
         if listener_teclado.is_alive():
             listener_teclado.join(timeout=1)
+        if hilo_captura and hilo_captura.is_alive():
+            hilo_captura.join(timeout=1)
+        if pipeline:
+            pipeline.detener()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file